@@ -0,0 +1,52 @@
+"""Benchmark aggregate encodings against pre-aggregating the data in pandas.
+
+Converts a line chart of the mean, median and q3 of a 2M row DataFrame by 1000 x values, once
+with aggregate encodings and once from a DataFrame aggregated with pandas beforehand (including
+the time it takes to aggregate it).
+
+Run with ``python benchmarks/bench_aggregate.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import convert
+
+N_ROWS = 2000000
+N_GROUPS = 1000
+REPEAT = 3
+
+
+def best_of(func):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'x': rng.randint(0, N_GROUPS, N_ROWS), 'y': rng.randn(N_ROWS)})
+
+    for op, pandas_op in [('mean', lambda g: g.mean()), ('median', lambda g: g.median()),
+                          ('q3', lambda g: g.quantile(0.75))]:
+        def native():
+            chart = alt.Chart(df).mark_line().encode(alt.X('x'), alt.Y('{}(y)'.format(op)))
+            convert(chart, pyplot=False)
+
+        def pre_aggregated():
+            reduced = pandas_op(df.groupby('x')['y']).reset_index()
+            chart = alt.Chart(reduced).mark_line().encode(alt.X('x'), alt.Y('y'))
+            convert(chart, pyplot=False)
+
+        native_time, pandas_time = best_of(native), best_of(pre_aggregated)
+        print('{:>6}: aggregate encoding {:6.3f}s, pre-aggregated in pandas {:6.3f}s ({:4.2f}x)'.format(
+            op, native_time, pandas_time, pandas_time / native_time))
+
+
+if __name__ == '__main__':
+    main()
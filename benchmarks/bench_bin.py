@@ -0,0 +1,49 @@
+"""Benchmark binned histograms.
+
+Converts a histogram (a bar chart of the count of a binned field) of 10M rows with the bin
+encoding, compared with binning in pandas first (``pd.cut`` and ``value_counts``), and renders it
+again to show the effect of the bin edge cache.
+
+Run with ``python benchmarks/bench_bin.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+import mplaltair._data
+from mplaltair import convert
+
+N_ROWS = 10**7
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'v': rng.randn(N_ROWS) * 10})
+    chart = alt.Chart(df).mark_bar().encode(alt.X('v', bin=alt.Bin(maxbins=50)), alt.Y('count()'))
+
+    def pre_binned():
+        edges = np.linspace(-60, 60, 61)
+        counts = pd.cut(df['v'], edges).value_counts(sort=False)
+        binned = pd.DataFrame({'start': edges[:-1], 'count': counts.values})
+        convert(alt.Chart(binned).mark_point().encode(alt.X('start'), alt.Y('count')), pyplot=False)
+
+    def native():
+        convert(chart, pyplot=False)
+
+    mplaltair._data._bin_edges_cache.clear()
+    first = timed(native)
+    again = timed(native)
+    print('bin encoding: first render {:.2f}s, with cached edges {:.2f}s'.format(first, again))
+    print('binned in pandas first (pd.cut + value_counts, drawn as points): {:.2f}s'.format(timed(pre_binned)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Micro-benchmark the conversion of each type of encoding channel.
+
+Times ``_convert`` on point charts of 100k rows with a single channel of each supported kind,
+after parsing, so only the mapping of the channel to the arguments of scatter() is measured.
+
+Run with ``python benchmarks/bench_channel_dispatch.py``.
+"""
+import timeit
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair._convert import _convert
+from mplaltair.parse_chart import ChartMetadata
+
+N_ROWS = 10**5
+CHANNELS = [
+    ('x quantitative', alt.X('q:Q')),
+    ('x temporal', alt.X('t:T')),
+    ('color quantitative', alt.Color('q:Q')),
+    ('color nominal', alt.Color('n:N')),
+    ('color ordinal', alt.Color('n:O')),
+    ('size quantitative', alt.Size('q:Q')),
+    ('shape nominal', alt.Shape('n:N')),
+    ('stroke nominal', alt.Stroke('n:N')),
+    ('stroke ordinal', alt.Stroke('n:O')),
+]
+
+
+def main():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'q': rng.randn(N_ROWS), 't': pd.date_range('2000-01-01', periods=N_ROWS, freq='min'),
+                       'n': np.array(list('abcdefgh'))[rng.randint(0, 8, N_ROWS)]})
+    for name, channel in CHANNELS:
+        chart = ChartMetadata(alt.Chart(df).mark_point().encode(channel))
+        _convert(chart)  # computes the dictionary encoding, once per chart
+        elapsed = min(timeit.repeat(lambda: _convert(chart), number=20, repeat=3)) / 20
+        print('{:>18}: {:8.1f} us'.format(name, elapsed * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark the memory held by the channels of a parsed chart.
+
+Parses a chart of a 1M row DataFrame whose x and color channels share a temporal column and whose
+shape and detail channels share a categorical column, with ``ChartMetadata``. Reports the peak memory
+allocated next to that of extracting and converting the data of each channel on its own, as the
+channels did before they shared the columns of ``ChartMetadata.store``, and the memory of the
+dictionary encoding of the categorical column.
+
+Run with ``python benchmarks/bench_channel_store.py``.
+"""
+import timeit
+import tracemalloc
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair._data import _convert_to_mpl_date
+from mplaltair.parse_chart import ChartMetadata, _compile_spec
+
+N_ROWS = 10**6
+
+
+def measure(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    elapsed = min(timeit.repeat(func, number=1, repeat=3))
+    return elapsed, peak
+
+
+def per_channel(df, encoding):
+    data = {}
+    for channel, (field, dtype) in encoding.items():
+        values = np.asarray(df[field].values)
+        data[channel] = _convert_to_mpl_date(values) if dtype == 'T' else values
+    return data
+
+
+def main():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'t': pd.date_range('2000-01-01', periods=N_ROWS, freq='min'), 'v': rng.randn(N_ROWS),
+                       'g': pd.Categorical.from_codes(rng.randint(0, 10, N_ROWS), list('abcdefghij'))})
+    encoding = {'x': ('t', 'T'), 'y': ('v', 'Q'), 'color': ('t', 'T'), 'shape': ('g', 'N'), 'detail': ('g', 'N')}
+    chart = alt.Chart(df).mark_point().encode(**{channel: '{}:{}'.format(*field) for channel, field in encoding.items()})
+    spec = _compile_spec(chart)
+
+    for name, func in [('per channel', lambda: per_channel(df, encoding)),
+                       ('ChartMetadata', lambda: ChartMetadata(chart, spec))]:
+        elapsed, peak = measure(func)
+        print('{:>13}: {:7.3f}s {:8.1f} MiB peak'.format(name, elapsed, peak / 2**20))
+    elapsed, peak = measure(lambda: ChartMetadata(chart, spec).encoding['shape'].codes)
+    print('{:>13}: {:7.3f}s {:8.1f} MiB peak'.format('+ codes', elapsed, peak / 2**20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark loading only the columns referenced by the encoding.
+
+A 200 column table is read through a CSV file URL, inline values and a DataFrame, once with
+every column and once restricted to the columns the encoding uses, as ``ChartMetadata`` does.
+Reports the time and the peak memory allocated while loading.
+
+Run with ``python benchmarks/bench_column_projection.py``.
+"""
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import _cache, _utils
+from mplaltair._data import _encoding_columns, _normalize_data
+from mplaltair.parse_chart import _compile_spec
+
+N_ROWS = 20000
+N_COLUMNS = 200
+
+
+def measure(func):
+    _utils._url_cache.clear()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    elapsed = min(timeit.repeat(lambda: (_utils._url_cache.clear(), func()), number=1, repeat=3))
+    return elapsed, peak
+
+
+def main():
+    # Keep the parsed files in memory only, so the on-disk cache doesn't interfere
+    _utils._url_cache = _cache._URLDataCache(None)
+
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.rand(N_ROWS, N_COLUMNS), columns=['col{}'.format(i) for i in range(N_COLUMNS)])
+    encoding = dict(x='col0:Q', y='col1:Q', color='col2:Q', size='col3:Q')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.csv')
+        df.to_csv(path, index=False)
+        sources = {
+            'CSV URL': alt.Chart('file://' + path),
+            'inline values': alt.Chart(alt.Data(values=df.to_dict(orient='records'))),
+            'DataFrame': alt.Chart(df),
+        }
+        for name, chart in sources.items():
+            chart = chart.mark_point().encode(**encoding)
+            spec = _compile_spec(chart)
+            columns = _encoding_columns(spec)
+            full = measure(lambda: _normalize_data(chart, spec))
+            projected = measure(lambda: _normalize_data(chart, spec, columns))
+            print('{:>13}: all {} columns {:7.3f}s {:8.1f} MiB peak, {} columns {:7.3f}s {:8.1f} MiB peak'.format(
+                name, N_COLUMNS, full[0], full[1] / 2**20, len(columns), projected[0], projected[1] / 2**20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Benchmark the memory used to parse a chart drawn from a DataFrame.
+
+Parses a point chart of 4 columns of a 1M row, 20 column DataFrame with ``ChartMetadata`` and
+reports the peak memory allocated, next to the peak of projecting the DataFrame on the columns
+of the encoding, as parsing did before the DataFrame was used as it is.
+
+Run with ``python benchmarks/bench_data_copy.py``.
+"""
+import timeit
+import tracemalloc
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair.parse_chart import ChartMetadata, _compile_spec
+
+N_ROWS = 10**6
+N_COLUMNS = 20
+
+
+def measure(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    elapsed = min(timeit.repeat(func, number=1, repeat=3))
+    return elapsed, peak
+
+
+def main():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.rand(N_ROWS, N_COLUMNS), columns=['col{}'.format(i) for i in range(N_COLUMNS)])
+    chart = alt.Chart(df).mark_point().encode(x='col0:Q', y='col1:Q', color='col2:Q', size='col3:Q')
+    spec = _compile_spec(chart)
+    keep = ['col0', 'col1', 'col2', 'col3']
+
+    print('data: {:.1f} MiB'.format(df.memory_usage().sum() / 2**20))
+    for name, func in [('projection', lambda: df[keep]), ('ChartMetadata', lambda: ChartMetadata(chart, spec))]:
+        elapsed, peak = measure(func)
+        print('{:>13}: {:7.3f}s {:8.1f} MiB peak'.format(name, elapsed, peak / 2**20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark decimation of huge line and scatter charts.
+
+Converts and draws a 2M point line chart and a 1M point scatter plot without decimation and with
+``max_points``, and reports the time to convert and draw, the number of points drawn and how much
+of the image differs from the full rendering (pixels with a channel off by more than 64/255).
+
+Run with ``python benchmarks/bench_decimation.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import convert
+
+N_LINE = 2000000
+N_SCATTER = 1000000
+
+
+def render(chart, **kwargs):
+    start = time.perf_counter()
+    fig, ax = convert(chart, pyplot=False, **kwargs)
+    fig.canvas.draw()
+    elapsed = time.perf_counter() - start
+    n_points = sum(len(line.get_xdata()) for line in ax.lines)
+    n_points += sum(len(collection.get_offsets()) for collection in ax.collections)
+    width, height = fig.canvas.get_width_height()
+    image = np.frombuffer(fig.canvas.tostring_rgb(), dtype=np.uint8).reshape(height, width, 3)
+    return elapsed, n_points, image.astype(int)
+
+
+def compare(name, chart, settings):
+    full_time, full_points, full_image = render(chart)
+    print('{}: full {:.2f}s, {} points'.format(name, full_time, full_points))
+    for kwargs in settings:
+        elapsed, n_points, image = render(chart, **kwargs)
+        changed = (np.abs(image - full_image).max(axis=-1) > 64).mean()
+        print('  {:<45} {:6.2f}s ({:5.1f}x), {:8d} points, {:6.3%} pixels changed'.format(
+            str(kwargs), elapsed, full_time / elapsed, n_points, changed))
+
+
+def main():
+    rng = np.random.RandomState(0)
+    line = pd.DataFrame({'x': np.arange(N_LINE), 'y': rng.randn(N_LINE).cumsum()})
+    line_chart = alt.Chart(line).mark_line().encode(alt.X('x'), alt.Y('y'))
+    compare('line', line_chart, [
+        {'max_points': 4000, 'decimation': 'minmax'},
+        {'max_points': 1000, 'decimation': 'minmax'},
+        {'max_points': 4000, 'decimation': 'lttb'},
+        {'max_points': 1000, 'decimation': 'lttb'},
+    ])
+
+    scatter = pd.DataFrame(rng.randn(N_SCATTER, 3), columns=['x', 'y', 'c'])
+    scatter_chart = alt.Chart(scatter).mark_point().encode(alt.X('x'), alt.Y('y'), alt.Color('c'))
+    compare('scatter', scatter_chart, [{'max_points': 100000}])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark the time it takes to import mplaltair.
+
+Runs ``python -X importtime -c "import mplaltair"`` in fresh interpreters and reports the
+cumulative import time of mplaltair, next to the modules it only imports on the first
+conversion. Exits with an error if importing mplaltair takes longer than ``--limit`` ms.
+
+Run with ``python benchmarks/bench_import_time.py [--limit MS]``.
+"""
+import argparse
+import subprocess
+import sys
+
+HEAVY = ['matplotlib.pyplot', 'altair', 'pandas']
+
+
+def import_time(statement, module, repeat=5):
+    """Best cumulative import time of ``module`` in ms, when running ``statement``."""
+    best = None
+    for _ in range(repeat):
+        stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                                stderr=subprocess.PIPE, check=True).stderr.decode()
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if name.strip() == module:
+                us = int(cumulative)
+                best = us if best is None else min(best, us)
+    return best / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--limit', type=float, default=50, help='maximum import time of mplaltair, in ms')
+    args = parser.parse_args()
+
+    mplaltair = import_time('import mplaltair', 'mplaltair')
+    print('{:>18}: {:8.1f} ms'.format('mplaltair', mplaltair))
+    for module in HEAVY:
+        print('{:>18}: {:8.1f} ms (deferred to the first conversion)'.format(
+            module, import_time('import ' + module, module)))
+    if mplaltair > args.limit:
+        sys.exit('importing mplaltair took {:.1f} ms, more than the {:.1f} ms limit'.format(mplaltair, args.limit))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark drawing many-series line charts as Line2Ds and as a single LineCollection.
+
+Converts and draws a line chart of 1000 and 5000 series of 20 points, colored by series, with
+the LineCollection threshold disabled and enabled, and reports the number of artists and the
+time to convert and to draw.
+
+Run with ``python benchmarks/bench_line_collection.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+import mplaltair._marks
+from mplaltair import convert
+
+N_POINTS = 20
+
+
+def make_chart(n_series):
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({
+        'x': np.tile(np.arange(N_POINTS), n_series),
+        'y': rng.randn(n_series * N_POINTS).cumsum(),
+        'series': np.repeat(np.arange(n_series), N_POINTS),
+    })
+    return alt.Chart(df).mark_line().encode(alt.X('x'), alt.Y('y'), alt.Color('series:N'))
+
+
+def measure(chart):
+    start = time.perf_counter()
+    fig, ax = convert(chart, pyplot=False)
+    converted = time.perf_counter()
+    fig.canvas.draw()
+    drawn = time.perf_counter()
+    return len(ax.lines) + len(ax.collections), converted - start, drawn - converted
+
+
+def main():
+    threshold = mplaltair._marks._LINE_COLLECTION_MIN_LINES
+    for n_series in [1000, 5000]:
+        chart = make_chart(n_series)
+        for name, min_lines in [('Line2D', np.inf), ('LineCollection', threshold)]:
+            mplaltair._marks._LINE_COLLECTION_MIN_LINES = min_lines
+            artists, convert_time, draw_time = measure(chart)
+            print('{:5d} series, {:>14}: {:5d} artists, convert {:6.2f}s, draw {:6.2f}s'.format(
+                n_series, name, artists, convert_time, draw_time))
+    mplaltair._marks._LINE_COLLECTION_MIN_LINES = threshold
+
+
+if __name__ == '__main__':
+    main()
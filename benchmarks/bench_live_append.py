@@ -0,0 +1,54 @@
+"""Benchmark appending rows to a live chart against converting the whole chart again.
+
+A line chart of a temporal series starts with 10k points and receives one new row at a time, as
+a monitoring dashboard does every second. Reports the latency per update of ``convert_live``'s
+``append`` and of a full ``convert`` of the grown DataFrame, without and with drawing the figure.
+
+Run with ``python benchmarks/bench_live_append.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import convert, convert_live
+
+N_ROWS = 10**4
+UPDATES = 50
+
+
+def make_rows(start, n):
+    rng = np.random.RandomState(start)
+    return pd.DataFrame({'t': pd.date_range('2000-01-01', periods=n, freq='s') + pd.Timedelta(seconds=start),
+                         'v': rng.randn(n).cumsum()})
+
+
+def main():
+    df = make_rows(0, N_ROWS)
+    updates = [make_rows(N_ROWS + i, 1) for i in range(UPDATES)]
+
+    for draw in [False, True]:
+        live = convert_live(alt.Chart(df).mark_line().encode(alt.X('t:T'), alt.Y('v')), pyplot=False)
+        start = time.perf_counter()
+        for rows in updates:
+            live.append(rows)
+            if draw:
+                live.fig.canvas.draw()
+        appended = (time.perf_counter() - start) / UPDATES
+
+        data = df
+        start = time.perf_counter()
+        for rows in updates:
+            data = pd.concat([data, rows], ignore_index=True)
+            fig, ax = convert(alt.Chart(data).mark_line().encode(alt.X('t:T'), alt.Y('v')), pyplot=False)
+            if draw:
+                fig.canvas.draw()
+        reconverted = (time.perf_counter() - start) / UPDATES
+
+        print('{:>12}: append {:7.2f} ms, convert {:7.2f} ms per update'.format(
+            'with draw' if draw else 'without draw', appended * 1e3, reconverted * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Benchmark the cache of parsed charts.
+
+Converts the same line chart of a 1M row DataFrame with a temporal x axis, as a dashboard
+refreshing it would, with and without ``cache=True``.
+
+Run with ``python benchmarks/bench_metadata_cache.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import cache_info, convert
+
+N_ROWS = 10**6
+REFRESHES = 5
+
+
+def refresh(chart, cache):
+    start = time.perf_counter()
+    for _ in range(REFRESHES):
+        convert(chart, pyplot=False, cache=cache)
+    return (time.perf_counter() - start) / REFRESHES
+
+
+def main():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'t': pd.date_range('2000-01-01', periods=N_ROWS, freq='min').astype(str),
+                       'v': rng.randn(N_ROWS).cumsum()})
+    chart = alt.Chart(df).mark_line().encode(alt.X('t:T'), alt.Y('v'))
+    print('without cache: {:.3f}s per refresh'.format(refresh(chart, False)))
+    print('with cache:    {:.3f}s per refresh'.format(refresh(chart, True)))
+    print(cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark scatter plots with nominal color and shape channels.
+
+Converts and draws a scatter plot of 100k points whose color and shape encode a 6-category nominal
+field, and reports the number of artists and the time to convert and to draw. For reference, it
+also draws the first 2000 points with one scatter per point, the only way to give points different
+markers without grouping them by shape.
+
+Run with ``python benchmarks/bench_nominal_scatter.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import convert
+from mplaltair._marks import _new_figure
+
+N_POINTS = 10**5
+N_PER_POINT = 2000
+CATEGORIES = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta']
+
+
+def main():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'x': rng.randn(N_POINTS), 'y': rng.randn(N_POINTS),
+                       'kind': np.array(CATEGORIES)[rng.randint(0, len(CATEGORIES), N_POINTS)]})
+    chart = alt.Chart(df).mark_point().encode(alt.X('x'), alt.Y('y'), alt.Color('kind:N'), alt.Shape('kind:N'))
+
+    start = time.perf_counter()
+    fig, ax = convert(chart, pyplot=False)
+    converted = time.perf_counter()
+    fig.canvas.draw()
+    drawn = time.perf_counter()
+    print('by shape:  {:>6} artists, convert {:.3f}s, draw {:.3f}s'.format(
+        len(ax.collections), converted - start, drawn - converted))
+
+    markers = dict(zip(CATEGORIES, ['o', 's', 'P', 'D', '^', 'v']))
+    fig, ax = _new_figure()
+    start = time.perf_counter()
+    for x, y, kind in df.head(N_PER_POINT).itertuples(index=False):
+        ax.scatter([x], [y], marker=markers[kind])
+    converted = time.perf_counter()
+    fig.canvas.draw()
+    drawn = time.perf_counter()
+    print('per point: {:>6} artists, convert {:.3f}s, draw {:.3f}s ({} points)'.format(
+        len(ax.collections), converted - start, drawn - converted, N_PER_POINT))
+
+
+if __name__ == '__main__':
+    main()
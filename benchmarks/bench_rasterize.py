@@ -0,0 +1,45 @@
+"""Benchmark rasterized scatter plots against path collections.
+
+Converts and draws scatter plots of 100k to 10M points colored by a quantitative field, as a
+scatter plot (up to 1M points) and as an image, and reports the time and the peak memory
+allocated during the conversion and drawing (on top of the data itself).
+
+Run with ``python benchmarks/bench_rasterize.py``.
+"""
+import time
+import tracemalloc
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import convert
+
+
+def measure(chart, rasterize):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fig, ax = convert(chart, pyplot=False, rasterize=rasterize)
+    fig.canvas.draw()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    rng = np.random.RandomState(0)
+    for n in [10**5, 10**6, 10**7]:
+        df = pd.DataFrame(rng.randn(n, 3), columns=['x', 'y', 'c'])
+        chart = alt.Chart(df).mark_point().encode(alt.X('x'), alt.Y('y'), alt.Color('c'))
+        data_mb = df.memory_usage().sum() / 2**20
+        for rasterize in [False, True]:
+            if not rasterize and n > 10**6:
+                continue
+            elapsed, peak = measure(chart, rasterize)
+            print('{:9d} points ({:5.0f} MB), {:>7}: {:7.2f}s, peak {:7.1f} MB'.format(
+                n, data_mb, 'image' if rasterize else 'scatter', elapsed, peak))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark the scaling of render_batch over worker processes.
+
+Renders 64 scatter and line charts, sharing a 20k row DataFrame, to PNG files with 1, 2, 4
+and 8 workers.
+
+Run with ``python benchmarks/bench_render_batch.py``.
+"""
+import tempfile
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import render_batch
+
+N_CHARTS = 64
+N_ROWS = 20000
+
+
+def make_charts():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.rand(N_ROWS, 4), columns=list('abcd'))
+    df['t'] = pd.date_range('2000-01-01', periods=N_ROWS, freq='min')
+    charts = []
+    for i in range(N_CHARTS):
+        if i % 2:
+            charts.append(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'), alt.Color('c')))
+        else:
+            charts.append(alt.Chart(df).mark_line().encode(alt.X('t'), alt.Y('d')))
+    return charts
+
+
+def main():
+    charts = make_charts()
+    baseline = None
+    for workers in [1, 2, 4, 8]:
+        with tempfile.TemporaryDirectory() as out_dir:
+            start = time.perf_counter()
+            results = render_batch(charts, out_dir, workers=workers)
+            elapsed = time.perf_counter() - start
+        assert all(error is None for _, error in results)
+        baseline = baseline or elapsed
+        print('{} workers: {:7.2f}s, {:5.1f} charts/s, speedup {:4.2f}x'.format(
+            workers, elapsed, N_CHARTS / elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark the compilation of the chart specification in ``ChartMetadata``.
+
+Counts the ``to_dict()`` calls made while parsing a chart with inline DataFrame data and
+compares the parsing time with the cost of the ``2 + 3 * n_channels`` full ``to_dict()``
+calls that were previously made per conversion.
+
+Run with ``python benchmarks/bench_spec_compilation.py``.
+"""
+import timeit
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair.parse_chart import ChartMetadata
+
+alt.data_transformers.enable('default', max_rows=None)
+
+
+def make_chart(n_rows):
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({
+        'a': rng.rand(n_rows), 'b': rng.rand(n_rows), 'c': rng.rand(n_rows), 's': rng.rand(n_rows),
+    })
+    return alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'), alt.Color('c'), alt.Size('s'))
+
+
+def count_to_dict_calls(chart):
+    calls = []
+    to_dict = alt.Chart.to_dict
+
+    def counting_to_dict(self, *args, **kwargs):
+        calls.append(self)
+        return to_dict(self, *args, **kwargs)
+
+    alt.Chart.to_dict = counting_to_dict
+    try:
+        ChartMetadata(chart)
+    finally:
+        alt.Chart.to_dict = to_dict
+    return len(calls)
+
+
+def main():
+    for n_rows in [1000, 10000, 50000]:
+        chart = make_chart(n_rows)
+        n_channels = len(chart.to_dict()['encoding'])
+        legacy_calls = 2 + 3 * n_channels
+
+        calls = count_to_dict_calls(chart)
+        parse = min(timeit.repeat(lambda: ChartMetadata(chart), number=1, repeat=3))
+        to_dict = min(timeit.repeat(chart.to_dict, number=1, repeat=3))
+
+        print('{:>6} rows: to_dict() calls {:>2} (was {:>2}), ChartMetadata {:8.4f}s '
+              '(was >= {:8.4f}s in to_dict() alone)'.format(
+                  n_rows, calls, legacy_calls, parse, legacy_calls * to_dict))
+
+
+if __name__ == '__main__':
+    main()
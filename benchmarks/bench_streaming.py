@@ -0,0 +1,52 @@
+"""Benchmark the frame rate of a streaming chart.
+
+A line chart keeps the last 10k rows of a series and receives one new row per frame. Reports the
+frames per second of ``convert_stream`` redrawing by blitting, of the same chart redrawn in full
+with ``canvas.draw()``, and of converting the window again for each frame, on the Agg canvas, and
+the memory held by the ring buffer, which doesn't depend on the number of frames.
+
+Run with ``python benchmarks/bench_streaming.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import convert, convert_stream
+
+WINDOW = 10**4
+FRAMES = 100
+
+
+def main():
+    rng = np.random.RandomState(0)
+    values = rng.randn(WINDOW + FRAMES).cumsum()
+    df = pd.DataFrame({'x': np.arange(WINDOW, dtype=float), 'y': values[:WINDOW]})
+    frames = [{'x': [float(WINDOW + i)], 'y': [values[WINDOW + i]]} for i in range(FRAMES)]
+    chart = alt.Chart(df).mark_line().encode(alt.X('x'), alt.Y('y'))
+
+    for name in ['blit', 'full draw']:
+        stream = convert_stream(chart, WINDOW, pyplot=False)
+        stream.blit()
+        start = time.perf_counter()
+        for rows in frames:
+            stream.append(rows)
+            if name == 'blit':
+                stream.blit()
+            else:
+                stream.fig.canvas.draw()
+        print('{:>10}: {:7.1f} fps'.format(name, FRAMES / (time.perf_counter() - start)))
+    print('ring buffer: {:.1f} KiB'.format(stream._ring.nbytes / 2**10))
+
+    data = df
+    start = time.perf_counter()
+    for rows in frames:
+        data = pd.concat([data.iloc[1:], pd.DataFrame(rows)], ignore_index=True)
+        fig, ax = convert(alt.Chart(data).mark_line().encode(alt.X('x'), alt.Y('y')), pyplot=False)
+        fig.canvas.draw()
+    print('{:>10}: {:7.1f} fps'.format('convert', FRAMES / (time.perf_counter() - start)))
+
+
+if __name__ == '__main__':
+    main()
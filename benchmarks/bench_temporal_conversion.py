@@ -0,0 +1,43 @@
+"""Benchmark the conversion of temporal columns to Matplotlib dates.
+
+Measures the throughput of ``_convert_to_mpl_date`` for datetime64 arrays, pandas datetime
+Series and ISO-8601 string arrays at 10^4, 10^6 and 10^7 rows, and compares it with the
+element by element conversion at 10^4 rows.
+
+Run with ``python benchmarks/bench_temporal_conversion.py``.
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from mplaltair._data import _convert_to_mpl_date
+
+
+def columns(n_rows):
+    dates = pd.Series(pd.date_range('2000-01-01', periods=n_rows, freq='min'))
+    return {
+        'datetime64': dates.values,
+        'Series': dates,
+        'ISO strings': dates.dt.strftime('%Y-%m-%dT%H:%M:%S').values,
+    }
+
+
+def per_element(data):
+    return np.asarray([_convert_to_mpl_date(i) for i in np.asarray(data)])
+
+
+def main():
+    for n_rows in [10**4, 10**6, 10**7]:
+        for kind, column in columns(n_rows).items():
+            elapsed = min(timeit.repeat(lambda: _convert_to_mpl_date(column), number=1, repeat=3))
+            line = '{:>9} rows {:>12}: {:8.4f}s ({:>12,.0f} rows/s)'.format(
+                n_rows, kind, elapsed, n_rows / elapsed)
+            if n_rows == 10**4:
+                legacy = min(timeit.repeat(lambda: per_element(column), number=1, repeat=3))
+                line += ', per element {:8.4f}s'.format(legacy)
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark time unit truncation and time-bucketed aggregates at 10^7 rows.
+
+Truncates 10M timestamps to the 'yearmonth', 'hours' and 'day' time units, and compares with
+pandas (``dt.floor``/``dt.to_period`` and friends) and with truncating Python datetime objects
+(timed on 100k rows and scaled up). Then converts line charts of the sum of a field by each time
+unit, which truncate and aggregate in one pass.
+
+Run with ``python benchmarks/bench_time_units.py``.
+"""
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from mplaltair import convert
+from mplaltair._data import _truncate_dates
+
+N_ROWS = 10**7
+N_PYTHON = 10**5
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def python_truncate(dates, time_unit):
+    if time_unit == 'yearmonth':
+        return [d.replace(day=1, hour=0, minute=0, second=0, microsecond=0) for d in dates]
+    if time_unit == 'hours':
+        return [d.replace(year=2012, month=1, day=1, minute=0, second=0, microsecond=0) for d in dates]
+    return [pd.Timestamp(2012, 1, 1 + (d.weekday() + 1) % 7) for d in dates]
+
+
+PANDAS = {
+    'yearmonth': lambda s: s.dt.to_period('M').dt.start_time,
+    'hours': lambda s: pd.Timestamp('2012-01-01') + pd.to_timedelta(s.dt.hour, unit='h'),
+    'day': lambda s: pd.Timestamp('2012-01-01') + pd.to_timedelta((s.dt.dayofweek + 1) % 7, unit='D'),
+}
+
+
+def main():
+    rng = np.random.RandomState(0)
+    start = np.datetime64('2010-01-01', 's').astype(np.int64)
+    seconds = start + rng.randint(0, 10 * 365 * 86400, N_ROWS)
+    df = pd.DataFrame({'t': seconds.astype('M8[s]').astype('M8[ns]'), 'v': rng.rand(N_ROWS)})
+    dates = df['t'].values
+    python_dates = list(df['t'][:N_PYTHON].dt.to_pydatetime())
+
+    for time_unit in ['yearmonth', 'hours', 'day']:
+        numpy_time, result = timed(_truncate_dates, dates, time_unit)
+        pandas_time, expected = timed(PANDAS[time_unit], df['t'])
+        assert (result == expected.values).all()
+        python_time = timed(python_truncate, python_dates, time_unit)[0] * N_ROWS / N_PYTHON
+        chart = alt.Chart(df).mark_line().encode(alt.X('{}(t):T'.format(time_unit)), alt.Y('sum(v)'))
+        chart_time = timed(convert, chart, None, False)[0]
+        print('{:>9}: datetime64 {:5.2f}s, pandas {:5.2f}s, datetime ~{:6.1f}s, sum chart {:5.2f}s'.format(
+            time_unit, numpy_time, pandas_time, python_time, chart_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,28 @@
-import mplaltair.parse_chart
-import matplotlib
-import altair
-import matplotlib.pyplot as plt
-from ._convert import _convert
-from ._axis import convert_axis
-from ._marks import _handle_line
+"""Convert Altair charts to Matplotlib figures
 
+Importing mplaltair is cheap: Altair, pandas and Matplotlib are only imported by the first
+conversion, so that command line tools and short-lived processes that may not convert anything
+don't pay for them.
+"""
+import importlib
+import sys
+import types
 
-def convert(alt_chart):
+
+class _Module(types.ModuleType):
+    """The class of the mplaltair module, which imports submodules such as mplaltair.parse_chart on
+    first access. Unlike a module ``__getattr__`` (PEP 562), this works before Python 3.7."""
+
+    def __getattr__(self, name):
+        if name in ('parse_chart',):
+            return importlib.import_module('.' + name, __name__)
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+sys.modules[__name__].__class__ = _Module
+
+
+def convert(alt_chart, ax=None, pyplot=True, max_points=None, decimation='minmax', rasterize=None, cache=False):
     """Convert an altair encoding to a Matplotlib figure
 
 
@@ -15,6 +30,30 @@ def convert(alt_chart):
     ----------
     chart
         The Altair chart object generated by Altair
+    ax : matplotlib.axes, optional
+        The axes to draw the chart on. A new figure is created if not given.
+    pyplot : bool, optional
+        Whether a new figure is created with pyplot. If False, the figure has an Agg canvas and
+        isn't registered with pyplot, so it is freed once it is no longer referenced and
+        conversions can run concurrently in several threads. Ignored if ``ax`` is given.
+    max_points : int, optional
+        Decimate the data before drawing it: each line with more points than this is reduced to
+        at most ``max_points`` points, and a scatter plot with more points than this only keeps
+        the top-most point of each pixel. Disabled by default.
+    decimation : {'minmax', 'lttb'}, optional
+        How lines are decimated. 'minmax' keeps the first, last, lowest and highest point of each
+        pixel column (at the figure DPI, up to ``max_points // 4`` columns), which looks the same as
+        the full line. 'lttb' (Largest-Triangle-Three-Buckets) keeps exactly ``max_points`` points
+        that preserve the shape of the line.
+    rasterize : bool, optional
+        Whether a scatter plot is drawn as an image with one pixel per bin of points (at the figure
+        DPI), showing the number of points in each bin, or their average color if the chart has a
+        quantitative color channel. By default, it is for scatter plots of at least a million points.
+    cache : bool, optional
+        Whether the parsed chart (its data, once loaded, transformed and converted) is kept in an
+        LRU cache and reused by the following conversions of an identical chart with ``cache=True``:
+        one with the same specification drawn from the same DataFrame object, URL or inline values.
+        Changes made to a DataFrame in place are not detected, call ``clear_cache()`` after them.
 
     Returns
     -------
@@ -23,16 +62,244 @@ def convert(alt_chart):
     ax : matplotlib.axes
 
     """
-    chart = mplaltair.parse_chart.ChartMetadata(alt_chart)
-    fig, ax = plt.subplots()
-
-    if chart.mark in ['point', 'circle', 'square']:  # scatter
-        mapping = _convert(chart)
-        ax.scatter(**mapping)
-    elif chart.mark == 'line':  # line
-        _handle_line(chart, ax)
+    from ._marks import _draw, _new_figure
+    from .parse_chart import ChartMetadata, _cached_metadata
+
+    chart = _cached_metadata(alt_chart) if cache else ChartMetadata(alt_chart)
+    if ax is not None:
+        _draw(chart, ax, max_points, decimation, rasterize)
+        return ax.figure, ax
+
+    if pyplot:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots()
     else:
-        raise NotImplementedError
-    convert_axis(ax, chart)
+        fig, ax = _new_figure()
+    _draw(chart, ax, max_points, decimation, rasterize)
     fig.tight_layout()
     return fig, ax
+
+
+def convert_live(alt_chart, ax=None, pyplot=True):
+    """Convert an Altair chart to a Matplotlib figure whose data can be appended to
+
+    The returned chart is drawn like ``convert`` draws it. Rows appended to it are drawn by
+    updating its artist in place, e.g. for a dashboard that receives new data every second,
+    without parsing the chart or creating a figure again.
+
+    Only point charts with quantitative or temporal channels and line charts of a single line are
+    supported, without transforms, aggregates, bins or time units.
+
+    Parameters
+    ----------
+    chart
+        The Altair chart object generated by Altair
+    ax : matplotlib.axes, optional
+        The axes to draw the chart on. A new figure is created if not given.
+    pyplot : bool, optional
+        Whether a new figure is created with pyplot (see ``convert``). Ignored if ``ax`` is given.
+
+    Returns
+    -------
+    live : mplaltair._live.LiveChart
+        Its ``fig`` and ``ax`` attributes are the figure and the axes. ``live.append(rows)``
+        appends rows to the data of the chart; the figure must then be drawn again.
+    """
+    from ._live import LiveChart
+    from ._marks import _new_figure
+    from .parse_chart import ChartMetadata
+
+    chart = ChartMetadata(alt_chart)
+    if ax is not None:
+        return LiveChart(chart, ax)
+
+    if pyplot:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots()
+    else:
+        fig, ax = _new_figure()
+    live = LiveChart(chart, ax)
+    fig.tight_layout()
+    return live
+
+
+def convert_stream(alt_chart, window, ax=None, pyplot=True):
+    """Convert an Altair chart to a Matplotlib figure that streams its data, for real-time charts
+
+    Like ``convert_live``, rows can be appended to the returned chart, but only the last ``window``
+    rows are kept, in a fixed amount of memory, and they are redrawn by blitting: the axes, ticks
+    and labels are drawn once and cached, and only the data is drawn on each update. The axis
+    limits are only set again, with a full draw, when new data falls outside of them.
+
+    Parameters
+    ----------
+    chart
+        The Altair chart object generated by Altair. The same charts as ``convert_live`` are supported.
+    window : int
+        The number of rows kept and drawn
+    ax : matplotlib.axes, optional
+        The axes to draw the chart on. A new figure is created if not given.
+    pyplot : bool, optional
+        Whether a new figure is created with pyplot (see ``convert``). Ignored if ``ax`` is given.
+
+    Returns
+    -------
+    stream : mplaltair._live.StreamingChart
+        ``stream.append(rows)`` appends rows and ``stream.blit()`` draws them. It also plugs into
+        ``FuncAnimation(stream.fig, stream.update, frames=..., init_func=stream.init, blit=True)``,
+        whose frames are the rows to append.
+    """
+    from ._live import StreamingChart
+    from ._marks import _new_figure
+    from .parse_chart import ChartMetadata
+
+    chart = ChartMetadata(alt_chart)
+    if ax is not None:
+        return StreamingChart(chart, ax, window)
+
+    if pyplot:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots()
+    else:
+        fig, ax = _new_figure()
+    stream = StreamingChart(chart, ax, window)
+    fig.tight_layout()
+    return stream
+
+
+def convert_many(charts, reuse_figure=False):
+    """Convert many Altair charts to Matplotlib figures
+
+    The charts are compiled and converted one at a time, as they are requested, so that the memory
+    used doesn't grow with the number of charts. Charts drawing from the same data source (the same
+    DataFrame, URL or inline values) share it: the source is loaded and normalized once, or again
+    when a chart uses columns that weren't loaded yet, and converted columns are reused from one
+    chart to the next. Only the few most recently used sources are kept.
+
+    The figures are not registered with pyplot, so they are freed as soon as they are no longer
+    referenced.
+
+    Parameters
+    ----------
+    charts : iterable of altair.Chart
+        The Altair charts
+    reuse_figure : bool, optional
+        If True, the same figure is cleared and drawn again for every chart instead of creating a
+        new figure for each of them. Each figure must then be saved or otherwise used before the
+        next one is requested.
+
+    Yields
+    ------
+    fig : matplotlib.figure
+
+    ax : matplotlib.axes
+
+    """
+    from ._marks import _draw, _new_figure
+    from .parse_chart import _BatchSources
+
+    sources = _BatchSources()
+    fig = None
+    for alt_chart in charts:
+        chart = sources.chart(alt_chart)
+        if fig is None or not reuse_figure:
+            fig, ax = _new_figure()
+        else:
+            fig.clf()
+            ax = fig.add_subplot(111)
+        _draw(chart, ax)
+        fig.tight_layout()
+        yield fig, ax
+
+
+def render_batch(charts, out_dir, fmt='png', workers=None, **savefig_kwargs):
+    """Render Altair charts to image files, in parallel
+
+    The charts are spread over a pool of worker processes that draw with the Agg backend, without
+    pyplot. Every data source is loaded once, in this process, and sent once to each worker; the
+    charts themselves are sent as compiled specifications.
+
+    A chart that fails to convert or render does not affect the others: its error is returned.
+
+    Parameters
+    ----------
+    charts : iterable of altair.Chart
+        The Altair charts
+    out_dir : str
+        The directory the images are written to, as ``chart-<index>.<fmt>``
+    fmt : str, optional
+        The image format, as accepted by ``savefig``
+    workers : int, optional
+        The number of worker processes. Defaults to the number of CPUs. With a single worker the
+        charts are rendered in this process.
+    **savefig_kwargs
+        Passed on to ``savefig``
+
+    Returns
+    -------
+    results : list of (str, Exception or None)
+        The path of the image of each chart, in order, and the error that prevented it from being
+        rendered, if any
+    """
+    import multiprocessing
+    import os
+    from ._data import _normalize_data
+    from ._render import _init_worker, _render_chart
+    from .parse_chart import _compile_batch
+
+    charts = list(charts)
+    specs, keys, columns, errors = _compile_batch(charts)
+    sources, source_errors = {}, {}
+    for alt_chart, spec, key in zip(charts, specs, keys):
+        if key is None or key in sources or key in source_errors:
+            continue
+        try:
+            sources[key] = _normalize_data(alt_chart, spec, columns[key])
+        except Exception as err:
+            # Every chart of a source that can't be loaded fails with its error
+            source_errors[key] = err
+    errors = [source_errors.get(key) if error is None else error for key, error in zip(keys, errors)]
+
+    os.makedirs(out_dir, exist_ok=True)
+    savefig_kwargs['format'] = fmt
+    paths = [os.path.join(out_dir, 'chart-{}.{}'.format(i, fmt)) for i in range(len(charts))]
+    tasks = [(i, spec, key, path, savefig_kwargs)
+             for i, (spec, key, path, error) in enumerate(zip(specs, keys, paths, errors)) if error is None]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        _init_worker(sources)
+        try:
+            for task in tasks:
+                index, errors[index] = _render_chart(task)
+        finally:
+            _init_worker({})
+    else:
+        with multiprocessing.Pool(workers, _init_worker, (sources,)) as pool:
+            for index, error in pool.imap_unordered(_render_chart, tasks):
+                errors[index] = error
+    return list(zip(paths, errors))
+
+
+def clear_cache():
+    """Clears the cache of data downloaded from chart URLs, in memory and on disk, and the cache of
+    parsed charts (see ``convert``)."""
+    from ._cache import _metadata_cache, _url_cache
+    _url_cache.clear()
+    _metadata_cache.clear()
+
+
+def cache_info():
+    """Statistics of the cache of parsed charts (see ``convert``)
+
+    Returns
+    -------
+    dict
+        The number of ``hits`` and ``misses`` of the cache since it was last cleared, the number
+        of parsed charts it holds (``entries``) and its bound (``max_entries``)
+    """
+    from ._cache import _metadata_cache
+    return {'hits': _metadata_cache.hits, 'misses': _metadata_cache.misses, 'entries': len(_metadata_cache),
+            'max_entries': _metadata_cache.max_entries}
@@ -42,11 +42,11 @@ def _set_limits(channel, mark, ax):
                 pass
             else:
                 # Check that a positive minimum is zero if scale.zero is True:
-                if ('zero' not in channel.scale or channel.scale['zero'] == True) and min(channel.data) > 0:
+                if ('zero' not in channel.scale or channel.scale['zero'] == True) and np.min(channel.data) > 0:
                     lims[_axis_kwargs[channel.name].get('min')] = 0  # quantitative sets min to be 0 by default
 
                 # Check that a negative maximum is zero if scale.zero is True:
-                if ('zero' not in channel.scale or channel.scale['zero'] == True) and max(channel.data) < 0:
+                if ('zero' not in channel.scale or channel.scale['zero'] == True) and np.max(channel.data) < 0:
                     lims[_axis_kwargs[channel.name].get('max')] = 0
 
     elif channel.type == 'temporal':
@@ -210,7 +210,7 @@ def _set_label_angle(channel, ax):
             label.set_ha('right')
 
 
-def convert_axis(ax, chart):
+def convert_axis(ax, chart, limits=True):
     """Convert elements of the altair chart to Matplotlib axis properties
 
     Parameters
@@ -219,10 +219,13 @@ def convert_axis(ax, chart):
         The Matplotlib axis to be modified
     chart : parse_chart.ChartMetadata
         The chart data and metadata
+    limits : bool, optional
+        Whether the axis limits are set from the data
     """
 
     for channel in [chart.encoding['x'], chart.encoding['y']]:
-        _set_limits(channel, chart.mark, ax)
+        if limits:
+            _set_limits(channel, chart.mark, ax)
         _set_tick_locator(channel, ax)
         _set_tick_formatter(channel, ax)
         _set_label_angle(channel, ax)
@@ -0,0 +1,265 @@
+import collections
+import hashlib
+import os
+import pickle
+import threading
+import time
+import weakref
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import matplotlib
+
+
+class _URLDataCache(object):
+    """Cache of the DataFrames parsed from data URLs.
+
+    Parsed DataFrames are kept in an in-process LRU bounded by their total size in bytes, and
+    pickled to ``cachedir`` so that they survive the process. An entry younger than ``ttl``
+    seconds is used as is. Older entries are revalidated with the server through ``ETag`` and
+    ``Last-Modified``, and only downloaded and parsed again when the server says they changed.
+
+    Parameters
+    ----------
+    cachedir : str or None
+        Directory of the on-disk cache. No on-disk cache is kept if None.
+    max_bytes : int
+        Bound on the total size of the DataFrames held in memory
+    ttl : float
+        Number of seconds during which an entry is used without revalidation
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups answered without downloading the data
+    misses : int
+        Number of lookups that downloaded the data
+    """
+
+    def __init__(self, cachedir, max_bytes=256 * 2**20, ttl=3600):
+        self.cachedir = cachedir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, url, reader, key=None):
+        """Returns the DataFrame for the url, downloading and parsing it only if needed.
+
+        Parameters
+        ----------
+        url : str
+            URL of the file
+        reader : callable
+            Parses the file object of the response into a DataFrame
+        key : str, optional
+            Key of the entry, when the same url is read in more than one way. Defaults to the url.
+
+        Returns
+        -------
+        pd.DataFrame
+            The cached DataFrame. It is shared between callers and must not be modified.
+        """
+        if key is None:
+            key = url
+        entry = self._get(key)
+        if entry is not None and time.time() - entry['fetched'] < self.ttl:
+            self.hits += 1
+            return entry['df']
+
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            response = urlopen(Request(url, headers=headers))
+        except HTTPError as err:
+            if err.code != 304 or entry is None:
+                raise
+            self.hits += 1
+            entry['fetched'] = time.time()
+            self._put(key, entry)
+            return entry['df']
+
+        self.misses += 1
+        with response:
+            entry = {
+                'df': reader(response),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched': time.time(),
+            }
+        self._put(key, entry)
+        return entry['df']
+
+    def clear(self):
+        """Empties the in-memory and the on-disk cache."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = self.misses = 0
+        if self.cachedir is None or not os.path.isdir(self.cachedir):
+            return
+        for name in os.listdir(self.cachedir):
+            if name.endswith('.pkl'):
+                try:
+                    os.remove(os.path.join(self.cachedir, name))
+                except OSError:
+                    pass
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.cachedir is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            self._remember(key, entry)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # An unreadable entry, e.g. pickled by other versions of pandas or numpy, is downloaded again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _put(self, key, entry):
+        self._remember(key, entry)
+        if self.cachedir is None:
+            return
+        # Write to a temporary file first so that concurrent readers never see a partial entry.
+        path = self._path(key)
+        tmp = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(self.cachedir, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:  # the on-disk cache is best effort, e.g. on read-only file systems
+            pass
+
+    def _remember(self, key, entry):
+        nbytes = int(entry['df'].memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= old['nbytes']
+            entry['nbytes'] = nbytes
+            self._entries[key] = entry
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted['nbytes']
+
+
+_url_cache = _URLDataCache(os.path.join(matplotlib.get_cachedir(), 'mplaltair'))
+
+
+class _MetadataCache(object):
+    """LRU cache of parsed charts (``parse_chart.ChartMetadata``), bounded by their number.
+
+    Entries can be tied to the DataFrame they were parsed from: they are dropped as soon as it is
+    garbage collected, since its identity is part of their key and may be reused by a new DataFrame.
+    A parsed chart drawn straight from its DataFrame holds the DataFrame itself, which then lives as
+    long as the entry.
+
+    Parameters
+    ----------
+    max_entries : int
+        Bound on the number of parsed charts held
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups answered from the cache
+    misses : int
+        Number of lookups that parsed the chart
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Keys of the entries whose DataFrame was collected. The finalizers only append to it, since
+        # they can run while the lock is held, e.g. when dropping an entry frees a DataFrame.
+        self._collected = []
+
+    def __len__(self):
+        with self._lock:
+            self._purge()
+            return len(self._entries)
+
+    def get(self, key, parse, source=None, ttl=None):
+        """Returns the parsed chart of the key, parsing it only if it isn't cached
+
+        Parameters
+        ----------
+        key : hashable
+            Identifies the specification and the data of the chart
+        parse : callable
+            Parses the chart when it isn't cached
+        source : pd.DataFrame, optional
+            The DataFrame the chart is drawn from. The entry is dropped when it is garbage collected.
+        ttl : float, optional
+            Number of seconds during which the entry is used, e.g. for data downloaded from a URL,
+            which may change. Entries are used until they are evicted by default.
+
+        Returns
+        -------
+        ChartMetadata
+            The cached parsed chart. It is shared between callers and must not be modified.
+        """
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(key)
+            if entry is not None and (entry['expires'] is None or time.time() < entry['expires']):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['metadata']
+            self.misses += 1
+
+        metadata = parse()
+        entry = {'metadata': metadata, 'expires': None if ttl is None else time.time() + ttl}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if source is not None:
+            weakref.finalize(source, self._forget, key)
+        return metadata
+
+    def _forget(self, key):
+        self._collected.append(key)
+
+    def _purge(self):
+        """Drops the entries whose DataFrame was collected. The lock must be held."""
+        while self._collected:
+            self._entries.pop(self._collected.pop(), None)
+
+    def clear(self):
+        """Empties the cache and resets its counters."""
+        with self._lock:
+            self._entries.clear()
+            del self._collected[:]
+            self.hits = self.misses = 0
+
+
+_metadata_cache = _MetadataCache()
@@ -1,80 +1,169 @@
+import matplotlib
+import matplotlib.cm
+import matplotlib.colors as mcolors
+import numpy as np
+
+# The markers of vega-lite's default shape palette: circle, square, cross, diamond and triangles
+_SHAPES = ['o', 's', 'P', 'D', '^', 'v', '>', '<']
+
+
+def _color_cycle(n):
+    """The first n colors of the property cycle, as ax.plot would pick them for n new lines
+
+    Parameters
+    ----------
+    n : int
+
+    Returns
+    -------
+    list of colors
+    """
+    colors = matplotlib.rcParams['axes.prop_cycle'].by_key().get('color', [matplotlib.rcParams['lines.color']])
+    return [colors[i % len(colors)] for i in range(n)]
+
+
+def _category_colors(channel):
+    """The color of each row of a nominal channel, looked up from a table with a color per category
+
+    Parameters
+    ----------
+    channel : parse_chart.ChannelMetadata
+
+    Returns
+    -------
+    np.array
+        The RGBA color of each row. Rows with missing values are transparent.
+    """
+    table = mcolors.to_rgba_array(_color_cycle(len(channel.categories)) + ['none'])
+    return table[channel.codes]  # the code of missing values, -1, picks the transparent last row
+
+
+def _ordered_values(channel):
+    """The values of an ordinal channel to map through a colormap: its numbers, or the rank of its values"""
+    if np.issubdtype(channel.data.dtype, np.number):
+        return channel.data
+    return channel.codes
+
+
+def _ordered_colors(channel):
+    """The color of each row of an ordinal channel, looked up from a table sampling the colormap by rank
+
+    Parameters
+    ----------
+    channel : parse_chart.ChannelMetadata
+
+    Returns
+    -------
+    np.array
+        The RGBA color of each row. Rows with missing values are transparent.
+    """
+    cmap = matplotlib.cm.get_cmap(matplotlib.rcParams['image.cmap'])
+    table = np.vstack([cmap(np.linspace(0, 1, len(channel.categories))), mcolors.to_rgba_array(['none'])])
+    return table[channel.codes]
+
+
+def _category_markers(channel):
+    """The shape of each category of a channel
+
+    Parameters
+    ----------
+    channel : parse_chart.ChannelMetadata
+
+    Returns
+    -------
+    codes : np.array
+        The category of each row, -1 for missing values (see ``_data._ColumnStore.encoded``)
+    markers : list
+        The marker of each category, cycling through ``_SHAPES``
+    """
+    return channel.codes, [_SHAPES[i % len(_SHAPES)] for i in range(len(channel.categories))]
+
 
 def _allowed_ranged_marks(enc_channel, mark):
     """TODO: DOCS
     """
     return mark in ['area', 'bar', 'rect', 'rule'] if enc_channel in ['x2', 'y2'] else True
 
-def _process_x(dtype, data):
+def _process_x(channel):
     """Returns the MPL encoding equivalent for Altair x channel
     """
-    return ('x', data)
+    return ('x', channel.data)
 
 
-def _process_y(dtype, data):
+def _process_y(channel):
     """Returns the MPL encoding equivalent for Altair y channel
     """
-    return ('y', data)
+    return ('y', channel.data)
 
 
-def _process_x2(dtype, data):
+def _process_x2(channel):
     """Returns the MPL encoding equivalent for Altair x2 channel
     """
     raise NotImplementedError
 
 
-def _process_y2(dtype, data):
+def _process_y2(channel):
     """Returns the MPL encoding equivalent for Altair y2 channel
     """
     raise NotImplementedError
 
 
-def _process_color(dtype, data):
+def _process_color(channel):
     """Returns the MPL encoding equivalent for Altair color channel
     """
-    if dtype == 'quantitative':
-        return ('c', data)
-    elif dtype == 'nominal':
-        raise NotImplementedError
-    elif dtype == 'ordinal':
-        return ('c', data)
+    if channel.type == 'quantitative':
+        return ('c', channel.data)
+    elif channel.type == 'nominal':
+        return ('c', _category_colors(channel))
+    elif channel.type == 'ordinal':
+        return ('c', _ordered_values(channel))
     else:  # temporal
-        return ('c', data)
+        return ('c', channel.data)
 
 
-def _process_fill(dtype, data):
+def _process_fill(channel):
     """Returns the MPL encoding equivalent for Altair fill channel
     """
-    return _process_color(dtype, data)
+    return _process_color(channel)
 
 
-def _process_shape(dtype, data):
+def _process_shape(channel):
     """Returns the MPL encoding equivalent for Altair shape channel
+
+    The markers are given as the category of each point and the marker of each category, since
+    scatter() only takes one marker: the points are drawn with a scatter per category.
     """
+    if channel.type in ['nominal', 'ordinal']:
+        return ('marker', _category_markers(channel))
     raise NotImplementedError
 
 
-def _process_opacity(dtype, data):
+def _process_opacity(channel):
     """Returns the MPL encoding equivalent for Altair opacity channel
     """
     raise NotImplementedError
 
 
-def _process_size(dtype, data):
+def _process_size(channel):
     """Returns the MPL encoding equivalent for Altair size channel
     """
-    if dtype == 'quantitative':
-        return ('s', data)
-    elif dtype == 'nominal':
+    if channel.type == 'quantitative':
+        return ('s', channel.data)
+    elif channel.type == 'nominal':
         raise NotImplementedError
-    elif dtype == 'ordinal':
-        return ('s', data)
-    elif dtype == 'temporal':
+    elif channel.type == 'ordinal':
+        return ('s', channel.data)
+    elif channel.type == 'temporal':
         raise NotImplementedError
 
 
-def _process_stroke(dtype, data):
+def _process_stroke(channel):
     """Returns the MPL encoding equivalent for Altair stroke channel
     """
+    if channel.type == 'nominal':
+        return ('edgecolors', _category_colors(channel))
+    elif channel.type == 'ordinal':
+        return ('edgecolors', _ordered_colors(channel))
     raise NotImplementedError
 
 
@@ -114,6 +203,8 @@ def _convert(chart):
             raise ValueError("Ranged encoding channels like x2, y2 not allowed for Mark: {}".format(chart.mark))
 
     for k, channel in chart.encoding.items():
-        mapping[_mappings[k](channel.type, channel.data)[0]] = _mappings[k](channel.type, channel.data)[1]
+        # Each channel is converted once: the handlers may do real work, like palette lookups
+        argument, value = _mappings[k](channel)
+        mapping[argument] = value
 
     return mapping
@@ -1,13 +1,17 @@
+import hashlib
+import json
+import weakref
+
 import pandas as pd
 from ._exceptions import ValidationError
-from ._utils import _fetch
+from ._utils import _fetch, _filter_rows
 import matplotlib.dates as mdates
 import matplotlib.cbook as cbook
 from datetime import datetime
 import numpy as np
 
 
-def _normalize_data(chart):
+def _normalize_data(chart, spec=None, columns=None, row_filter=None):
     """Converts the data to a Pandas dataframe
 
     Parameters
@@ -15,9 +19,24 @@ def _normalize_data(chart):
     chart : altair.Chart
     The vega-lite specification in json format
 
+    spec : dict, optional
+    The compiled specification of the chart, if it is already available
+
+    columns : dict, optional
+    Maps the names of the columns to load to their vega-lite type (see ``_encoding_columns``).
+    All columns are loaded if not given.
+
+    row_filter : callable, optional
+    Returns the mask of the rows to keep out of a DataFrame (see ``_transform._RowFilter``). URL
+    data is filtered while it is parsed.
+
     Returns
     -------
-    None
+    pd.DataFrame
+    The chart data, restricted to ``columns`` and to the rows selected by ``row_filter``. The
+    chart is left untouched and the result must not be modified: without ``row_filter``, a
+    DataFrame is returned as is (the other columns are simply never read) and the data of a URL
+    is shared with the cache.
 
     Raises
     ------
@@ -28,16 +47,732 @@ def _normalize_data(chart):
     Raised when the data specification has an unsupported data source
     """
 
-    spec = chart.to_dict()
+    if isinstance(chart.data, pd.DataFrame):
+        df = chart.data
+        if row_filter is None:
+            return df
+        # A single copy of the selected rows of the requested columns
+        return df.loc[row_filter(df), [name for name in df.columns if columns is None or name in columns]]
+    if spec is None:
+        spec = chart.to_dict()
 
     if spec['data'].get('url'):
-        df = pd.DataFrame(_fetch(spec['data']['url']))
+        return _fetch(spec['data']['url'], columns, row_filter)
     elif spec['data'].get('values'):
-        return
+        # Only the requested keys of each record are extracted
+        df = pd.DataFrame(spec['data']['values'], columns=None if columns is None else list(columns))
+        return _filter_rows(df, row_filter)
     else:
         raise NotImplementedError('Given data specification is unsupported at the moment.')
 
-    chart.data = df
+
+def _data_key(chart, spec):
+    """Identifies the data source of a chart, so charts sharing their data can share its loading
+
+    Parameters
+    ----------
+    chart : altair.Chart
+    spec : dict
+        The compiled specification of the chart
+
+    Returns
+    -------
+    A hashable key: DataFrames are identified by identity, URLs by the URL and inline values
+    by a hash of their content.
+    """
+    if isinstance(chart.data, pd.DataFrame):
+        return ('dataframe', id(chart.data))
+    data = spec.get('data', {})
+    if data.get('url'):
+        return ('url', data['url'])
+    if data.get('values'):
+        content = json.dumps(data['values'], sort_keys=True, default=str).encode('utf-8')
+        return ('values', hashlib.sha1(content).hexdigest())
+    raise NotImplementedError('Given data specification is unsupported at the moment.')
+
+
+def _project(df, columns):
+    """Restricts a DataFrame to the given columns, without copying it if nothing is dropped
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+    columns : collection or None
+        The columns to keep. All columns are kept if None.
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    if columns is None:
+        return df
+    keep = [name for name in df.columns if name in columns]
+    if len(keep) == len(df.columns):
+        return df
+    return df[keep]
+
+
+def _with_columns(data, columns):
+    """A shallow copy of the data with columns added or replaced, leaving the data itself untouched
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+    columns : dict
+        Maps the names of the columns to their values
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    data = data.copy(deep=False)
+    for name, values in columns.items():
+        if name in data:
+            # Assigning to an existing column of a shallow copy writes into the array it shares with
+            # the original, while a new column is only added to the copy
+            del data[name]
+        data[name] = values
+    return data
+
+
+def _read_only(values):
+    """A view of an array that can't be written to, e.g. to share a column of the caller's data"""
+    if not isinstance(values, np.ndarray) or not values.flags.writeable:
+        return values
+    view = values.view()
+    view.flags.writeable = False
+    return view
+
+
+def _code_dtype(n_categories):
+    """The smallest signed integer type that holds the codes of n categories, and -1 for missing values"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class _ColumnStore(object):
+    """The columns of the data of a chart, shared by its channels as read-only NumPy buffers
+
+    Every column is extracted from the DataFrame once, as a view of its values when they already
+    are a NumPy array (numbers, dates and strings). Dates are converted to Matplotlib dates once
+    per column, and columns can be dictionary encoded into integer codes and their categories, e.g.
+    to map nominal values to colors. Channels on the same column share the same buffers.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The chart data (see ``parse_chart.ChartMetadata``)
+    cache : dict, optional
+        Derived columns of ``data``, keyed by (column, kind). It is shared by the stores of every
+        chart drawn from the same data (see ``parse_chart.ChannelMetadata``).
+    """
+
+    def __init__(self, data, cache=None):
+        self.data = data
+        self._cache = {} if cache is None else cache
+        self._columns = {}
+
+    def column(self, name):
+        """The values of a column, as a read-only array
+
+        Categorical columns are the only ones whose values are materialized, from their categories.
+        Use ``encoded`` to get them without copying.
+        """
+        if name not in self._columns:
+            self._columns[name] = _read_only(np.asarray(self.data[name].values))
+        return self._columns[name]
+
+    def dates(self, name):
+        """The values of a column of dates converted to Matplotlib dates, as a read-only array"""
+        key = (name, 'temporal')
+        if key not in self._cache:
+            self._cache[key] = _read_only(_convert_to_mpl_date(self.column(name)))
+        return self._cache[key]
+
+    def encoded(self, name):
+        """The dictionary encoding of a column
+
+        Parameters
+        ----------
+        name : str
+            The name of the column
+
+        Returns
+        -------
+        codes : np.array
+            The index of the value of each row in ``categories``, -1 for missing values, in the
+            smallest integer type that holds them
+        categories : np.array
+            The distinct values of the column: those of a categorical column in their order,
+            otherwise sorted in ascending order, as vega-lite sorts a domain by default
+        """
+        key = (name, 'codes')
+        if key not in self._cache:
+            values = self.data[name]
+            if pd.api.types.is_categorical_dtype(values.dtype):
+                # Already dictionary encoded
+                codes, categories = values.cat.codes.values, np.asarray(values.cat.categories)
+            else:
+                try:
+                    codes, categories = pd.factorize(values.values, sort=True)
+                except TypeError:  # values that can't be compared, kept in order of appearance
+                    codes, categories = pd.factorize(values.values)
+                codes, categories = codes.astype(_code_dtype(len(categories))), np.asarray(categories)
+            self._cache[key] = _read_only(codes), _read_only(categories)
+        return self._cache[key]
+
+
+def _encoding_columns(spec):
+    """Finds the columns referenced by the encoding channels and their vega-lite type
+
+    Parameters
+    ----------
+    spec : dict
+        The compiled chart specification
+
+    Returns
+    -------
+    columns : dict
+        Maps each field to its type, or to None if channels disagree on the type
+    """
+    columns = {}
+    for channel in spec.get('encoding', {}).values():
+        field = channel.get('field')
+        if field is None:
+            continue
+        # The type of an aggregated channel is the type of the result, which may not be the field's
+        dtype = channel.get('type') if channel.get('aggregate') in (None, 'min', 'max', 'median') else None
+        if channel.get('timeUnit'):
+            dtype = 'temporal'
+        if field in columns and columns[field] != dtype:
+            columns[field] = None
+        else:
+            columns[field] = dtype
+    return columns
+
+
+# The parts of a vega-lite time unit, in the order they appear in its name
+_TIME_UNIT_PARTS = ('year', 'quarter', 'month', 'date', 'day', 'hours', 'minutes', 'seconds', 'milliseconds')
+
+# The datetime64 unit each clock part truncates to, and the unit of the part above it
+_TIME_UNIT_CASTS = {
+    'date': ('D', 'M'), 'hours': ('h', 'D'), 'minutes': ('m', 'h'), 'seconds': ('s', 'm'), 'milliseconds': ('ms', 's'),
+}
+
+# The length of the fixed-length datetime64 units in nanoseconds
+_UNIT_NS = {unit: np.timedelta64(1, unit).astype('m8[ns]').astype(np.int64) for unit in ['D', 'h', 'm', 's', 'ms']}
+
+# Time units without a year are placed in 2012, like vega-lite does: it is a leap year that starts on a Sunday
+_TIME_UNIT_BASE_YEAR = np.datetime64('2012', 'Y')
+
+
+def _column_name(channel_spec):
+    """The name of the column holding the data of a channel before aggregation, as vega-lite names it"""
+    if channel_spec.get('timeUnit'):
+        return '{}_{}'.format(channel_spec['timeUnit'], channel_spec['field'])
+    if channel_spec.get('bin') and not channel_spec.get('aggregate'):
+        params = _bin_params(channel_spec['bin'])
+        parts = ['bin']
+        for k in sorted(params):
+            parts += [k] + [str(v) for v in np.atleast_1d(params[k])]
+        return '_'.join(parts + [channel_spec['field']])
+    return channel_spec.get('field')
+
+
+def _parse_time_unit(time_unit):
+    """Splits a vega-lite time unit into its parts
+
+    Parameters
+    ----------
+    time_unit : str
+        e.g. 'yearmonthdate' or 'hoursminutes'
+
+    Returns
+    -------
+    list of str
+        e.g. ['year', 'month', 'date'] or ['hours', 'minutes']
+
+    Raises
+    ------
+    NotImplementedError
+        Raised for UTC time units and for the day of the week combined with other parts
+    """
+    if time_unit.startswith('utc'):
+        raise NotImplementedError("mpl-altair currently doesn't support timezones.")
+    parts, rest = [], time_unit
+    for part in _TIME_UNIT_PARTS:
+        if rest.startswith(part):
+            parts.append(part)
+            rest = rest[len(part):]
+    if rest or not parts:
+        raise ValueError("Invalid time unit {!r}".format(time_unit))
+    if 'day' in parts and len(parts) > 1:
+        raise NotImplementedError("The day of the week can't be combined with other time units.")
+    return parts
+
+
+def _truncate_dates(values, time_unit):
+    """Truncates dates to a vega-lite time unit, with datetime64 arithmetic over the whole array
+
+    Parameters
+    ----------
+    values : np.array of datetime64
+    time_unit : str
+        The vega-lite time unit, e.g. 'yearmonth' or 'hours'
+
+    Returns
+    -------
+    np.array of datetime64[ns]
+        The truncated dates. The year of units without a year is 2012, the month of units without a month
+        is January, and so on. The day of the week ('day') is a day of the first week of 2012, which starts
+        on Sunday.
+    """
+    parts = _parse_time_unit(time_unit)
+    values = values.astype('M8[ns]', copy=False)
+    missing = np.isnat(values)
+    ns = values.view(np.int64)
+
+    if parts == ['day']:
+        weekday = (ns // _UNIT_NS['D'] + 4) % 7  # 1970-01-01 was a Thursday, Sunday is 0
+        return _with_missing(_TIME_UNIT_BASE_YEAR.astype('M8[ns]') + weekday * _UNIT_NS['D'], missing)
+
+    # Calendar parts, which don't have a fixed length
+    clock = [part for part in parts if part in _TIME_UNIT_CASTS]
+    if parts[0] in ('hours', 'minutes', 'seconds', 'milliseconds'):  # on the first day of the base year
+        month = None
+        result = np.full(len(values), _TIME_UNIT_BASE_YEAR.astype('M8[ns]').astype(np.int64))
+    else:
+        month = values.astype('M8[M]')
+        if parts[0] == 'year' and 'month' in parts:
+            start = month
+        else:
+            year = month.astype('M8[Y]')
+            start = (year if parts[0] == 'year' else np.full(len(values), _TIME_UNIT_BASE_YEAR)).astype('M8[M]')
+            if 'month' in parts:
+                start = start + (month - year.astype('M8[M]'))
+            elif 'quarter' in parts:
+                start = start + (month - year.astype('M8[M]')) // 3 * 3
+        result = start.astype('M8[ns]').view(np.int64)
+
+    # Clock parts, with a fixed length: the parts are contiguous, so their offsets add up to the time
+    # truncated to the smallest part minus the time truncated to the unit above the largest part
+    if clock:
+        finest = _UNIT_NS[_TIME_UNIT_CASTS[clock[-1]][0]]
+        above = _TIME_UNIT_CASTS[clock[0]][1]
+        if above == 'M':
+            above = result if start is month else month.astype('M8[ns]').view(np.int64)
+        else:
+            above = ns - ns % _UNIT_NS[above]
+        result = result + (ns - ns % finest - above)
+    return _with_missing(result.view('M8[ns]'), missing)
+
+
+def _with_missing(result, missing):
+    """Sets the missing dates back to NaT"""
+    result = result.astype('M8[ns]', copy=False)
+    result[missing] = np.datetime64('NaT')
+    return result
+
+
+def _to_datetime64(values):
+    """Parses a column of dates as naive datetime64, in UTC if the dates have a timezone"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values
+    dates = pd.DatetimeIndex(pd.to_datetime(values))
+    if dates.tz is not None:
+        dates = dates.tz_convert('UTC').tz_localize(None)
+    return dates.values
+
+
+def _apply_time_units(data, encoding, cache=None):
+    """Adds the columns of the channels with a time unit to the data
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The chart data
+    encoding : dict
+        The compiled specification of the encoding channels
+    cache : dict, optional
+        Derived columns of ``data`` (see ``parse_chart.ChannelMetadata``)
+
+    Returns
+    -------
+    pd.DataFrame
+        A shallow copy of ``data`` with a column per time unit and field (see ``_column_name``)
+    """
+    data = data.copy(deep=False)
+    for channel in encoding.values():
+        if not channel.get('timeUnit') or channel.get('aggregate'):
+            continue
+        name = _column_name(channel)
+        if name in data:
+            continue
+        key = (name, 'timeUnit')
+        if cache is not None and key in cache:
+            data[name] = cache[key]
+            continue
+        data[name] = _truncate_dates(_to_datetime64(data[channel['field']].values), channel['timeUnit'])
+        if cache is not None:
+            cache[key] = data[name].values
+    return data
+
+
+# Bin edges, keyed by the id of the source DataFrame, then by (field, parameters, length). The entries
+# of a DataFrame are removed at once when it is garbage collected, which may happen on any thread, so
+# the cache is never iterated over.
+_bin_edges_cache = {}
+
+
+def _bin_params(bin_spec):
+    """The parameters of a vega-lite bin, with the defaults of vega-lite
+
+    Parameters
+    ----------
+    bin_spec : bool or dict
+        The compiled ``bin`` of a channel
+
+    Returns
+    -------
+    dict
+    """
+    params = {'maxbins': 10}
+    if isinstance(bin_spec, dict):
+        params.update(bin_spec)
+    return params
+
+
+def _bin_edges(values, params):
+    """Computes the bin edges of the values, as vega-lite does
+
+    Parameters
+    ----------
+    values : np.array
+    params : dict
+        The bin parameters (see ``_bin_params``): maxbins, step, steps, extent, nice, base, divide and
+        minstep are supported.
+
+    Returns
+    -------
+    np.array
+        The edges of the bins, evenly spaced by the bin step
+    """
+    if 'extent' in params:
+        lo, hi = params['extent']
+    else:
+        values = values[~np.isnan(values)] if np.issubdtype(values.dtype, np.floating) else values
+        lo, hi = (float(np.min(values)), float(np.max(values))) if len(values) else (0., 0.)
+    maxbins, base = params['maxbins'], params.get('base', 10)
+    span = (hi - lo) or abs(lo) or 1
+
+    if params.get('step'):
+        step = params['step']
+    elif params.get('steps'):
+        steps = sorted(params['steps'])
+        step = steps[min(len(steps) - 1, np.searchsorted(steps, span / maxbins))]
+    else:
+        minstep = params.get('minstep', 0)
+        level = np.ceil(np.log(maxbins) / np.log(base))
+        step = max(minstep, base ** (np.round(np.log(span) / np.log(base)) - level))
+        while np.ceil(span / step) > maxbins:
+            step *= base
+        for divide in params.get('divide', [5, 2]):
+            if step / divide >= minstep and span / (step / divide) <= maxbins:
+                step /= divide
+
+    if params.get('nice', True):
+        v = np.log(step)
+        precision = 0 if v >= 0 else int(-v / np.log(base)) + 1
+        start = np.floor(lo / step + base ** (-precision - 1)) * step
+        lo = start - step if lo < start else start
+        hi = np.ceil(hi / step) * step
+    if hi == lo:
+        hi = lo + step
+    n_bins = int(np.ceil((hi - lo) / step - 1e-9))
+    return lo + step * np.arange(n_bins + 1)
+
+
+def _cached_bin_edges(source, field, params, values):
+    """The bin edges of a column of the source, computed once per DataFrame, field and parameters
+
+    Parameters
+    ----------
+    source : pd.DataFrame or None
+        The DataFrame of the chart, if its data is one. The edges are not cached otherwise. Changes made
+        in place to the DataFrame after the edges are cached are not noticed.
+    field : str
+    params : dict
+        The bin parameters (see ``_bin_params``)
+    values : np.array
+        The values of the column
+
+    Returns
+    -------
+    np.array
+    """
+    if source is None:
+        return _bin_edges(values, params)
+    cached = _bin_edges_cache.get(id(source))
+    if cached is None:
+        cached = _bin_edges_cache[id(source)] = {}
+        weakref.finalize(source, _forget_bin_edges, id(source))
+    key = (field, json.dumps(params, sort_keys=True), len(values))
+    if key not in cached:
+        cached[key] = _bin_edges(values, params)
+    return cached[key]
+
+
+def _forget_bin_edges(source_id):
+    """Removes the cached bin edges of a DataFrame that was garbage collected"""
+    _bin_edges_cache.pop(source_id, None)
+
+
+def _apply_bins(data, encoding, source=None):
+    """Adds the start and end of the bin of each row to the data, for each binned channel
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The chart data
+    encoding : dict
+        The compiled specification of the encoding channels
+    source : pd.DataFrame, optional
+        The DataFrame of the chart, whose bin edges are cached (see ``_cached_bin_edges``)
+
+    Returns
+    -------
+    pd.DataFrame
+        A shallow copy of ``data`` with the columns '<name>' and '<name>_end' per binned channel (see
+        ``_column_name``). Rows outside of the bins (when the bin extent is given) are NaN.
+    """
+    data = data.copy(deep=False)
+    for channel in encoding.values():
+        if not channel.get('bin') or channel.get('aggregate'):
+            continue
+        name = _column_name(channel)
+        if name in data:
+            continue
+        values = data[channel['field']].values
+        if not np.issubdtype(values.dtype, np.number):
+            raise NotImplementedError("Only quantitative fields can be binned.")
+        edges = _cached_bin_edges(source, channel['field'], _bin_params(channel['bin']), values)
+        index = _bin_index(values, edges)
+        outside = index < 0
+        starts, ends = edges[:-1][index], edges[1:][index]
+        starts[outside] = ends[outside] = np.nan
+        data[name] = starts
+        data[name + '_end'] = ends
+    return data
+
+
+def _bin_index(values, edges):
+    """The index of the bin of each value, -1 for values outside of the bins or missing. The last bin includes its end."""
+    index = np.digitize(values, edges) - 1
+    index[values == edges[-1]] = len(edges) - 2
+    index[(index >= len(edges) - 1) | np.isnan(values.astype(float, copy=False))] = -1
+    return index
+
+
+def _is_histogram(encoding):
+    """Whether the channels are binned fields and counts only, which ``_count_bins`` computes directly"""
+    binned = [channel for channel in encoding.values() if channel.get('bin') and not channel.get('aggregate')]
+    counts = [channel for channel in encoding.values() if channel.get('aggregate') == 'count']
+    return bool(binned and counts) and len(binned) + len(counts) == len(encoding) \
+        and not any(channel.get('timeUnit') for channel in binned)
+
+
+def _count_bins(data, encoding, source=None):
+    """Counts the rows in each (combination of) bin(s) of the binned channels, without grouping the rows
+
+    This is the aggregation of ``_aggregate_data`` for histograms (see ``_is_histogram``): the bin of
+    each row is counted with ``np.bincount``.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The chart data
+    encoding : dict
+        The compiled specification of the encoding channels
+    source : pd.DataFrame, optional
+        The DataFrame of the chart, whose bin edges are cached (see ``_cached_bin_edges``)
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per non-empty bin, in the same form as ``_aggregate_data``
+    """
+    names, all_edges, indices = [], [], []
+    for channel in encoding.values():
+        name = _column_name(channel)
+        if not channel.get('bin') or name in names:
+            continue
+        values = data[channel['field']].values
+        if not np.issubdtype(values.dtype, np.number):
+            raise NotImplementedError("Only quantitative fields can be binned.")
+        edges = _cached_bin_edges(source, channel['field'], _bin_params(channel['bin']), values)
+        names.append(name)
+        all_edges.append(edges)
+        indices.append(_bin_index(values, edges))
+
+    shape = tuple(len(edges) - 1 for edges in all_edges)
+    inside = np.logical_and.reduce([index >= 0 for index in indices])
+    cells = np.ravel_multi_index([index[inside] for index in indices], shape)
+    counts = np.bincount(cells, minlength=int(np.prod(shape)))
+    filled = np.flatnonzero(counts)
+
+    columns = {}
+    for name, edges, index in zip(names, all_edges, np.unravel_index(filled, shape)):
+        columns[name] = edges[:-1][index]
+        columns[name + '_end'] = edges[1:][index]
+    for channel in encoding.values():
+        if channel.get('aggregate') == 'count':
+            columns[_aggregate_name(channel)] = counts[filled]
+    return pd.DataFrame(columns)
+
+
+# Vega-lite aggregate operations computed by the pandas groupby method of the same name
+_AGGREGATE_METHODS = {
+    'valid': 'count',
+    'sum': 'sum',
+    'mean': 'mean',
+    'average': 'mean',
+    'median': 'median',
+    'min': 'min',
+    'max': 'max',
+    'stdev': 'std',
+    'variance': 'var',
+}
+
+# Vega-lite aggregate operations computed by _group_quantile, with their quantile
+_AGGREGATE_QUANTILES = {'q1': 0.25, 'q3': 0.75}
+
+
+def _aggregate_name(channel_spec):
+    """The name of the column holding the aggregated data of a channel, as vega-lite names it"""
+    if channel_spec.get('field') is None:
+        return '__{}'.format(channel_spec['aggregate'])
+    return '{}_{}'.format(channel_spec['aggregate'], channel_spec['field'])
+
+
+def _aggregate_data(data, encoding):
+    """Aggregates the data of the channels with an aggregate operation, grouped by the fields of the others
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The chart data
+    encoding : dict
+        The compiled specification of the encoding channels
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per group, sorted by the grouping fields, with a column per grouping field and a
+        column per aggregated channel (see ``_aggregate_name``).
+
+    Raises
+    ------
+    NotImplementedError
+        Raised for aggregate operations that aren't supported
+    """
+    keys, aggregates = [], {}
+    for channel in encoding.values():
+        op = channel.get('aggregate')
+        if op:
+            if op not in _AGGREGATE_METHODS and op not in _AGGREGATE_QUANTILES and op not in ('count', 'distinct'):
+                raise NotImplementedError("Aggregate operation {!r} is not supported.".format(op))
+            aggregates[_aggregate_name(channel)] = channel
+        elif channel.get('field') is not None and _column_name(channel) not in keys:
+            keys.append(_column_name(channel))
+            if channel.get('bin'):
+                keys.append(_column_name(channel) + '_end')
+
+    # The rows are grouped once, for all the aggregated channels
+    grouped = data.groupby(keys if keys else np.zeros(len(data), dtype=np.int8), sort=True)
+    sizes = codes = None
+    columns = {}
+    for name, channel in aggregates.items():
+        op = channel['aggregate']
+        if op in _AGGREGATE_METHODS:
+            columns[name] = getattr(grouped[channel['field']], _AGGREGATE_METHODS[op])()
+            continue
+        if sizes is None:
+            sizes = grouped.size()
+        if op == 'count':
+            columns[name] = sizes
+            continue
+        if codes is None:
+            codes = grouped.ngroup().values
+            # groupby drops the rows with a missing key, but ngroup() still numbers them, -1 or NaN
+            # depending on the pandas version: leave them out too
+            with np.errstate(invalid='ignore'):
+                grouped_rows = ~np.isnan(codes) & (codes >= 0)
+            codes = codes[grouped_rows].astype(np.intp)
+        values = data[channel['field']].values[grouped_rows]
+        if op == 'distinct':
+            result = _group_distinct(codes, len(sizes), values)
+        else:
+            result = _group_quantile(codes, len(sizes), values, _AGGREGATE_QUANTILES[op])
+        columns[name] = pd.Series(result, index=sizes.index)
+    result = pd.DataFrame(columns)
+    return result.reset_index() if keys else result.reset_index(drop=True)
+
+
+def _group_distinct(codes, n_groups, values):
+    """The number of distinct values in each group, counting missing values as one value
+
+    Parameters
+    ----------
+    codes : np.array
+        The group of each row, from 0 to n_groups - 1
+    n_groups : int
+    values : np.array
+
+    Returns
+    -------
+    np.array
+    """
+    value_codes, uniques = pd.factorize(values)  # missing values are coded -1
+    pairs = np.unique(codes.astype(np.int64) * (len(uniques) + 1) + (value_codes + 1))
+    return np.bincount(pairs // (len(uniques) + 1), minlength=n_groups)
+
+
+def _group_quantile(codes, n_groups, values, q):
+    """The quantile of the values of each group, interpolated linearly and ignoring missing values
+
+    Parameters
+    ----------
+    codes : np.array
+        The group of each row, from 0 to n_groups - 1
+    n_groups : int
+    values : np.array
+    q : float
+
+    Returns
+    -------
+    np.array
+        The quantile of each group, NaN for groups without values
+    """
+    values = values.astype(float)
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    # Sorted by group, then by value: sort by value, then sort the (group, position) pairs packed into
+    # integers, which is much faster than np.lexsort or a stable sort of the groups.
+    by_value = np.argsort(values)
+    packed = np.sort(codes[by_value].astype(np.int64) * len(values) + np.arange(len(values)))
+    values = values[by_value[packed % max(len(values), 1)]]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    position = starts + q * np.maximum(counts - 1, 0)
+    lower = np.minimum(np.floor(position).astype(np.intp), len(values) - 1)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    result = np.full(n_groups, np.nan)
+    filled = counts > 0
+    lower, upper, position = lower[filled], upper[filled], position[filled]
+    result[filled] = values[lower] + (values[upper] - values[lower]) * (position - lower)
+    return result
 
 
 def _convert_to_mpl_date(data):
@@ -54,11 +789,15 @@ def _convert_to_mpl_date(data):
         A list containing the converted date(s)
     """
 
-    if cbook.iterable(data) and not isinstance(data, str) and not isinstance(data, dict):
+    # cbook.iterable() calls iter(), which materializes a datetime Series as a list of Timestamps
+    if isinstance(data, (np.ndarray, pd.Series, pd.Index)) or (
+            cbook.iterable(data) and not isinstance(data, str) and not isinstance(data, dict)):
         if len(data) == 0:
             return []
-        else:
-            return np.asarray([_convert_to_mpl_date(i) for i in data])
+        converted = _convert_column_to_mpl_date(data)
+        if converted is not None:
+            return converted
+        return np.asarray([_convert_to_mpl_date(i) for i in data])
     else:
         if isinstance(data, str):  # string format for dates
             data = mdates.datestr2num(data)
@@ -71,6 +810,35 @@ def _convert_to_mpl_date(data):
         return data
 
 
+def _convert_column_to_mpl_date(data):
+    """Converts a whole column of dates to Matplotlib dates in one vectorized step.
+
+    Parameters
+    ----------
+    data : sequence
+        The column to be converted
+
+    Returns
+    -------
+    new_data : np.array or None
+        The converted dates, or None if the column has to be converted element by element
+        (e.g. Altair DateTime objects or values that are not dates at all)
+    """
+    arr = np.asarray(data)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return mdates.date2num(arr)
+
+    if pd.api.types.infer_dtype(arr) not in ('string', 'unicode', 'datetime', 'datetime64'):
+        return None
+    try:
+        dates = pd.DatetimeIndex(pd.to_datetime(arr))
+    except (ValueError, OverflowError):  # let dateutil have a go at each string
+        return None
+    if dates.tz is not None:
+        dates = dates.tz_convert('UTC').tz_localize(None)
+    return mdates.date2num(dates.values)
+
+
 def _altair_DateTime_to_datetime(dt):
     """Convert dictionary representation of an Altair DateTime to datetime object
 
@@ -92,6 +860,7 @@ def _altair_DateTime_to_datetime(dt):
 
     datetime_kwargs = {'year': 0, 'month': 1, 'day': 1, 'hour': 0, 'minute': 0, 'second': 0, 'microsecond': 0}
 
+    dt = dict(dt)  # the specification may be shared, e.g. by conversions in other threads
     if 'day' in dt or 'quarter' in dt:
         raise NotImplementedError
     if 'year' not in dt:
@@ -0,0 +1,162 @@
+import numpy as np
+
+_LINE_METHODS = ('minmax', 'lttb')
+
+
+def _axes_pixels(ax):
+    """The largest size the axes can have in pixels, at the figure DPI
+
+    The layout of the figure may still change once the chart is drawn (e.g. by ``tight_layout``),
+    so the size of the whole figure is used.
+
+    Parameters
+    ----------
+    ax
+        The Matplotlib axes object
+
+    Returns
+    -------
+    width, height : int
+    """
+    bbox = ax.figure.bbox
+    return max(int(np.ceil(bbox.width)), 1), max(int(np.ceil(bbox.height)), 1)
+
+
+def _decimate_line(x, y, max_points, method, width):
+    """Selects the points of a line to draw
+
+    Parameters
+    ----------
+    x, y : np.array
+        The data of the line, in drawing order
+    max_points : int
+        The maximum number of points to keep
+    method : {'minmax', 'lttb'}
+        'minmax' keeps the first, last, lowest and highest point of each pixel column, so the line
+        is drawn exactly as it would be with all its points, at the figure DPI. 'lttb' keeps the
+        points that form the largest triangles with their neighbours (Largest-Triangle-Three-Buckets).
+    width : int
+        The width of the axes in pixels
+
+    Returns
+    -------
+    np.array or None
+        The sorted indices of the points to keep, or None if the line is drawn as is
+    """
+    if method not in _LINE_METHODS:
+        raise ValueError("Unknown decimation method {!r}, expected one of {}".format(method, _LINE_METHODS))
+    if len(x) <= max_points or not _is_finite_numeric(x, y):
+        return None
+    if method == 'lttb':
+        return _lttb(x, y, max_points)
+    return _minmax(x, y, max(min(width, max_points // 4), 1))
+
+
+def _decimate_scatter(x, y, max_points, width, height):
+    """Selects the points of a scatter plot to draw
+
+    Only the top-most point of each pixel is kept, since it hides the points drawn before it.
+
+    Parameters
+    ----------
+    x, y : np.array
+        The data of the points, in drawing order
+    max_points : int
+        The number of points above which the points are thinned
+    width, height : int
+        The size of the axes in pixels
+
+    Returns
+    -------
+    np.array or None
+        The sorted indices of the points to keep, or None if all of them are drawn
+    """
+    if len(x) <= max_points or not _is_finite_numeric(x, y):
+        return None
+    cells = _bucket(x, width) * height + _bucket(y, height)
+    _, last = np.unique(cells[::-1], return_index=True)
+    return np.sort(len(cells) - 1 - last)
+
+
+def _is_finite_numeric(x, y):
+    """Whether both arrays are numbers without NaN or infinity, which decimation can't preserve"""
+    return all(np.issubdtype(arr.dtype, np.number) and np.isfinite(arr).all() for arr in (x, y))
+
+
+def _bucket(values, n):
+    """The index of the bucket of each value, out of n equal-width buckets spanning the values"""
+    lo, hi = values.min(), values.max()
+    if hi == lo:
+        return np.zeros(len(values), dtype=np.intp)
+    return np.minimum(((values - lo) * (n / (hi - lo))).astype(np.intp), n - 1)
+
+
+def _minmax(x, y, n_buckets):
+    """Min/max (M4) decimation: the first, last, lowest and highest point of each x bucket
+
+    Parameters
+    ----------
+    x, y : np.array
+    n_buckets : int
+
+    Returns
+    -------
+    np.array
+        The sorted indices of the points to keep
+    """
+    bucket = _bucket(x, n_buckets)
+    if np.all(bucket[1:] >= bucket[:-1]):  # x is sorted, as it usually is: the buckets are contiguous
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        ends = np.r_[starts[1:], len(x)] - 1
+        lengths = ends - starts + 1
+        lowest = _first_match(y == np.repeat(np.minimum.reduceat(y, starts), lengths), bucket)
+        highest = _first_match(y == np.repeat(np.maximum.reduceat(y, starts), lengths), bucket)
+        return np.unique(np.concatenate([starts, ends, lowest, highest]))
+
+    by_row = np.argsort(bucket, kind='mergesort')  # within a bucket, in row order
+    by_y = np.lexsort((y, bucket))  # within a bucket, from lowest to highest
+    sorted_buckets = bucket[by_row]
+    starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    ends = np.r_[starts[1:], len(x)] - 1
+    return np.unique(np.concatenate([by_row[starts], by_row[ends], by_y[starts], by_y[ends]]))
+
+
+def _first_match(matches, bucket):
+    """The index of the first matching row of each bucket, for sorted buckets"""
+    rows = np.flatnonzero(matches)
+    return rows[np.r_[True, bucket[rows[1:]] != bucket[rows[:-1]]]]
+
+
+def _lttb(x, y, n):
+    """Largest-Triangle-Three-Buckets decimation to n points
+
+    The first and last points are kept; the others are split into n - 2 buckets of equal size and
+    the point of each bucket forming the largest triangle with the point kept in the previous bucket
+    and the average point of the next bucket is kept.
+
+    Parameters
+    ----------
+    x, y : np.array
+    n : int
+
+    Returns
+    -------
+    np.array
+        The sorted indices of the points to keep
+    """
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = x.astype(float)
+    y = y.astype(float)
+    edges = np.r_[np.linspace(1, size - 1, n - 1).astype(np.intp), size]
+    keep = np.empty(n, dtype=np.intp)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        start, stop, next_stop = edges[i], edges[i + 1], edges[i + 2]
+        avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + np.argmax(area)
+        keep[i + 1] = a
+    return keep
@@ -0,0 +1,478 @@
+import ast
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+from ._data import _to_datetime64
+
+try:
+    import numexpr
+except ImportError:  # optional, expressions are evaluated with NumPy
+    numexpr = None
+
+# Below this number of rows, numexpr is slower than NumPy
+_NUMEXPR_MIN_ROWS = 2**15
+
+_TOKEN = re.compile(r'''\s*(?:
+    (?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<name>[A-Za-z_$][\w$]*)
+    |(?P<op>===|!==|>>>|==|!=|<=|>=|&&|\|\||<<|>>|[-+*/%<>!?:,.()\[\]&|^~])
+)''', re.VERBOSE)
+
+# The precedence of the binary operators, from the loosest to the tightest. The conditional operator is 1.
+_PRECEDENCE = {
+    '||': 2, '&&': 3, '|': 4, '^': 5, '&': 6,
+    '==': 7, '!=': 7, '===': 7, '!==': 7,
+    '<': 8, '<=': 8, '>': 8, '>=': 8,
+    '<<': 9, '>>': 9, '>>>': 9,
+    '+': 10, '-': 10,
+    '*': 11, '/': 11, '%': 11,
+}
+
+_BITWISE = ('|', '^', '&', '<<', '>>', '>>>', '~')
+
+_CONSTANTS = {
+    'true': True, 'false': False, 'null': None, 'NaN': np.nan, 'E': np.e, 'LN2': np.log(2), 'LN10': np.log(10),
+    'LOG2E': np.log2(np.e), 'LOG10E': np.log10(np.e), 'PI': np.pi, 'SQRT1_2': np.sqrt(0.5), 'SQRT2': np.sqrt(2),
+    'MIN_VALUE': 5e-324, 'MAX_VALUE': np.finfo(float).max,
+}
+
+
+def _truthy(values):
+    """Whether each value is true in JavaScript, where NaN, null and the empty string are false"""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind == 'f':
+        return (values != 0) & ~np.isnan(values)
+    if values.dtype.kind in 'iu':
+        return values != 0
+    return pd.notnull(values) & values.astype(bool)
+
+
+def _is_text(value):
+    return isinstance(value, str) or getattr(value, 'dtype', None) is not None and value.dtype.kind in 'OUS'
+
+
+def _add(a, b):
+    """JavaScript addition: strings are concatenated"""
+    if _is_text(a) or _is_text(b):
+        result = np.asarray(_as_text(a), dtype=object) + np.asarray(_as_text(b), dtype=object)
+        return result if np.ndim(result) else str(result)
+    return np.add(a, b)
+
+
+def _as_text(value):
+    """Formats values as JavaScript does when they are added to strings"""
+    if _is_text(value):
+        return value
+    values = np.asarray(value)
+    if values.dtype == bool:
+        text = np.where(values, 'true', 'false')
+    elif values.dtype.kind == 'f':
+        with np.errstate(invalid='ignore'):
+            whole = np.isfinite(values) & (values % 1 == 0) & (np.abs(values) < 1e21)
+        text = np.where(whole, np.where(whole, values, 0).astype(np.int64).astype(str), values.astype(str))
+        text = np.where(np.isnan(values), 'NaN', text)
+        text = np.where(np.isinf(values), np.where(values > 0, 'Infinity', '-Infinity'), text)
+    elif values.dtype.kind == 'O':
+        text = np.array(['null' if v is None else str(v) for v in values.ravel()]).reshape(values.shape)
+    else:
+        text = values.astype(str)
+    return text.astype(object) if text.ndim else str(text)
+
+
+def _and(a, b):
+    """JavaScript &&: the first value if it is false, otherwise the second one"""
+    if np.asarray(a).dtype == bool and np.asarray(b).dtype == bool:
+        return np.logical_and(a, b)
+    return np.where(_truthy(a), b, a)
+
+
+def _or(a, b):
+    """JavaScript ||: the first value if it is true, otherwise the second one"""
+    if np.asarray(a).dtype == bool and np.asarray(b).dtype == bool:
+        return np.logical_or(a, b)
+    return np.where(_truthy(a), a, b)
+
+
+def _where(test, a, b):
+    return np.where(_truthy(test), a, b)
+
+
+def _dates(values):
+    """The values as a DatetimeIndex: numbers are timestamps in milliseconds, as in JavaScript"""
+    values = np.atleast_1d(values)
+    if values.dtype.kind in 'iuf':
+        return pd.DatetimeIndex(pd.to_datetime(values, unit='ms'))
+    return pd.DatetimeIndex(_to_datetime64(values))
+
+
+def _date_part(part):
+    return lambda values: np.asarray(part(_dates(values)), dtype=float)
+
+
+def _is_valid(values):
+    values = np.asarray(values)
+    valid = pd.notnull(values)
+    return valid & ~np.isnan(values) if values.dtype.kind == 'f' else valid
+
+
+def _strings(values):
+    return pd.Series(np.atleast_1d(values), dtype=object).str
+
+
+_FUNCTIONS = {
+    'abs': np.abs, 'acos': np.arccos, 'asin': np.arcsin, 'atan': np.arctan, 'atan2': np.arctan2,
+    'ceil': np.ceil, 'cos': np.cos, 'exp': np.exp, 'floor': np.floor, 'log': np.log, 'sin': np.sin,
+    'sqrt': np.sqrt, 'tan': np.tan,
+    'pow': lambda a, b: np.power(np.asarray(a, dtype=float), b),
+    'round': lambda values: np.floor(np.asarray(values, dtype=float) + 0.5),  # halves are rounded up
+    'max': lambda *args: functools.reduce(np.maximum, args),
+    'min': lambda *args: functools.reduce(np.minimum, args),
+    'clamp': lambda values, lo, hi: np.minimum(np.maximum(values, lo), hi),
+    'isNaN': lambda values: np.isnan(np.asarray(values, dtype=float)),
+    'isFinite': lambda values: np.isfinite(np.asarray(values, dtype=float)),
+    'isValid': _is_valid,
+    'isDefined': lambda values: np.ones(np.shape(values), dtype=bool),
+    'if': _where,
+    'toNumber': lambda values: pd.to_numeric(np.atleast_1d(values), errors='coerce').astype(float),
+    'toString': lambda values: np.atleast_1d(_as_text(values)).astype(object),
+    'length': lambda values: _strings(values).len().values,
+    'lower': lambda values: _strings(values).lower().values,
+    'upper': lambda values: _strings(values).upper().values,
+    # The parts of dates, as JavaScript numbers them: months from 0 and days of the week from Sunday
+    'year': _date_part(lambda dates: dates.year),
+    'quarter': _date_part(lambda dates: dates.quarter),
+    'month': _date_part(lambda dates: dates.month - 1),
+    'date': _date_part(lambda dates: dates.day),
+    'day': _date_part(lambda dates: (dates.dayofweek + 1) % 7),
+    'hours': _date_part(lambda dates: dates.hour),
+    'minutes': _date_part(lambda dates: dates.minute),
+    'seconds': _date_part(lambda dates: dates.second),
+    'milliseconds': _date_part(lambda dates: dates.microsecond // 1000),
+}
+
+_UNARY = {'-': np.negative, '+': lambda values: np.asarray(values, dtype=float), '!': lambda values: ~_truthy(values)}
+
+_BINARY = {
+    '+': _add, '-': np.subtract, '*': np.multiply, '/': np.true_divide, '%': np.fmod,  # the sign of the dividend
+    '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+    '==': np.equal, '===': np.equal, '!=': np.not_equal, '!==': np.not_equal,
+    '&&': _and, '||': _or,
+}
+
+# The functions numexpr has, by their vega name
+_NUMEXPR_FUNCTIONS = {
+    'abs': 'abs', 'acos': 'arccos', 'asin': 'arcsin', 'atan': 'arctan', 'atan2': 'arctan2', 'cos': 'cos',
+    'exp': 'exp', 'log': 'log', 'sin': 'sin', 'sqrt': 'sqrt', 'tan': 'tan',
+}
+
+
+def _tokenize(expression):
+    tokens, pos = [], 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if match is None:
+            raise ValueError("Invalid expression {!r} at position {}".format(expression, pos))
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        pos = match.end()
+    return tokens
+
+
+class _Parser(object):
+    """Parses a vega expression into a tree of tuples, e.g. ('binary', '*', ('field', 'x'), ('literal', 2))
+
+    Parameters
+    ----------
+    expression : str
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+
+    def parse(self):
+        node = self._binary(1)
+        if self.pos < len(self.tokens):
+            self._fail()
+        return node
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            self._fail()
+        self.pos += 1
+        return token
+
+    def _expect(self, value):
+        if self._next() != ('op', value):
+            self.pos -= 1
+            self._fail()
+
+    def _fail(self):
+        raise ValueError("Invalid expression {!r}: unexpected {}".format(
+            self.expression, repr(self._peek()[1]) if self.pos < len(self.tokens) else 'end'))
+
+    def _binary(self, min_precedence):
+        left = self._unary()
+        while True:
+            kind, op = self._peek()
+            if kind != 'op':
+                return left
+            if op == '?' and min_precedence <= 1:
+                self.pos += 1
+                a = self._binary(1)
+                self._expect(':')
+                left = ('conditional', left, a, self._binary(1))
+                continue
+            precedence = _PRECEDENCE.get(op)
+            if precedence is None or precedence < min_precedence:
+                return left
+            if op in _BITWISE:
+                raise NotImplementedError("Bitwise operators are not supported: {!r}".format(self.expression))
+            self.pos += 1
+            left = ('binary', op, left, self._binary(precedence + 1))
+
+    def _unary(self):
+        kind, op = self._peek()
+        if kind == 'op' and op in ('-', '+', '!', '~'):
+            if op in _BITWISE:
+                raise NotImplementedError("Bitwise operators are not supported: {!r}".format(self.expression))
+            self.pos += 1
+            return ('unary', op, self._unary())
+        return self._member(self._primary())
+
+    def _primary(self):
+        kind, value = self._next()
+        if kind == 'number':
+            if value[:2] in ('0x', '0X'):
+                return ('literal', int(value, 16))
+            return ('literal', float(value) if set(value) & set('.eE') else int(value))
+        if kind == 'string':
+            return ('literal', ast.literal_eval(value))
+        if kind == 'op' and value == '(':
+            node = self._binary(1)
+            self._expect(')')
+            return node
+        if kind == 'name':
+            if value == 'datum':
+                return ('datum',)
+            if self._peek() == ('op', '('):
+                return self._call(value)
+            if value in _CONSTANTS:
+                return ('literal', _CONSTANTS[value])
+            raise NotImplementedError("Unknown name {!r} in {!r}".format(value, self.expression))
+        self.pos -= 1
+        self._fail()
+
+    def _call(self, name):
+        if name not in _FUNCTIONS:
+            raise NotImplementedError("The function {!r} is not supported".format(name))
+        self._expect('(')
+        args = []
+        while self._peek() != ('op', ')'):
+            if args:
+                self._expect(',')
+            args.append(self._binary(1))
+        self.pos += 1
+        return ('call', name, args)
+
+    def _member(self, node):
+        while self._peek() in (('op', '.'), ('op', '[')):
+            if node != ('datum',):
+                raise NotImplementedError("Only the fields of the datum can be accessed: {!r}".format(self.expression))
+            if self._next() == ('op', '.'):
+                kind, name = self._next()
+                if kind != 'name':
+                    self.pos -= 1
+                    self._fail()
+            else:
+                key = self._binary(1)
+                self._expect(']')
+                if key[0] != 'literal' or not isinstance(key[1], str):
+                    raise NotImplementedError("Fields of the datum must be accessed by name: {!r}".format(
+                        self.expression))
+                name = key[1]
+            node = ('field', name)
+        if node == ('datum',):
+            raise NotImplementedError("The datum can't be used as a whole: {!r}".format(self.expression))
+        return node
+
+
+def _build(node):
+    """Compiles a parsed expression into a function of the columns"""
+    kind = node[0]
+    if kind == 'literal':
+        value = node[1]
+        return lambda columns: value
+    if kind == 'field':
+        name = node[1]
+        return lambda columns: columns[name]
+    if kind == 'unary':
+        func, operand = _UNARY[node[1]], _build(node[2])
+        return lambda columns: func(operand(columns))
+    if kind == 'binary':
+        func, left, right = _BINARY[node[1]], _build(node[2]), _build(node[3])
+        return lambda columns: func(left(columns), right(columns))
+    if kind == 'conditional':
+        test, a, b = (_build(operand) for operand in node[1:])
+        return lambda columns: _where(test(columns), a(columns), b(columns))
+    func, args = _FUNCTIONS[node[1]], [_build(arg) for arg in node[2]]
+    return lambda columns: func(*[arg(columns) for arg in args])
+
+
+def _fields(node, fields):
+    """Adds the fields of the datum a parsed expression reads to ``fields``, in order"""
+    if node[0] == 'field' and node[1] not in fields:
+        fields.append(node[1])
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            _fields(child, fields)
+        elif isinstance(child, list):
+            for arg in child:
+                _fields(arg, fields)
+    return fields
+
+
+def _numexpr_source(node, names):
+    """Translates a parsed expression to numexpr, if it only uses operations numexpr has
+
+    Parameters
+    ----------
+    node : tuple
+        The parsed expression
+    names : list
+        The fields read so far. Field i is named _f<i> in the result.
+
+    Returns
+    -------
+    (str, str) or None
+        The numexpr expression and whether it results in a 'number' or a 'bool', or None
+    """
+    kind = node[0]
+    if kind == 'literal':
+        value = node[1]
+        if isinstance(value, bool):
+            return repr(value), 'bool'
+        if isinstance(value, (int, float)) and np.isfinite(value):
+            return repr(float(value)), 'number'
+        return None
+    if kind == 'field':
+        if node[1] not in names:
+            names.append(node[1])
+        return '_f{}'.format(names.index(node[1])), 'number'
+
+    if kind == 'call' and node[1] == 'pow' and len(node[2]) == 2:
+        kind, node = 'binary', ('binary', '**') + tuple(node[2])
+    elif kind == 'call' and node[1] == 'if' and len(node[2]) == 3:
+        kind, node = 'conditional', ('conditional',) + tuple(node[2])
+    children = node[2] if kind == 'call' else [child for child in node[1:] if isinstance(child, tuple)]
+    operands = [_numexpr_source(child, names) for child in children]
+    if any(operand is None for operand in operands):
+        return None
+    sources = [source for source, _ in operands]
+    kinds = [operand_kind for _, operand_kind in operands]
+    numbers = all(operand_kind == 'number' for operand_kind in kinds)
+
+    if kind == 'call':
+        if node[1] not in _NUMEXPR_FUNCTIONS or not numbers:
+            return None
+        return '{}({})'.format(_NUMEXPR_FUNCTIONS[node[1]], ', '.join(sources)), 'number'
+    if kind == 'conditional':
+        if len(kinds) != 3 or kinds[0] != 'bool' or kinds[1] != kinds[2]:
+            return None
+        return 'where({}, {}, {})'.format(*sources), kinds[1]
+    op = node[1]
+    if kind == 'unary':
+        if op == '!' and kinds == ['bool']:
+            return '(~{})'.format(sources[0]), 'bool'
+        return ('(-{})'.format(sources[0]), 'number') if op == '-' and numbers else None
+    if op in ('&&', '||'):
+        if kinds != ['bool', 'bool']:
+            return None
+        return '({} {} {})'.format(sources[0], '&' if op == '&&' else '|', sources[1]), 'bool'
+    if not numbers or op == '%':
+        return None
+    if op in ('+', '-', '*', '/', '**'):
+        return '({} {} {})'.format(sources[0], op, sources[1]), 'number'
+    return '({} {} {})'.format(sources[0], op.replace('===', '==').replace('!==', '!='), sources[1]), 'bool'
+
+
+class _Expression(object):
+    """A vega expression compiled by ``_compile_expression``, called with columns to evaluate it
+
+    Attributes
+    ----------
+    expression : str
+    fields : list of str
+        The fields of the datum the expression reads
+    numexpr_source : str or None
+        The expression in numexpr syntax, with the fields named _f0, _f1... in the order of ``fields``,
+        or None if numexpr can't evaluate it
+
+    Parameters
+    ----------
+    expression : str
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        tree = _Parser(expression).parse()
+        self.fields = _fields(tree, [])
+        self._func = _build(tree)
+        translated = _numexpr_source(tree, list(self.fields))
+        self.numexpr_source = translated[0] if translated is not None else None
+
+    def __call__(self, columns):
+        """Evaluates the expression over whole columns at once
+
+        Parameters
+        ----------
+        columns : mapping
+            Maps the fields of the datum to their values
+
+        Returns
+        -------
+        np.array or scalar
+            A scalar if the expression doesn't read any field
+        """
+        values = {field: np.asarray(columns[field]) for field in self.fields}
+        if (numexpr is not None and self.numexpr_source is not None and values
+                and len(next(iter(values.values()))) >= _NUMEXPR_MIN_ROWS
+                and all(column.dtype.kind in 'iuf' for column in values.values())):
+            local_dict = {'_f{}'.format(i): values[field].astype(float, copy=False)
+                          for i, field in enumerate(self.fields)}
+            return numexpr.evaluate(self.numexpr_source, local_dict=local_dict)
+        with np.errstate(all='ignore'):
+            return self._func(values)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_expression(expression):
+    """Parses a vega expression once and compiles it to vectorized operations
+
+    Parameters
+    ----------
+    expression : str
+        e.g. "datum.x * 2 > 10 && datum.category === 'A'"
+
+    Returns
+    -------
+    _Expression
+
+    Raises
+    ------
+    ValueError
+        Raised for expressions that are not valid
+    NotImplementedError
+        Raised for regular expressions, bitwise operators, functions that are not supported and
+        accesses to anything but the fields of the datum
+    """
+    return _Expression(expression)
@@ -0,0 +1,302 @@
+import copy
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from ._axis import _set_limits
+from ._convert import _convert
+from ._marks import _draw
+from .parse_chart import ChartMetadata
+
+# The channels whose data can be appended to, and their types. The values of nominal and ordinal
+# channels are mapped through the categories of the whole data, which new rows can change.
+_LIVE_CHANNELS = {
+    'x': ['quantitative', 'temporal'],
+    'y': ['quantitative', 'temporal'],
+    'color': ['quantitative', 'temporal'],
+    'fill': ['quantitative', 'temporal'],
+    'size': ['quantitative'],
+}
+
+# The arguments of scatter() that hold a value per point, besides the positions
+_PER_POINT = ['c', 's']
+
+# How much the limits of a streaming chart are widened past the data when they are set again,
+# as a fraction of their span, so that a growing series doesn't need new limits at every update
+_HEADROOM = 0.5
+
+
+def _check_live(chart):
+    """Raises NotImplementedError if new rows can't be appended to the chart without parsing it again
+
+    Parameters
+    ----------
+    chart : parse_chart.ChartMetadata
+    """
+    if chart.mark not in ['point', 'circle', 'square', 'line']:
+        raise NotImplementedError("Only point and line marks can be appended to")
+    if chart.spec.get('transform'):
+        raise NotImplementedError("Charts with transforms can't be appended to")
+    for name, channel in chart.encoding.items():
+        if chart.mark == 'line' and name not in ['x', 'y']:
+            raise NotImplementedError("Only line charts of a single line can be appended to")
+        if channel.type not in _LIVE_CHANNELS.get(name, []):
+            raise NotImplementedError("{} {} channels can't be appended to".format(channel.type, name))
+        if channel.bin or channel.timeUnit or chart.spec['encoding'][name].get('aggregate'):
+            raise NotImplementedError("Binned, aggregated and time unit channels can't be appended to")
+        if channel.scale.get('type', 'linear') not in ['linear', 'time']:
+            raise NotImplementedError("Only linear and time scales can be appended to")
+
+
+class LiveChart(object):
+    """A converted chart whose artists are updated in place as rows are appended to its data
+
+    The chart is drawn once. Appending rows only converts the new rows, writes them at the end of
+    buffers that grow geometrically, hands the buffers to the existing artist (a ``Line2D`` or a
+    ``PathCollection``) and extends the axis limits by the new points.
+
+    Parameters
+    ----------
+    chart : parse_chart.ChartMetadata
+        The parsed chart, with its initial data. See ``_check_live`` for the charts that are supported.
+    ax : matplotlib.axes
+        The axes the chart is drawn on
+
+    Attributes
+    ----------
+    fig : matplotlib.figure
+    ax : matplotlib.axes
+    artist : matplotlib.lines.Line2D or matplotlib.collections.PathCollection
+        The artist holding the data of the chart
+    """
+
+    def __init__(self, chart, ax):
+        _check_live(chart)
+        self._chart = chart
+        self.ax = ax
+        self.fig = ax.figure
+        # Without rows there are no limits to set yet: the first rows appended set them, and dates
+        # are shown over Matplotlib's default range of dates until then
+        empty = not len(chart.encoding['x'].data)
+        _draw(chart, ax, rasterize=False, limits=not empty)
+        for name, set_lim in [('x', ax.set_xlim), ('y', ax.set_ylim)]:
+            if empty and chart.encoding[name].type == 'temporal':
+                set_lim(mdates.date2num(mdates.DateConverter.axisinfo(None, None).default_limits))
+        self.artist = ax.lines[-1] if chart.mark == 'line' else ax.collections[-1]
+
+        mapping = _convert(chart)
+        # The data is held as one column per argument of the artist: x, y, then those of _PER_POINT
+        self._keys = ['x', 'y'] + [k for k in _PER_POINT
+                                   if isinstance(mapping.get(k), np.ndarray) and len(mapping[k]) == len(mapping['x'])]
+        self._init_rows(np.column_stack([mapping[k] for k in self._keys]).astype(float))
+
+    def _init_rows(self, rows):
+        self._size = len(rows)
+        self._rows = rows
+
+    def __len__(self):
+        return self._size
+
+    def _view(self):
+        """The data of the chart, with a column per argument of the artist (see ``_keys``)"""
+        return self._rows[:self._size]
+
+    def append(self, rows):
+        """Append rows to the data of the chart and update its artist and axis limits
+
+        Parameters
+        ----------
+        rows : pd.DataFrame, dict of sequences or list of dict
+            The new rows. They must have the fields used by the encoding.
+        """
+        rows = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+        if not len(rows):
+            return
+        mapping = _convert(ChartMetadata(None, self._chart.spec, rows))
+        new = np.column_stack([mapping[k] for k in self._keys]).astype(float)
+        self._write_rows(new)
+        self._update_artist(new)
+        self._update_limits(new[:, :2])
+
+    def _write_rows(self, new):
+        """Writes the new rows after the others, doubling the capacity of the buffer when it is full"""
+        start, stop = self._size, self._size + len(new)
+        if stop > len(self._rows):
+            rows = np.empty((max(stop, 2 * len(self._rows)), len(self._keys)))
+            rows[:start] = self._rows[:start]
+            self._rows = rows
+        self._rows[start:stop] = new
+        self._size = stop
+
+    def _update_artist(self, new):
+        """Hands the data to the artist, given the new rows"""
+        rows = self._view()
+        if self._chart.mark == 'line':
+            self.artist.set_data(rows[:, 0], rows[:, 1])
+            return
+        self.artist.set_offsets(rows[:, :2])
+        if 's' in self._keys:
+            self.artist.set_sizes(rows[:, self._keys.index('s')])
+        if 'c' in self._keys:
+            norm, c = self.artist.norm, new[:, self._keys.index('c')]
+            # The color scale only widens, from the range of the new values
+            if np.isfinite(c).any():
+                norm.vmin = np.nanmin(c) if norm.vmin is None else min(norm.vmin, np.nanmin(c))
+                norm.vmax = np.nanmax(c) if norm.vmax is None else max(norm.vmax, np.nanmax(c))
+            self.artist.set_array(rows[:, self._keys.index('c')])
+
+    def _update_limits(self, xy):
+        """Extends the data limits by the new points and sets the axis limits as ``convert_axis`` does"""
+        self.ax.update_datalim(xy)
+        self._set_limits()
+
+    def _set_limits(self):
+        """Sets the axis limits from the data limits, as ``convert_axis`` does"""
+        self.ax.set_autoscale_on(True)
+        self.ax.autoscale_view()
+        for name, interval in [('x', self.ax.dataLim.intervalx), ('y', self.ax.dataLim.intervaly)]:
+            # _set_limits only needs the range of the data, known from the data limits
+            channel = copy.copy(self._chart.encoding[name])
+            channel.data = np.asarray(interval)
+            _set_limits(channel, self._chart.mark, self.ax)
+
+
+class _RingBuffer(object):
+    """The last rows of a stream, in a fixed amount of memory
+
+    Every row is written twice, at i and at i + capacity of a buffer of twice the capacity, so that
+    the rows kept, in order, always are a slice of the buffer: a view, never a copy.
+
+    Parameters
+    ----------
+    capacity : int
+        The number of rows kept
+    width : int
+        The number of columns
+    """
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self._buffer = np.empty((2 * capacity, width))
+        self._written = 0
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self._buffer.nbytes
+
+    def extend(self, rows):
+        """Writes rows after the others, over the oldest ones"""
+        rows = rows[-self.capacity:]
+        positions = (self._written + np.arange(len(rows))) % self.capacity
+        self._buffer[positions] = rows
+        self._buffer[positions + self.capacity] = rows
+        self._written += len(rows)
+
+    def view(self):
+        """The rows kept, from the oldest to the newest"""
+        start = (self._written - len(self)) % self.capacity
+        return self._buffer[start:start + len(self)]
+
+
+class StreamingChart(LiveChart):
+    """A live chart that only keeps the last rows of its data and redraws them by blitting
+
+    The data is held in a ring buffer of ``window`` rows, so the memory used doesn't grow with the
+    stream. The artist is animated: a full draw of the figure draws everything else, which is cached
+    as the background, and ``blit()`` then only draws the artist on it. The axis limits are only set
+    again when new points fall outside of them, widened past the data on that side by ``_HEADROOM``
+    of their span, which takes a full draw.
+
+    The chart can also be animated by ``matplotlib.animation.FuncAnimation`` with ``blit=True``::
+
+        FuncAnimation(stream.fig, stream.update, frames=rows, init_func=stream.init, blit=True)
+
+    Parameters
+    ----------
+    chart : parse_chart.ChartMetadata
+        The parsed chart, with its initial data (see ``LiveChart``)
+    ax : matplotlib.axes
+        The axes the chart is drawn on
+    window : int
+        The number of rows kept
+    """
+
+    def __init__(self, chart, ax, window):
+        if window < 1:
+            raise ValueError("The window must hold at least one row")
+        self._window = window
+        super().__init__(chart, ax)
+        self._background = None
+        self._stale = True  # whether the background must be drawn again
+        self.artist.set_animated(True)
+        self.fig.canvas.mpl_connect('draw_event', self._cache_background)
+        if len(chart.encoding['x'].data) > window:
+            # Only the last rows of the initial data are drawn
+            self._update_artist(self._view())
+            self._rescale(self._view()[:, :2])
+
+    def _init_rows(self, rows):
+        self._ring = _RingBuffer(self._window, rows.shape[1])
+        self._ring.extend(rows)
+        self._size = len(self._ring)
+
+    def _view(self):
+        return self._ring.view()
+
+    def _write_rows(self, new):
+        self._ring.extend(new)
+        self._size = len(self._ring)
+
+    def _update_limits(self, xy):
+        """Sets the axis limits again if new points fall outside of them, or if all the rows kept are new"""
+        with np.errstate(invalid='ignore'):
+            (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+            if len(self) <= len(xy) or ((xy[:, 0] < x0) | (xy[:, 0] > x1) | (xy[:, 1] < y0) | (xy[:, 1] > y1)).any():
+                self._rescale(xy)
+
+    def _rescale(self, xy):
+        """Sets the axis limits from the rows kept, widened on the sides the new points ``xy`` are on"""
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        with np.errstate(invalid='ignore'):
+            grown = [(xy[:, 0] < x0).any(), (xy[:, 0] > x1).any(), (xy[:, 1] < y0).any(), (xy[:, 1] > y1).any()]
+        self.ax.ignore_existing_data_limits = True
+        self.ax.update_datalim(self._view()[:, :2])
+        self._set_limits()
+        for (low, high), get, set_lim in [(grown[:2], self.ax.get_xlim, self.ax.set_xlim),
+                                          (grown[2:], self.ax.get_ylim, self.ax.set_ylim)]:
+            lo, hi = get()
+            span = (hi - lo) * _HEADROOM
+            set_lim(lo - span if low else lo, hi + span if high else hi)
+        self._stale = True
+
+    def _cache_background(self, event):
+        self._background = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        self._stale = False
+
+    def blit(self):
+        """Draws the data on the canvas: only the artist, over the cached background, unless the axes changed"""
+        canvas = self.fig.canvas
+        if self._stale or self._background is None:
+            canvas.draw()  # caches the background
+        else:
+            canvas.restore_region(self._background)
+        self.ax.draw_artist(self.artist)
+        canvas.blit(self.ax.bbox)
+
+    def init(self):
+        """The ``init_func`` of ``FuncAnimation``: returns the artists it redraws"""
+        return [self.artist]
+
+    def update(self, rows):
+        """The ``func`` of ``FuncAnimation``: appends the rows of a frame and returns the artists it redraws
+
+        When the axis limits change, the figure is drawn at once, since ``FuncAnimation`` only redraws
+        the artists.
+        """
+        self.append(rows)
+        if self._stale:
+            self.fig.canvas.draw()
+        return [self.artist]
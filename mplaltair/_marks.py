@@ -1,9 +1,234 @@
 import matplotlib
 import numpy as np
-from ._data import _convert_to_mpl_date
+import matplotlib.colors as mcolors
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from ._axis import convert_axis
+from ._convert import _color_cycle, _convert
+from ._data import _column_name
+from ._decimate import _axes_pixels, _decimate_line, _decimate_scatter
+from ._raster import _aggregate, _can_aggregate
 
+# Line charts with at least this many lines are drawn as a single LineCollection
+_LINE_COLLECTION_MIN_LINES = 100
 
-def _handle_line(chart, ax):
+# Scatter plots with at least this many points are drawn as an image (see convert's rasterize)
+_RASTERIZE_MIN_POINTS = 10**6
+
+
+def _new_figure():
+    """Create a figure and axes with an Agg canvas, without going through pyplot
+
+    Unlike ``plt.subplots()``, the figure isn't registered with pyplot's figure manager: it is freed
+    once it is no longer referenced, and it can safely be created and drawn outside of the main
+    thread.
+
+    Returns
+    -------
+    fig : matplotlib.figure
+    ax : matplotlib.axes
+    """
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot(111)
+
+
+def _draw(chart, ax, max_points=None, decimation='minmax', rasterize=None, limits=True):
+    """Draw the converted chart on the Matplotlib axes
+
+    Parameters
+    ----------
+    chart : parse_chart.ChartMetadata
+        The chart data and metadata
+    ax
+        The Matplotlib axes object
+    max_points : int, optional
+        Decimate lines and scatter plots with more points than this (see ``convert``)
+    decimation : {'minmax', 'lttb'}, optional
+        How lines are decimated (see ``_decimate._decimate_line``)
+    rasterize : bool, optional
+        Whether scatter plots are drawn as an image (see ``convert``)
+    limits : bool, optional
+        Whether the axis limits are set from the data (see ``_axis.convert_axis``)
+    """
+    if chart.mark in ['point', 'circle', 'square']:  # scatter
+        _handle_scatter(chart, ax, max_points, rasterize)
+    elif chart.mark == 'line':  # line
+        _handle_line(chart, ax, max_points, decimation)
+    elif chart.mark == 'bar':
+        _handle_bar(chart, ax)
+    elif chart.mark == 'rect':
+        _handle_rect(chart, ax)
+    else:
+        raise NotImplementedError
+    convert_axis(ax, chart, limits)
+
+
+def _handle_scatter(chart, ax, max_points=None, rasterize=None):
+    """Convert encodings, thin out the points if needed, plot on ax.
+
+    Parameters
+    ----------
+    chart : parse_chart.ChartMetadata
+        The chart data and metadata
+    ax
+        The Matplotlib axes object
+    max_points : int, optional
+        Keep only the top-most point of each pixel if there are more points than this
+    rasterize : bool, optional
+        Whether the points are aggregated into an image. By default, they are if there are at least
+        ``_RASTERIZE_MIN_POINTS`` of them and they can be.
+    """
+    mapping = _convert(chart)
+    x, y = np.asarray(mapping.get('x', [])), np.asarray(mapping.get('y', []))
+    if rasterize is None:
+        rasterize = len(x) >= _RASTERIZE_MIN_POINTS and _can_rasterize(chart, mapping, x, y)
+    elif rasterize and not _can_rasterize(chart, mapping, x, y):
+        raise NotImplementedError("Only finite numbers on linear scales, without categorical colors or "
+                                  "shapes, can be rasterized")
+    shapes = mapping.pop('marker', None)
+    if rasterize:
+        _add_scatter_image(ax, x, y, mapping.get('c'), mapping.get('s'))
+        return
+
+    if max_points is not None:
+        keep = _decimate_scatter(x, y, max_points, *_axes_pixels(ax))
+        if keep is not None:
+            mapping = {k: v[keep] if isinstance(v, np.ndarray) and len(v) == len(x) else v
+                       for k, v in mapping.items()}
+            if shapes is not None:
+                shapes = (shapes[0][keep], shapes[1])
+    if shapes is not None:
+        _scatter_by_shape(ax, mapping, *shapes)
+    else:
+        ax.scatter(**mapping)
+
+
+def _scatter_by_shape(ax, mapping, codes, markers):
+    """Draw a scatter plot whose points have different shapes, with one scatter per shape
+
+    Parameters
+    ----------
+    ax
+        The Matplotlib axes object
+    mapping : dict
+        The arguments of scatter() (see ``_convert._convert``)
+    codes : np.array
+        The category of each point, -1 for missing values
+    markers : list
+        The marker of each category. Points with a missing category get the default marker.
+    """
+    n = len(codes)
+    per_point = {k for k, v in mapping.items() if isinstance(v, np.ndarray) and len(v) == n}
+    c = mapping.get('c')
+    if n and isinstance(c, np.ndarray) and c.ndim == 1 and 'vmin' not in mapping:
+        # The scatters share a single color scale
+        mapping = dict(mapping, vmin=np.nanmin(c), vmax=np.nanmax(c))
+
+    order = np.argsort(codes, kind='mergesort')  # stable, keeps the drawing order of each shape's points
+    bounds = np.searchsorted(codes[order], np.arange(-1, len(markers) + 1))
+    markers = [matplotlib.rcParams['scatter.marker']] + list(markers)
+    for i, marker in enumerate(markers):
+        rows = order[bounds[i]:bounds[i + 1]]
+        if len(rows):
+            ax.scatter(marker=marker, **{k: v[rows] if k in per_point else v for k, v in mapping.items()})
+
+
+def _can_rasterize(chart, mapping, x, y):
+    """Whether a scatter plot can be drawn as an image: its positions are finite numbers on linear scales,
+    and its colors, if any, are a scale of numbers. An image can't show shapes, strokes or categories."""
+    linear = all(name in chart.encoding and chart.encoding[name].scale.get('type', 'linear') == 'linear'
+                 for name in ['x', 'y'])
+    categorical = ('marker' in mapping or 'edgecolors' in mapping
+                   or (isinstance(mapping.get('c'), np.ndarray) and mapping['c'].ndim == 2))
+    return linear and not categorical and _can_aggregate(x, y)
+
+
+def _add_scatter_image(ax, x, y, color=None, size=None):
+    """Draw the points of a scatter plot as a single image, with one pixel per bin
+
+    Parameters
+    ----------
+    ax
+        The Matplotlib axes object
+    x, y : np.array
+        The position of the points
+    color : optional
+        The color of the points. Each bin shows the average color of its points, if there is one per point.
+    size : optional
+        The size of the points. Without a color, each bin shows the total size of its points.
+    """
+    per_point = [arr if isinstance(arr, np.ndarray) and arr.ndim == 1 and len(arr) == len(x) and _can_aggregate(arr)
+                 else None for arr in (color, size)]
+    image, extent = _aggregate(x, y, *_axes_pixels(ax), color=per_point[0], size=per_point[1])
+    ax.imshow(image, extent=extent, origin='lower', aspect='auto', interpolation='nearest')
+
+
+def _bin_extents(chart, channel):
+    """The start and end of the bin of each row of a binned channel, e.g. of each bar
+
+    Parameters
+    ----------
+    chart : parse_chart.ChartMetadata
+    channel : str
+
+    Returns
+    -------
+    start, end : np.array
+    """
+    name = _column_name(chart.spec['encoding'][channel])
+    return chart.data[name].values, chart.data[name + '_end'].values
+
+
+def _handle_bar(chart, ax):
+    """Draw a histogram: one bar per bin of the binned channel, all in one call
+
+    Parameters
+    ----------
+    chart : parse_chart.ChartMetadata
+        The chart data and metadata
+    ax
+        The Matplotlib axes object
+
+    Notes
+    -----
+    Only bars along a binned x or y channel, without other channels, are supported.
+    """
+    binned = [name for name in ['x', 'y'] if name in chart.encoding and chart.encoding[name].bin]
+    if len(binned) != 1 or set(chart.encoding) != {'x', 'y'}:
+        raise NotImplementedError("Only bars along one binned channel are supported.")
+    start, end = _bin_extents(chart, binned[0])
+    if binned[0] == 'x':
+        ax.bar(start, chart.encoding['y'].data, width=end - start, align='edge')
+    else:
+        ax.barh(start, chart.encoding['x'].data, height=end - start, align='edge')
+
+
+def _handle_rect(chart, ax):
+    """Draw a 2D histogram or heatmap: the color of each cell of binned x and y channels, as one mesh
+
+    Parameters
+    ----------
+    chart : parse_chart.ChartMetadata
+        The chart data and metadata
+    ax
+        The Matplotlib axes object
+    """
+    if set(chart.encoding) != {'x', 'y', 'color'} or not (chart.encoding['x'].bin and chart.encoding['y'].bin):
+        raise NotImplementedError("Only rects with binned x and y channels and a color channel are supported.")
+    cells = []
+    for name in ['x', 'y']:
+        start, end = _bin_extents(chart, name)
+        edges = np.union1d(start, end)
+        cells.append((edges, np.searchsorted(edges, start)))
+    (xedges, column), (yedges, row) = cells
+    grid = np.ma.masked_all((len(yedges) - 1, len(xedges) - 1))
+    grid[row, column] = chart.encoding['color'].data
+    ax.pcolormesh(xedges, yedges, grid)
+
+
+def _handle_line(chart, ax, max_points=None, decimation='minmax'):
     """Convert encodings, manipulate data if needed, plot on ax.
 
     Parameters
@@ -14,6 +239,12 @@ def _handle_line(chart, ax):
     ax
         The Matplotlib axes object
 
+    max_points : int, optional
+        Decimate each line with more points than this
+
+    decimation : {'minmax', 'lttb'}, optional
+        The decimation method (see ``_decimate._decimate_line``)
+
     Notes
     -----
     Fill isn't necessary until mpl-altair can handle multiple plot types in one plot.
@@ -22,7 +253,6 @@ def _handle_line(chart, ax):
     Shape is unsupported in line graphs unless another plot type is plotted at the same time.
     """
     groups = []
-    kwargs = {}
 
     if chart.encoding.get('opacity'):
         groups.append('opacity')
@@ -31,42 +261,139 @@ def _handle_line(chart, ax):
     elif chart.encoding.get('color'):
         groups.append('color')
 
-    list_fields = lambda c, g: [chart.encoding[i].field for i in g]
-    try:
-        for label, subset in chart.data.groupby(list_fields(chart, groups)):
-            if 'opacity' in groups:
-                kwargs['alpha'] = _opacity_norm(chart, subset[chart.encoding['opacity'].field].iloc[0])
+    x, y = np.asarray(chart.encoding['x'].data), np.asarray(chart.encoding['y'].data)
+    width = _axes_pixels(ax)[0] if max_points is not None else None
+    if not groups:
+        if max_points is not None:
+            keep = _decimate_line(x, y, max_points, decimation, width)
+            if keep is not None:
+                x, y = x[keep], y[keep]
+        ax.plot(x, y)
+        return
+
+    # One line per combination of the grouping channels' values, in the same order as DataFrame.groupby.
+    # The alpha and color of each value are looked up from tables computed once for the whole chart.
+    kwargs = {}
+    if groups == ['opacity']:
+        kwargs['color'] = matplotlib.rcParams['lines.color']
+    codes, lookups = [], []
+    for name in groups:
+        channel = chart.encoding[name]
+        if channel.type in ['nominal', 'ordinal']:
+            unique, inverse = channel.categories, channel.codes
+        else:
+            unique, inverse = np.unique(channel.data, return_inverse=True)
+        codes.append(inverse)
+        if name == 'opacity':
+            lookups.append(('alpha', _opacity_norm(chart.encoding[name], unique)))
+        else:
+            lookups.append(('color', _color_cycle(len(unique))))
+
+    codes = np.column_stack(codes)
+    valid = (codes >= 0).all(axis=1)
+    if not valid.all():
+        # Rows with a missing nominal or ordinal value (code -1) aren't drawn, as groupby drops them
+        codes, x, y = codes[valid], x[valid], y[valid]
+    keys, group_of_row = np.unique(codes, axis=0, return_inverse=True)
+    order = np.argsort(group_of_row, kind='mergesort')  # stable, keeps the rows of each line in order
+    bounds = np.searchsorted(group_of_row[order], np.arange(len(keys) + 1))
+    x, y = x[order], y[order]
+    if max_points is not None:
+        x, y, bounds = _decimate_lines(x, y, bounds, max_points, decimation, width)
+    props = {prop: np.asarray(table)[column] for (prop, table), column in zip(lookups, keys.T)}
+
+    if len(keys) >= _LINE_COLLECTION_MIN_LINES:
+        _add_line_collection(ax, x, y, bounds, props, kwargs.get('color'))
+        return
+    for i in range(len(keys)):
+        kwargs.update((prop, values[i]) for prop, values in props.items())
+        ax.plot(x[bounds[i]:bounds[i + 1]], y[bounds[i]:bounds[i + 1]], **kwargs)
+
+
+def _decimate_lines(x, y, bounds, max_points, decimation, width):
+    """Decimate each line of a grouped line chart
+
+    Parameters
+    ----------
+    x, y : np.array
+        The data of all the lines, sorted by line
+    bounds : np.array
+        Line i is made of the rows ``bounds[i]:bounds[i + 1]``
+    max_points, decimation, width
+        See ``_decimate._decimate_line``
+
+    Returns
+    -------
+    x, y, bounds
+        The decimated data and the new bounds of the lines
+    """
+    keep, lengths = [], np.diff(bounds)
+    for i in np.flatnonzero(lengths > max_points):
+        start, stop = bounds[i], bounds[i + 1]
+        kept = _decimate_line(x[start:stop], y[start:stop], max_points, decimation, width)
+        if kept is not None:
+            keep.append((i, start + kept))
+    if not keep:
+        return x, y, bounds
+    mask = np.ones(len(x), dtype=bool)
+    for i, kept in keep:
+        mask[bounds[i]:bounds[i + 1]] = False
+        mask[kept] = True
+        lengths[i] = len(kept)
+    return x[mask], y[mask], np.r_[0, np.cumsum(lengths)]
 
-                if 'color' not in groups and 'stroke' not in groups:
-                    kwargs['color'] = matplotlib.rcParams['lines.color']
-            ax.plot(subset[chart.encoding['x'].field], subset[chart.encoding['y'].field], **kwargs)
-    except ValueError:
-        ax.plot(chart.encoding['x'].data, chart.encoding['y'].data)
 
+def _add_line_collection(ax, x, y, bounds, props, color=None):
+    """Draw many lines as a single LineCollection, which is much faster to create and draw than a Line2D per line.
 
-def _opacity_norm(chart, val):
+    Parameters
+    ----------
+    ax
+        The Matplotlib axes object
+    x, y : np.array
+        The data of all the lines, sorted by line
+    bounds : np.array
+        Line i is made of the rows ``bounds[i]:bounds[i + 1]``
+    props : dict
+        The 'color' and/or 'alpha' of each line
+    color : optional
+        The color of all the lines, if they don't have their own
+    """
+    n = len(bounds) - 1
+    colors = mcolors.to_rgba_array(props['color'] if 'color' in props else [color] * n)
+    if 'alpha' in props:
+        colors[:, 3] = props['alpha']
+    segments = np.split(np.column_stack([x, y]), bounds[1:-1])
+    rc = matplotlib.rcParams
+    collection = LineCollection(segments, colors=colors, linewidths=rc['lines.linewidth'],
+                                capstyle=rc['lines.solid_capstyle'], joinstyle=rc['lines.solid_joinstyle'],
+                                antialiaseds=rc['lines.antialiased'])
+    ax.add_collection(collection)
+    ax.autoscale_view()
+
+
+def _opacity_norm(channel, unique):
     """
     Normalize the values of a column to be between 0.15 and 1, which is a visible range for opacity.
 
     Parameters
     ----------
-    chart : parse_chart.ChartMetadata
-        The Altair chart object
-    val
-        The specific value to be normalized.
+    channel : parse_chart.ChannelMetadata
+        The opacity channel
+    unique : np.array
+        The sorted unique values of the channel
 
     Returns
     -------
-    The normalized value (between 0.15 and 1)
+    The normalized value (between 0.15 and 1) of each unique value
     """
-    arr = chart.encoding['opacity'].data
-    if chart.encoding['opacity'].type in ['ordinal', 'nominal', 'temporal']:
-        unique, indices = np.unique(arr, return_inverse=True)
-        arr = indices
-        if chart.encoding['opacity'].type == "temporal":
-            val = unique.tolist().index(_convert_to_mpl_date(val))
-        else:
-            val = unique.tolist().index(val)
+    if channel.type in ['ordinal', 'nominal', 'temporal']:
+        arr = np.arange(len(unique))  # the rank of each value
+    else:
+        arr = unique.astype(float)
     data_min, data_max = (arr.min(), arr.max())
     desired_min, desired_max = (0.15, 1)  # Chosen so that the minimum value is visible (aka nonzero)
-    return ((val - data_min) / (data_max - data_min)) * (desired_max - desired_min) + desired_min
\ No newline at end of file
+    if data_max == data_min:
+        return np.full(len(arr), desired_max)
+    return ((arr - data_min) / (data_max - data_min)) * (desired_max - desired_min) + desired_min
+
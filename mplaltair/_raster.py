@@ -0,0 +1,71 @@
+import numpy as np
+
+# The number of points binned at once, which bounds the memory used on top of the image
+_CHUNK_SIZE = 2**20
+
+
+def _can_aggregate(*arrays):
+    """Whether the arrays only hold finite numbers, so their points can be binned"""
+    return all(np.issubdtype(arr.dtype, np.number) and len(arr) and np.isfinite([np.min(arr), np.max(arr)]).all()
+               for arr in arrays)
+
+
+def _bin_edges(values):
+    """The range of the values, widened if it is empty so it can be split into bins"""
+    lo, hi = float(np.min(values)), float(np.max(values))
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return lo, hi
+
+
+def _aggregate(x, y, width, height, color=None, size=None):
+    """Aggregates points into an image of width x height bins
+
+    The points are binned in chunks, so apart from the image itself the memory used doesn't depend
+    on the number of points.
+
+    Parameters
+    ----------
+    x, y : np.array
+        The position of the points
+    width, height : int
+        The number of bins along x and y
+    color : np.array, optional
+        A value per point, averaged in each bin
+    size : np.array, optional
+        The size of each point. Bins with bigger points are denser.
+
+    Returns
+    -------
+    image : np.ma.MaskedArray
+        The average color of the points in each bin if ``color`` is given, otherwise the number of
+        points in each bin (weighted by their size if ``size`` is given), with empty bins masked.
+        Rows go from the lowest y to the highest.
+    extent : tuple
+        The (left, right, bottom, top) data coordinates of the image
+    """
+    xlo, xhi = _bin_edges(x)
+    ylo, yhi = _bin_edges(y)
+    xscale, yscale = width / (xhi - xlo), height / (yhi - ylo)
+    counts = np.zeros(width * height)
+    sums = np.zeros(width * height) if color is not None or size is not None else None
+
+    for start in range(0, len(x), _CHUNK_SIZE):
+        chunk = slice(start, start + _CHUNK_SIZE)
+        cx = np.minimum(((x[chunk] - xlo) * xscale).astype(np.intp), width - 1)
+        cy = np.minimum(((y[chunk] - ylo) * yscale).astype(np.intp), height - 1)
+        cells = cy * width + cx
+        counts += np.bincount(cells, minlength=width * height)
+        if color is not None:
+            sums += np.bincount(cells, weights=color[chunk], minlength=width * height)
+        elif size is not None:
+            sums += np.bincount(cells, weights=size[chunk], minlength=width * height)
+
+    empty = counts == 0
+    if color is not None:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            image = sums / counts
+    else:
+        image = sums if size is not None else counts
+    image = np.ma.masked_array(image, mask=empty).reshape(height, width)
+    return image, (xlo, xhi, ylo, yhi)
@@ -0,0 +1,46 @@
+from ._marks import _draw, _new_figure
+from .parse_chart import ChartMetadata
+
+# Data sources of the charts, set once per worker process by _init_worker
+_sources = {}
+_caches = {}
+
+
+def _init_worker(sources):
+    """Initializes a worker process of render_batch.
+
+    The worker has imported Matplotlib, Altair and mplaltair by the time this runs, so it renders
+    its first chart as fast as the following ones. The data sources are received here, once per
+    worker: with the fork start method they are inherited from the parent process without any
+    copying or pickling at all.
+    """
+    global _sources, _caches
+    _sources = sources
+    _caches = {}
+
+
+def _render_chart(task):
+    """Renders one chart to a file, returning the error instead of raising it.
+
+    Parameters
+    ----------
+    task : tuple
+        The index, compiled specification and data source of the chart, the output path and
+        the keyword arguments of ``savefig``
+
+    Returns
+    -------
+    index : int
+    error : Exception or None
+    """
+    index, spec, key, path, savefig_kwargs = task
+    try:
+        chart = ChartMetadata(None, spec, _sources[key], _caches.setdefault(key, {}))
+        fig, ax = _new_figure()
+        _draw(chart, ax)
+        fig.tight_layout()
+        fig.savefig(path, **savefig_kwargs)
+    except Exception as err:
+        return index, err
+    return index, None
+
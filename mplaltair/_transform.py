@@ -0,0 +1,510 @@
+import collections
+import functools
+import json
+import operator
+import time
+
+import numpy as np
+import pandas as pd
+
+from ._data import _altair_DateTime_to_datetime, _project, _to_datetime64, _truncate_dates, _with_columns
+from ._expr import _compile_expression, _truthy
+
+# The transforms that can be compiled, by the key that identifies them in the specification
+_TRANSFORMS = ('filter', 'calculate', 'fold', 'window')
+
+_COMPARISONS = {'lt': np.less, 'lte': np.less_equal, 'gt': np.greater, 'gte': np.greater_equal}
+
+_WINDOW_RANKS = ('row_number', 'rank', 'dense_rank', 'percent_rank', 'cume_dist', 'ntile')
+_WINDOW_AGGREGATES = ('count', 'valid', 'missing', 'sum', 'mean', 'average', 'min', 'max')
+_WINDOW_VALUES = ('lag', 'lead', 'first_value', 'last_value', 'nth_value')
+
+
+def _compile_transforms(transforms):
+    """Compiles the transforms of a vega-lite specification into a plan of vectorized operations
+
+    Filters that only read fields of the data source and are not preceded by a transform that changes
+    the rows (a fold or a window) are pushed down: they are applied while the data is loaded, before
+    any other transform. Consecutive filters are combined into a single mask, and consecutive
+    calculations are evaluated in a single stage that copies the data once.
+
+    Parameters
+    ----------
+    transforms : list of dict
+        The ``transform`` list of the compiled specification
+
+    Returns
+    -------
+    _TransformPlan
+
+    Raises
+    ------
+    NotImplementedError
+        Raised for transforms other than filter, calculate, fold and window
+    """
+    pushdown, stages = [], []
+    inputs, produced = {}, set()
+    rowwise = True  # whether the transforms so far keep the rows as they are
+    for transform in transforms:
+        kind = next((kind for kind in _TRANSFORMS if kind in transform), None)
+        if kind is None:
+            raise NotImplementedError("The {} transform is not supported.".format(next(iter(transform), None)))
+
+        fields, outputs = _transform_fields(kind, transform)
+        for field, dtype in fields.items():
+            if field not in produced:
+                inputs[field] = dtype if inputs.get(field, dtype) == dtype else None
+
+        if kind == 'filter' and rowwise and not produced.intersection(fields):
+            pushdown.append(transform['filter'])
+            continue
+        if kind in ('filter', 'calculate') and stages and stages[-1][0] == kind:
+            stages[-1][1].append(transform)
+        else:
+            stages.append((kind, [transform]))
+        rowwise = rowwise and kind in ('filter', 'calculate')
+        produced.update(outputs)
+
+    return _TransformPlan(_RowFilter(pushdown) if pushdown else None, stages, inputs, produced)
+
+
+def _transform_fields(kind, transform):
+    """The fields a transform reads, with their vega-lite type if it is known, and the fields it creates"""
+    if kind == 'filter':
+        return _predicate_fields(transform['filter']), []
+    if kind == 'calculate':
+        return dict.fromkeys(_compile_expression(transform['calculate']).fields), [transform['as']]
+    if kind == 'fold':
+        return dict.fromkeys(transform['fold']), transform.get('as', ['key', 'value'])
+    fields = [op['field'] for op in transform['window'] if op.get('field')]
+    fields += transform.get('groupby', []) + [key['field'] for key in transform.get('sort', [])]
+    return dict.fromkeys(fields), [op['as'] for op in transform['window']]
+
+
+def _predicate_fields(predicate):
+    """The fields a filter predicate reads, mapped to 'temporal' if they are truncated to a time unit"""
+    if isinstance(predicate, str):
+        return dict.fromkeys(_compile_expression(predicate).fields)
+    if 'not' in predicate:
+        return _predicate_fields(predicate['not'])
+    if 'and' in predicate or 'or' in predicate:
+        fields = {}
+        for operand in predicate.get('and', predicate.get('or')):
+            fields.update(_predicate_fields(operand))
+        return fields
+    if 'field' not in predicate:
+        return {}
+    return {predicate['field']: 'temporal' if predicate.get('timeUnit') else None}
+
+
+class _RowFilter(object):
+    """Filter predicates combined with a logical and, called with a DataFrame to get the mask of the rows to keep
+
+    Its representation identifies the predicates, e.g. in the key of the data loaded with them.
+    """
+    def __init__(self, predicates):
+        self.predicates = predicates
+
+    def __call__(self, data):
+        return _filter_mask(data, self.predicates)
+
+    def __repr__(self):
+        return json.dumps(self.predicates, sort_keys=True, default=str)
+
+
+class _TransformPlan(object):
+    """
+    The transforms of a chart, compiled by ``_compile_transforms``.
+
+    Attributes
+    ----------
+    pushdown : _RowFilter or None
+        The filters applied while the data is loaded
+    stages : list of (str, list of dict)
+        The kind of each of the following stages and the transforms it applies
+    inputs : dict
+        Maps the fields of the data source the transforms read to their type, or to None if it is unknown
+    produced : set
+        The fields the transforms create
+    timings : list of (str, float, int)
+        The name, duration in seconds and number of resulting rows of each stage of the last ``run``,
+        starting with the loading of the data if it was loaded by the plan
+    """
+    def __init__(self, pushdown, stages, inputs, produced):
+        self.pushdown = pushdown
+        self.stages = stages
+        self.inputs = inputs
+        self.produced = produced
+        self.timings = []
+
+    def columns(self, encoding_columns):
+        """The columns of the data source to load: those of the encoding that no transform creates and those
+        the transforms read
+
+        Parameters
+        ----------
+        encoding_columns : dict
+            Maps the fields of the encoding to their type (see ``_data._encoding_columns``)
+
+        Returns
+        -------
+        dict
+        """
+        columns = {field: dtype for field, dtype in encoding_columns.items() if field not in self.produced}
+        for field, dtype in self.inputs.items():
+            if field not in columns or dtype is None:
+                columns.setdefault(field, dtype)
+            elif columns[field] != dtype:
+                columns[field] = None
+        return columns
+
+    def run(self, data=None, load=None, columns=None):
+        """Applies the transforms to the data
+
+        Parameters
+        ----------
+        data : pd.DataFrame, optional
+            The data source, without any filter applied
+        load : callable, optional
+            Called with the pushed down filter (or None) to load the data source if ``data`` isn't given
+        columns : collection, optional
+            The columns of the data source that are used (see ``columns``). The others are dropped
+            before the first stage that copies the rows.
+
+        Returns
+        -------
+        pd.DataFrame
+            The transformed data. The data source itself is never modified.
+        """
+        self.timings = []
+        if data is None:
+            data = self._timed('load' if self.pushdown is None else 'load and filter', load, self.pushdown)
+        elif self.pushdown is not None:
+            data = self._timed('filter', _filter, _project(data, columns),
+                               [{'filter': p} for p in self.pushdown.predicates])
+        if any(kind in ('filter', 'fold') for kind, _ in self.stages):
+            data = _project(data, columns)
+        for kind, transforms in self.stages:
+            data = self._timed(_stage_name(kind, transforms), _STAGES[kind], data, transforms)
+        return data
+
+    def _timed(self, name, func, *args):
+        start = time.perf_counter()
+        data = func(*args)
+        self.timings.append((name, time.perf_counter() - start, len(data)))
+        return data
+
+    def report(self):
+        """The timings of the last ``run``, one stage per line"""
+        return '\n'.join('{}: {:.1f} ms, {} rows'.format(name, seconds * 1000, rows)
+                         for name, seconds, rows in self.timings)
+
+
+def _stage_name(kind, transforms):
+    """The name of a stage in the timings of a plan, e.g. 'calculate a, b'"""
+    if kind == 'filter':
+        return 'filter' if len(transforms) == 1 else 'filter x{}'.format(len(transforms))
+    if kind == 'calculate':
+        names = [transform['as'] for transform in transforms]
+    elif kind == 'fold':
+        names = transforms[0].get('as', ['key', 'value'])
+    else:
+        names = [op['as'] for op in transforms[0]['window']]
+    return '{} {}'.format(kind, ', '.join(names))
+
+
+def _filter(data, transforms):
+    """Keeps the rows of the data matching every filter, with a single copy"""
+    return data[_filter_mask(data, [transform['filter'] for transform in transforms])]
+
+
+def _filter_mask(data, predicates):
+    """Whether each row matches every predicate"""
+    mask = np.ones(len(data), dtype=bool)
+    for predicate in predicates:
+        mask &= _predicate_mask(data, predicate)
+    return mask
+
+
+def _predicate_mask(data, predicate):
+    """Evaluates a vega-lite filter predicate over the whole data
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+    predicate : str or dict
+        An expression, a field predicate (equal, range, oneOf, lt, lte, gt, gte or valid) or a logical
+        composition of predicates
+
+    Returns
+    -------
+    np.array of bool
+    """
+    if isinstance(predicate, str):
+        return _truthy(_broadcast(_compile_expression(predicate)(data), len(data)))
+    if 'not' in predicate:
+        return ~_predicate_mask(data, predicate['not'])
+    if 'and' in predicate:
+        return np.logical_and.reduce([_predicate_mask(data, p) for p in predicate['and']] + [np.ones(len(data), bool)])
+    if 'or' in predicate:
+        return np.logical_or.reduce([_predicate_mask(data, p) for p in predicate['or']] + [np.zeros(len(data), bool)])
+    if 'selection' in predicate:
+        raise NotImplementedError("Selections are interactive and can't be used to filter a static chart.")
+
+    values = data[predicate['field']].values
+    if predicate.get('timeUnit'):
+        values = _truncate_dates(_to_datetime64(values), predicate['timeUnit'])
+    with np.errstate(invalid='ignore'):
+        if 'equal' in predicate:
+            return values == _predicate_constant(predicate['equal'], values)
+        if 'range' in predicate:
+            lo, hi = (_predicate_constant(bound, values) for bound in predicate['range'])
+            mask = pd.notnull(values)
+            if lo is not None:
+                mask &= values >= lo
+            if hi is not None:
+                mask &= values <= hi
+            return mask
+        if 'oneOf' in predicate:
+            return pd.Series(values).isin([_predicate_constant(v, values) for v in predicate['oneOf']]).values
+        if 'valid' in predicate:
+            valid = pd.notnull(values)
+            return valid if predicate['valid'] else ~valid
+        for op, compare in _COMPARISONS.items():
+            if op in predicate:
+                return pd.notnull(values) & compare(values, _predicate_constant(predicate[op], values))
+    raise ValueError("Invalid filter predicate {!r}".format(predicate))
+
+
+def _predicate_constant(value, values):
+    """Converts a constant of a predicate to the type of the values it is compared with"""
+    if value is None or not np.issubdtype(values.dtype, np.datetime64):
+        return value
+    if isinstance(value, dict):  # Altair DateTime
+        value = _altair_DateTime_to_datetime(value)
+    elif isinstance(value, (int, float)):  # a timestamp in milliseconds, as in JavaScript
+        return np.datetime64(int(value), 'ms')
+    return np.datetime64(pd.Timestamp(value))
+
+
+def _broadcast(values, length):
+    """Repeats the result of an expression that doesn't read any field for every row"""
+    if np.ndim(values) == 0:
+        return np.full(length, values)
+    return np.asarray(values)
+
+
+def _calculate(data, transforms):
+    """Adds the result of each calculation to a single shallow copy of the data"""
+    results = collections.OrderedDict()
+    columns = collections.ChainMap(results, data)  # later calculations read the earlier ones
+    for transform in transforms:
+        results[transform['as']] = _broadcast(_compile_expression(transform['calculate'])(columns), len(data))
+    return _with_columns(data, results)
+
+
+def _fold(data, transforms):
+    """Turns the folded fields of each row into as many rows, with the name of the field and its value"""
+    for transform in transforms:
+        fields = transform['fold']
+        key, value = transform.get('as', ['key', 'value'])
+        rows = np.repeat(np.arange(len(data)), len(fields))
+        folded = data.iloc[rows].reset_index(drop=True)
+        folded[key] = np.tile(np.array(fields, dtype=object), len(data))
+        folded[value] = data[fields].values.ravel()  # row by row, as the fields are listed
+        data = folded
+    return data
+
+
+def _window(data, transforms):
+    """Adds the result of each window operation to a shallow copy of the data, in the original row order"""
+    for transform in transforms:
+        window = _Window(data, transform)
+        data = _with_columns(data, collections.OrderedDict(
+            (op['as'], window.compute(op)) for op in transform['window']))
+    return data
+
+
+class _Window(object):
+    """The partitions, sort order and frames of a window transform, with the rows in sorted order
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+    transform : dict
+        The window transform
+    """
+    def __init__(self, data, transform):
+        self.data = data
+        n = len(data)
+        # Missing values form a partition of their own
+        groupby = [pd.factorize(data[field].values)[0] + 1 for field in transform.get('groupby', [])]
+        sort = transform.get('sort', [])
+        sort_codes = [_sort_codes(data[key['field']].values, key.get('order') == 'descending') for key in sort]
+        keys = groupby + sort_codes
+        self.order = _stable_order(keys, n) if keys else None
+
+        index = np.arange(n)
+        self.index = index
+        partition = _changes([codes if self.order is None else codes[self.order] for codes in groupby], n)
+        self.part_start, self.part_end = _run_bounds(partition)
+        if sort:
+            peers = partition | _changes([codes[self.order] for codes in sort_codes], n)
+            self.peer_start, self.peer_end = _run_bounds(peers)
+        else:  # every row is its own peer
+            self.peer_start, self.peer_end = index, index + 1
+        self.partition = np.cumsum(partition) - 1
+        self.frame = transform.get('frame', [None, 0])
+        self.peers = bool(sort) and not transform.get('ignorePeers', False)
+
+    def _sorted(self, field):
+        values = self.data[field].values
+        return values if self.order is None else values[self.order]
+
+    def _unsorted(self, values):
+        if self.order is None:
+            return values
+        result = np.empty_like(values)
+        result[self.order] = values
+        return result
+
+    def _bounds(self):
+        """The first row of the frame of each row and the row after its last one, in sorted order"""
+        start, stop = self.frame
+        index, part_start, part_end = self.index, self.part_start, self.part_end
+        lo = part_start if start is None else np.minimum(np.maximum(index + start, part_start), part_end)
+        hi = part_end if stop is None else np.minimum(np.maximum(index + stop + 1, part_start), part_end)
+        if self.peers and len(index):  # the frame is widened to the peers of its first and last rows
+            filled = hi > lo
+            lo = np.where(filled, self.peer_start[np.minimum(lo, len(index) - 1)], lo)
+            hi = np.where(filled, self.peer_end[np.maximum(hi - 1, 0)], hi)
+        return lo, hi
+
+    def compute(self, op):
+        """The result of a window operation for each row, in the original row order"""
+        name = op['op']
+        if name in _WINDOW_RANKS:
+            result = self._rank(name, op.get('param'))
+        elif name in _WINDOW_AGGREGATES:
+            result = self._aggregate(name, self._sorted(op['field']) if op.get('field') else None)
+        elif name in _WINDOW_VALUES:
+            result = self._value(name, self._sorted(op['field']), op.get('param'))
+        else:
+            raise NotImplementedError("The {} window operation is not supported.".format(name))
+        return self._unsorted(result)
+
+    def _rank(self, name, param):
+        start, size = self.part_start, self.part_end - self.part_start
+        if name == 'row_number':
+            return self.index - start + 1
+        if name == 'ntile':
+            return 1 + (self.index - start) * param // size
+        if name == 'dense_rank':
+            first_peers = np.cumsum(self.peer_start == self.index)
+            return first_peers - first_peers[start] + 1
+        rank = self.peer_start - start + 1
+        if name == 'rank':
+            return rank
+        if name == 'percent_rank':
+            return np.where(size > 1, (rank - 1) / np.maximum(size - 1, 1), 0.)
+        return (self.peer_end - start) / size  # cume_dist
+
+    def _aggregate(self, name, values):
+        lo, hi = self._bounds()
+        if name == 'count':
+            return hi - lo
+        values = values.astype(float)
+        valid = ~np.isnan(values)
+        counts = np.r_[0, np.cumsum(valid)]
+        if name in ('valid', 'missing'):
+            result = counts[hi] - counts[lo]
+            return result if name == 'valid' else hi - lo - result
+        if name in ('sum', 'mean', 'average'):
+            sums = np.r_[0., np.cumsum(np.where(valid, values, 0.))]
+            result = sums[hi] - sums[lo]
+            if name == 'sum':
+                return result
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return result / (counts[hi] - counts[lo])
+
+        # min and max: running extremes through the partition, from its first row or from its last one
+        fill = np.inf if name == 'min' else -np.inf
+        values = np.where(valid, values, fill)
+        accumulate = 'cummin' if name == 'min' else 'cummax'
+        filled = hi > lo
+        if self.frame[0] is None:
+            running = getattr(pd.Series(values).groupby(self.partition), accumulate)().values
+            result = running[np.maximum(hi - 1, 0)] if len(values) else values
+        elif self.frame[1] is None:
+            reverse = pd.Series(values[::-1]).groupby(self.partition[::-1])
+            running = getattr(reverse, accumulate)().values[::-1]
+            result = running[np.minimum(lo, len(values) - 1)] if len(values) else values
+        else:
+            raise NotImplementedError("min and max are only supported over frames that start or end with "
+                                      "their partition.")
+        return np.where(filled & (result != fill), result, np.nan)
+
+    def _value(self, name, values, param):
+        if name in ('lag', 'lead'):
+            offset = param or 1
+            rows = self.index - offset if name == 'lag' else self.index + offset
+            found = (rows >= self.part_start) & (rows < self.part_end)
+        else:
+            lo, hi = self._bounds()
+            rows = {'first_value': lo, 'last_value': hi - 1, 'nth_value': lo + (param or 1) - 1}[name]
+            found = (rows >= lo) & (rows < hi)
+        if not len(values):
+            return values
+        result = values[np.where(found, rows, 0)]
+        if not found.all():
+            result = result.astype(float if result.dtype.kind in 'biuf' else object)
+            result[~found] = np.nan if result.dtype == float else None
+        return result
+
+
+def _sort_codes(values, descending):
+    """Non-negative integers that sort like the values, at most as large as the number of values"""
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    if values.dtype.kind in 'biuM' and int(values.max()) - int(values.min()) <= len(values):
+        codes = values.astype(np.int64) - int(values.min())
+    elif values.dtype.kind in 'biufmM':
+        codes = np.unique(values, return_inverse=True)[1].astype(np.int64)
+    else:
+        codes = pd.factorize(values, sort=True)[0].astype(np.int64) + 1  # missing values first
+    return codes.max() - codes if descending else codes
+
+
+def _stable_order(keys, n):
+    """The order of the rows sorted by each key in turn, keeping the original order of equal rows
+
+    The keys and the position of each row are packed into a single integer when they fit, which is
+    much faster to sort than with np.lexsort.
+    """
+    spans = [int(key.max()) + 1 if len(key) else 1 for key in keys]
+    if functools.reduce(operator.mul, spans, n) >= 2**63:
+        return np.lexsort(keys[::-1])
+    packed = np.zeros(n, dtype=np.int64)
+    for key, span in zip(keys, spans):
+        packed = packed * span + key
+    return np.sort(packed * n + np.arange(n)) % max(n, 1)
+
+
+def _changes(codes, n):
+    """Whether each row starts a new run of equal keys, for rows in sorted order"""
+    changes = np.zeros(n, dtype=bool)
+    if n:
+        changes[0] = True
+    for values in codes:
+        changes[1:] |= values[1:] != values[:-1]
+    return changes
+
+
+def _run_bounds(starts):
+    """The first row of the run of each row and the row after its last one, given where runs start"""
+    first = np.flatnonzero(starts)
+    run = np.cumsum(starts) - 1
+    return first[run], np.r_[first[1:], len(starts)][run]
+
+
+_STAGES = {'filter': _filter, 'calculate': _calculate, 'fold': _fold, 'window': _window}
@@ -1,11 +1,105 @@
-from urllib.request import urlopen
-from urllib.error import HTTPError
+import functools
 
 import pandas as pd
 
+from ._cache import _url_cache
+
+_CSV_CHUNKSIZE = 2**16  # rows parsed at a time when streaming a CSV file
+
+
+def _apply_type_hints(df, columns):
+    """Parses the columns of a freshly read DataFrame according to their vega-lite type.
+
+    Quantitative columns that pandas left as objects are parsed as numbers (invalid values
+    become NaN, as in vega) and temporal columns are parsed as datetime64, which is much smaller
+    than the strings they were read as. Columns of other types are left untouched.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+    columns : dict
+        Maps column names to their vega-lite type
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    for name, dtype in columns.items():
+        if name not in df:
+            continue
+        col = df[name]
+        if dtype == 'quantitative' and col.dtype == object:
+            df[name] = pd.to_numeric(col, errors='coerce')
+        elif dtype == 'temporal' and col.dtype == object:
+            try:
+                df[name] = pd.to_datetime(col)
+            except (ValueError, OverflowError):
+                pass  # left for _convert_to_mpl_date to deal with or reject
+    return df
+
+
+def _read_csv(f, columns=None, row_filter=None):
+    """Parses a CSV file object in chunks, straight from the response stream.
+
+    Parameters
+    ----------
+    f : file object
+    columns : dict, optional
+        Maps the names of the columns to load to their vega-lite type. All columns are loaded
+        if not given.
+    row_filter : callable, optional
+        Called with each parsed chunk, returns the mask of its rows to keep, so the rows that are
+        filtered out are never accumulated
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    if columns is None and row_filter is None:
+        return pd.read_csv(f)
+    usecols = None if columns is None else (lambda name: name in columns)
+    reader = pd.read_csv(f, usecols=usecols, chunksize=_CSV_CHUNKSIZE)
+    chunks = [_filter_rows(_apply_type_hints(chunk, columns or {}), row_filter) for chunk in reader]
+    if not chunks:
+        return pd.DataFrame(columns=list(columns or ()))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read_json(f, columns=None, row_filter=None):
+    """Parses a JSON file object.
+
+    Parameters
+    ----------
+    f : file object
+    columns : dict, optional
+        Maps the names of the columns to keep to their vega-lite type. All columns are kept
+        if not given.
+    row_filter : callable, optional
+        Returns the mask of the rows to keep
+
+    Returns
+    -------
+    pd.DataFrame
+
+    Notes
+    -----
+    JSON arrays can't be parsed incrementally with pandas, so the other columns are only dropped
+    once the whole file is parsed.
+    """
+    df = pd.read_json(f)
+    if columns is not None:
+        df = _apply_type_hints(df[[name for name in df.columns if name in columns]], columns)
+    return _filter_rows(df, row_filter)
+
+
+def _filter_rows(df, row_filter):
+    """Keeps the rows of a DataFrame selected by ``row_filter``, if given"""
+    return df if row_filter is None else df[row_filter(df)]
+
+
 _PD_READERS = {
-    'json': pd.read_json,
-    'csv': pd.read_csv
+    'json': _read_json,
+    'csv': _read_csv
 }
 
 def _get_format(url):
@@ -15,14 +109,25 @@ def _get_format(url):
     """
     return url.split('.')[-1]
 
-def _fetch(url):
+def _fetch(url, columns=None, row_filter=None):
     """Downloads the file from the given url as a Pandas DataFrame
 
+    The parsed file is cached (see ``_cache._URLDataCache``), so the url is only downloaded
+    again once the cached copy is stale and the server reports that the file changed.
+
     Parameters
     ----------
     url : string
     URL of the file to be downloaded
 
+    columns : dict, optional
+    Maps the names of the columns to load to their vega-lite type, which is used to parse them.
+    All columns are loaded if not given.
+
+    row_filter : callable, optional
+    Returns the mask of the rows to keep out of a DataFrame of parsed rows. Its representation
+    identifies it in the cache, so it must describe what it keeps (see ``_transform._RowFilter``).
+
     Returns
     -------
     pd.DataFrame
@@ -36,7 +141,11 @@ def _fetch(url):
     try:
         ext = _get_format(url)
         reader = _PD_READERS[ext]
-        df = reader(urlopen(url).read())
     except KeyError:
         raise NotImplementedError('File format not implemented')
-    return df
+    if columns is None and row_filter is None:
+        return _url_cache.fetch(url, reader)
+    key = '{}#{}'.format(url, sorted(columns.items()) if columns is not None else None)
+    if row_filter is not None:
+        key += '#{!r}'.format(row_filter)
+    return _url_cache.fetch(url, functools.partial(reader, columns=columns, row_filter=row_filter), key=key)
@@ -1,4 +1,196 @@
-from mplaltair._data import _convert_to_mpl_date, _normalize_data
+import collections
+import functools
+import hashlib
+import json
+
+import altair as alt
+import pandas as pd
+from mplaltair._cache import _metadata_cache, _url_cache
+from mplaltair._transform import _compile_transforms
+from mplaltair._data import (_ColumnStore, _aggregate_data, _aggregate_name, _apply_bins, _apply_time_units,
+                             _column_name, _convert_to_mpl_date, _count_bins, _data_key, _encoding_columns,
+                             _is_histogram, _normalize_data, _read_only)
+
+
+def _compile_spec(alt_chart):
+    """Compile the Altair chart to its vega-lite specification.
+
+    This is the only place ``to_dict()`` is called during a conversion. Every consumer of the
+    specification (``ChannelMetadata``, ``_convert``, ``_handle_line``, ``convert_axis``) reads
+    it from the resulting ``ChartMetadata``.
+
+    Parameters
+    ----------
+    alt_chart : altair.Chart
+        The Altair chart
+
+    Returns
+    -------
+    spec : dict
+        The vega-lite specification. When the chart data is a DataFrame, the data is only used
+        to infer the encoding types and is not serialized into ``spec['data']``.
+    """
+    data = alt_chart.data
+    if not isinstance(data, pd.DataFrame):
+        return alt_chart.to_dict()
+
+    # Serializing a DataFrame to inline values is by far the most expensive part of to_dict()
+    # and the result is never used, since the DataFrame itself is available. Resolve the
+    # encoding against the DataFrame, then validate the rest of the chart with a placeholder.
+    chart = alt_chart.copy(deep=False)
+    chart.data = alt.NamedData(name='mplaltair')
+    if chart.encoding is not alt.Undefined:
+        chart.encoding = chart.encoding.to_dict(validate=False, context={'data': data})
+    spec = chart.to_dict()
+    del spec['data']
+    return spec
+
+
+def _compile_batch(charts):
+    """Compile the specifications of many charts and group the charts by data source.
+
+    Parameters
+    ----------
+    charts : list of altair.Chart
+        The Altair charts
+
+    Returns
+    -------
+    specs : list of dict
+        The compiled specification of each chart, None for the charts that failed to compile
+    keys : list
+        The data source of each chart (see ``_data._data_key``), None for the charts that failed
+        to compile
+    columns : dict
+        Maps each data source to the columns used by all of its charts and their type
+        (see ``_chart_columns``)
+    errors : list of Exception or None
+        The error raised while compiling each chart, if any. A chart that fails to compile doesn't
+        prevent the others from compiling.
+    """
+    specs, keys, errors = [], [], []
+    columns = {}
+    for alt_chart in charts:
+        try:
+            spec = _compile_spec(alt_chart)
+            key = _data_key(alt_chart, spec)
+            chart_columns = _chart_columns(spec)
+        except Exception as err:
+            spec = key = None
+            errors.append(err)
+        else:
+            errors.append(None)
+            _merge_columns(columns.setdefault(key, {}), chart_columns)
+        specs.append(spec)
+        keys.append(key)
+    return specs, keys, columns, errors
+
+
+def _merge_columns(source_columns, columns):
+    """Adds the columns of a chart to those of its data source, in place
+
+    Parameters
+    ----------
+    source_columns : dict
+        The columns used by the charts of a source and their type (see ``_chart_columns``). A
+        column whose charts disagree on its type maps to None.
+    columns : dict
+        The columns of the chart and their type
+    """
+    for field, dtype in columns.items():
+        source_columns[field] = dtype if source_columns.get(field, dtype) == dtype else None
+
+
+class _BatchSources(object):
+    """The data sources of a stream of charts, loaded once and shared by the charts drawn from them
+
+    Charts are compiled one at a time, as they are reached. The most recently used sources are kept
+    with the columns loaded so far and their column cache (see ``ChannelMetadata``); a source is
+    loaded again, with the columns of all its charts so far, when a chart uses a column that wasn't
+    loaded. The sources are bounded in number, so the memory used doesn't grow with the stream.
+
+    Parameters
+    ----------
+    max_sources : int, optional
+        The number of sources kept
+    """
+
+    def __init__(self, max_sources=8):
+        self.max_sources = max_sources
+        self._sources = collections.OrderedDict()
+
+    def chart(self, alt_chart):
+        """Parses a chart, drawing it from its source
+
+        Parameters
+        ----------
+        alt_chart : altair.Chart
+
+        Returns
+        -------
+        ChartMetadata
+        """
+        spec = _compile_spec(alt_chart)
+        key = _data_key(alt_chart, spec)
+        columns = _chart_columns(spec)
+        source = self._sources.pop(key, None)
+        # A column loaded without a type, as the charts disagreed on it, serves every type
+        if source is None or any(field not in source[2] or source[2][field] not in (dtype, None)
+                                 for field, dtype in columns.items()):
+            loaded = dict(source[2]) if source is not None else {}
+            _merge_columns(loaded, columns)
+            source = (_normalize_data(alt_chart, spec, loaded), {}, loaded)
+        self._sources[key] = source
+        while len(self._sources) > self.max_sources:
+            self._sources.popitem(last=False)
+        data, cache, _ = source
+        return ChartMetadata(alt_chart, spec, data, cache)
+
+
+def _chart_columns(spec, transforms=None):
+    """The columns of the data source a chart uses: those of its encoding and those its transforms read
+
+    Parameters
+    ----------
+    spec : dict
+        The compiled specification of the chart
+    transforms : _transform._TransformPlan, optional
+        The compiled transforms of the chart, if they are already available
+
+    Returns
+    -------
+    dict
+        Maps each column to its type (see ``_data._encoding_columns``)
+    """
+    if transforms is None:
+        transforms = _compile_transforms(spec.get('transform', []))
+    return transforms.columns(_encoding_columns(spec))
+
+
+def _cached_metadata(alt_chart):
+    """Parses a chart, or reuses the parsed chart of an identical chart (see ``_cache._MetadataCache``)
+
+    Charts are identical when their compiled specifications are equal and they are drawn from the
+    same data: the same DataFrame object with the same shape and columns, the same URL, or inline
+    values with the same content. Changes to the values of a DataFrame in place are not detected.
+
+    Parameters
+    ----------
+    alt_chart : altair.Chart
+
+    Returns
+    -------
+    ChartMetadata
+    """
+    spec = _compile_spec(alt_chart)
+    described = {k: v for k, v in spec.items() if k != 'data'}  # the data is identified by _data_key
+    content = json.dumps(described, sort_keys=True, default=str).encode('utf-8')
+    key = (hashlib.sha1(content).hexdigest(), _data_key(alt_chart, spec))
+    source = alt_chart.data if isinstance(alt_chart.data, pd.DataFrame) else None
+    if source is not None:
+        key += (source.shape, tuple(source.columns))
+    ttl = _url_cache.ttl if key[1][0] == 'url' else None
+    return _metadata_cache.get(key, functools.partial(ChartMetadata, alt_chart, spec), source, ttl)
 
 
 class ChannelMetadata(object):
@@ -10,7 +202,11 @@ class ChannelMetadata(object):
     name : str
         The name of the encoding channel
     data : np.array
-        The data linked to the channel (temporal data is converted)
+        The data linked to the channel (temporal data is converted), as a read-only array. It is a
+        view of the chart data, shared with the other channels on the same column.
+    codes, categories : np.array
+        The dictionary encoding of the data of a channel with a field (see ``_data._ColumnStore.encoded``),
+        computed on first use
     axis : dict
     bin : boolean, None
     field : str
@@ -20,73 +216,103 @@ class ChannelMetadata(object):
     timeUnit
     title
     type : str
+
+    Parameters
+    ----------
+    channel : str
+        The name of the encoding channel
+    channel_spec : dict
+        The compiled vega-lite specification of the channel
+    data : pd.DataFrame or _data._ColumnStore
+        The chart data, or the store of its columns shared by the channels of the chart
+    cache : dict, optional
+        Derived columns of ``data``: dates converted to Matplotlib dates, keyed by (column, 'temporal'),
+        dictionary encoded columns, keyed by (column, 'codes'), and columns truncated to a time unit,
+        keyed by (column, 'timeUnit'). It is shared by the channels of every chart drawn from the
+        same data, so each column is only converted once. It is only used if ``data`` is a DataFrame.
     """
-    def __init__(self, channel, alt_chart):
-        chart_dict = alt_chart.to_dict()
+    def __init__(self, channel, channel_spec, data, cache=None):
         self.name = channel
-        self.data = self._locate_channel_data(alt_chart)
-        self.axis = chart_dict['encoding'][self.name].get('axis', {})
-        self.bin = chart_dict['encoding'][self.name].get('bin', None)
-        self.field = chart_dict['encoding'][self.name].get('field', None)
-        self.scale = chart_dict['encoding'][self.name].get('scale', {})
-        self.sort = chart_dict['encoding'][self.name].get('sort', None)
-        self.stack = chart_dict['encoding'][self.name].get('stack', None)
-        self.timeUnit = chart_dict['encoding'][self.name].get('aggregate', None)
-        self.title = chart_dict['encoding'][self.name].get('title', None)
-        self.type = self._locate_channel_dtype(alt_chart)
+        self._store = data if isinstance(data, _ColumnStore) else _ColumnStore(data, cache)
+        self._column = None if channel_spec.get('value') else self._locate_channel_column(channel_spec)
+        self.data = channel_spec.get('value') if self._column is None else self._store.column(self._column)
+        self.axis = channel_spec.get('axis', {})
+        self.bin = channel_spec.get('bin', None)
+        self.field = channel_spec.get('field', None)
+        self.scale = channel_spec.get('scale', {})
+        self.sort = channel_spec.get('sort', None)
+        self.stack = channel_spec.get('stack', None)
+        self.timeUnit = channel_spec.get('timeUnit', None)
+        self.title = channel_spec.get('title', None)
+        self.type = self._locate_channel_dtype(channel_spec)
 
         if self.type == 'temporal':
-            self.data = _convert_to_mpl_date(self.data)
+            if self._column is None:
+                self.data = _read_only(_convert_to_mpl_date(self.data))
+            else:
+                self.data = self._store.dates(self._column)
+
+    @property
+    def codes(self):
+        return self._store.encoded(self._column)[0]
+
+    @property
+    def categories(self):
+        return self._store.encoded(self._column)[1]
 
-    def _aggregate_channel(self):
-        raise NotImplementedError
+    def _aggregate_channel(self, channel_spec):
+        """Locates the aggregated data of the channel, computed by ``_data._aggregate_data``"""
+        return _aggregate_name(channel_spec)
 
-    def _handle_timeUnit(self):
-        raise NotImplementedError
+    def _handle_timeUnit(self, channel_spec):
+        """Locates the data of the channel truncated to its time unit, computed by ``_data._apply_time_units``"""
+        return _column_name(channel_spec)
 
-    def _locate_channel_data(self, alt_chart):
-        """Locates data used for each channel
+    def _handle_bin(self, channel_spec):
+        """Locates the start of the bin of each row of the channel, computed by ``_data._apply_bins``"""
+        return _column_name(channel_spec)
+
+    def _locate_channel_column(self, channel_spec):
+        """Locates the column of the chart data used for each channel
 
         Parameters
         ----------
-        alt_chart : altair.Chart
-            The Altair chart
+        channel_spec : dict
+            The compiled vega-lite specification of the channel
 
         Returns
         -------
-        A numpy ndarray containing the data used for the channel
+        The name of the column holding the data used for the channel
 
         """
 
-        channel_val = alt_chart.to_dict()['encoding'][self.name]
-        if channel_val.get('value'):
-            return channel_val.get('value')
-        elif channel_val.get('aggregate'):
-            return self._aggregate_channel()
-        elif channel_val.get('timeUnit'):
-            return self._handle_timeUnit()
+        if channel_spec.get('aggregate'):
+            return self._aggregate_channel(channel_spec)
+        elif channel_spec.get('timeUnit'):
+            return self._handle_timeUnit(channel_spec)
+        elif channel_spec.get('bin'):
+            return self._handle_bin(channel_spec)
         else:  # field is required if the above are not present.
-            return alt_chart.data[channel_val.get('field')].values
+            return channel_spec.get('field')
 
-    def _locate_channel_dtype(self, alt_chart):
+    def _locate_channel_dtype(self, channel_spec):
         """Locates dtype used for each channel
 
         Parameters
         ----------
-        alt_chart : altair.Chart
-            The Altair chart
+        channel_spec : dict
+            The compiled vega-lite specification of the channel
 
         Returns
         -------
         A string representing the data type from the Altair chart ('quantitative', 'ordinal', 'numeric', 'temporal')
         """
 
-        channel_val = alt_chart.to_dict()['encoding'][self.name]
-        if channel_val.get('type'):
-            return channel_val.get('type')
+        if channel_spec.get('type'):
+            return channel_spec.get('type')
         else:
             # TODO: find some way to deal with 'value' so that, opacity, for instance, can be plotted with a value defined
-            if channel_val.get('value'):
+            if channel_spec.get('value'):
                 raise NotImplementedError
             raise NotImplementedError
 
@@ -99,19 +325,72 @@ class ChartMetadata(object):
     Attributes
     ----------
     data : pd.DataFrame
+        The chart data, once transformed. If channels are aggregated, this is the aggregated data
+        (see ``_data._aggregate_data``). It must not be modified: it may be the DataFrame of the chart
+        itself, whose columns other than those used by the encoding are never read.
+    store : _data._ColumnStore
+        The columns of ``data`` used by the channels, which hold views of them
+    columns : dict
+        Maps the fields of the data source used by the encoding and the transforms to their type
+    transforms : _transform._TransformPlan
+        The compiled transforms of the chart. Its ``timings`` and ``report()`` give the time spent in
+        loading the data and in each stage of the transforms.
     mark : str
     encoding : dict of ChannelMetadata
+    spec : dict
+        The compiled vega-lite specification, shared by everything that needs it during the conversion
+
+    Parameters
+    ----------
+    alt_chart : altair.Chart or None
+        The Altair chart. It is only needed when ``spec`` or ``data`` is not given.
+    spec : dict, optional
+        The specification compiled by ``_compile_spec``, if it is already available
+    data : pd.DataFrame, optional
+        The already normalized chart data, before any transform. It must contain at least the columns
+        used by the encoding and the transforms.
+    cache : dict, optional
+        Converted columns of ``data`` (see ``ChannelMetadata``)
     """
 
-    def __init__(self, alt_chart):
+    def __init__(self, alt_chart, spec=None, data=None, cache=None):
 
-        if not alt_chart.to_dict().get('encoding'):
+        self.spec = _compile_spec(alt_chart) if spec is None else spec
+        if not self.spec.get('encoding'):
             raise ValueError("Encoding is not provided with the chart specification")
 
-        _normalize_data(alt_chart)
-        self.data = alt_chart.data
-        self.mark = alt_chart.mark
+        # Only the columns the encoding and the transforms refer to are loaded, and the filters that
+        # can be are applied while loading
+        self.transforms = _compile_transforms(self.spec.get('transform', []))
+        self.columns = _chart_columns(self.spec, self.transforms)
+        if data is None:
+            data = self.transforms.run(load=functools.partial(_normalize_data, alt_chart, self.spec, self.columns),
+                                       columns=self.columns)
+        else:
+            data = self.transforms.run(data, columns=self.columns)
+        source = getattr(alt_chart, 'data', None)
+        source = source if isinstance(source, pd.DataFrame) else None
+        if self.spec.get('transform'):
+            # The columns derived from the data source don't apply to the transformed data
+            cache = source = None
+        if any(channel.get('timeUnit') for channel in self.spec['encoding'].values()):
+            data = _apply_time_units(data, self.spec['encoding'], cache)
+        if _is_histogram(self.spec['encoding']):
+            # Counted straight from the bin of each row
+            data = _count_bins(data, self.spec['encoding'], source)
+            cache = None
+        else:
+            if any(channel.get('bin') for channel in self.spec['encoding'].values()):
+                data = _apply_bins(data, self.spec['encoding'], source)
+            if any(channel.get('aggregate') for channel in self.spec['encoding'].values()):
+                # Aggregated once for the whole chart. The converted columns of the source don't apply.
+                data = _aggregate_data(data, self.spec['encoding'])
+                cache = None
+        self.data = data
+        self.store = _ColumnStore(data, cache)
+        mark = self.spec['mark']
+        self.mark = mark['type'] if isinstance(mark, dict) else mark
 
         self.encoding = {}
-        for k, v in alt_chart.to_dict()['encoding'].items():
-            self.encoding[k] = ChannelMetadata(k, alt_chart)
\ No newline at end of file
+        for k, v in self.spec['encoding'].items():
+            self.encoding[k] = ChannelMetadata(k, v, self.store)
@@ -8,3 +8,24 @@ def test_mpl_figure():
     fig = plt.figure()
     del fig
 
+
+def test_import_is_lazy():
+    """Importing mplaltair must not import the heavy dependencies, only converting does."""
+    import subprocess
+    import sys
+    code = ("import sys, mplaltair; "
+            "print(sorted(m for m in ('altair', 'pandas', 'matplotlib', 'matplotlib.pyplot', 'urllib.request') "
+            "if m in sys.modules))")
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.decode().strip() == '[]'
+
+
+def test_import_submodule_attribute():
+    """Submodules are imported on first access, on every supported Python version."""
+    import subprocess
+    import sys
+    code = ("import sys, mplaltair; "
+            "print('mplaltair.parse_chart' in sys.modules, mplaltair.parse_chart.__name__, "
+            "hasattr(mplaltair, 'missing'))")
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.decode().split() == ['False', 'mplaltair.parse_chart', 'False']
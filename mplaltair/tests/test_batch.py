@@ -0,0 +1,93 @@
+import itertools
+
+import altair as alt
+import pandas as pd
+import pytest
+
+import mplaltair.parse_chart
+from mplaltair import convert, convert_many
+
+
+df = pd.DataFrame({
+    'a': [1, 2, 3], 'b': [1.2, 2.4, 3.8], 'c': [7, 5, 3], 'unused': [0, 0, 0],
+    'years': pd.to_datetime(['1/1/2015', '1/1/2016', '1/1/2017'])
+})
+df_other = pd.DataFrame({'a': [3, 2, 1], 'b': [1, 2, 3]})
+
+
+def _artist_data(ax):
+    return [c.get_offsets().tolist() for c in ax.collections] + [l.get_xydata().tolist() for l in ax.lines]
+
+
+def test_convert_many_matches_convert():
+    charts = [
+        alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')),
+        alt.Chart(df).mark_point().encode(alt.X('years'), alt.Y('c')),
+        alt.Chart(df_other).mark_line().encode(alt.X('a'), alt.Y('b')),
+    ]
+    for chart, (fig, ax) in zip(charts, convert_many(charts)):
+        _, expected = convert(chart)
+        assert fig is ax.figure
+        assert _artist_data(ax) == _artist_data(expected)
+        assert ax.get_xlim() == expected.get_xlim()
+        assert ax.get_ylim() == expected.get_ylim()
+
+
+def test_convert_many_is_lazy():
+    charts = [alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')),
+              alt.Chart(df).mark_bar().encode(alt.X('a'), alt.Y('b'))]
+    figures = convert_many(charts)
+    next(figures)
+    with pytest.raises(NotImplementedError):
+        next(figures)
+
+
+def test_convert_many_consumes_lazily():
+    def charts():
+        for i in itertools.count():
+            yield alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'))
+            reached.append(i)
+
+    reached = []
+    figures = convert_many(charts())
+    next(figures)
+    next(figures)
+    assert reached == [0]
+
+
+def test_convert_many_shares_data(monkeypatch):
+    normalized = []
+    _normalize_data = mplaltair.parse_chart._normalize_data
+
+    def counting_normalize_data(chart, spec=None, columns=None):
+        normalized.append(sorted(columns))
+        return _normalize_data(chart, spec, columns)
+
+    monkeypatch.setattr(mplaltair.parse_chart, '_normalize_data', counting_normalize_data)
+    charts = [
+        alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')),
+        alt.Chart(df).mark_point().encode(alt.X('years'), alt.Y('c')),
+        alt.Chart(df_other).mark_point().encode(alt.X('a'), alt.Y('b')),
+        alt.Chart(df).mark_point().encode(alt.X('years'), alt.Y('a')),
+    ]
+    xs = [ax.collections[0].get_offsets()[:, 0] for _, ax in convert_many(charts)]
+    # a source is loaded again, with all the columns so far, when a chart needs new columns
+    assert normalized == [['a', 'b'], ['a', 'b', 'c', 'years'], ['a', 'b']]
+    assert list(xs[1]) == list(xs[3])
+
+
+def test_convert_many_reuse_figure():
+    charts = [alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')),
+              alt.Chart(df_other).mark_line().encode(alt.X('a'), alt.Y('b'))]
+    (fig1, ax1), (fig2, ax2) = [(fig, ax) for fig, ax in convert_many(charts, reuse_figure=True)]
+    assert fig1 is fig2
+    assert fig2.axes == [ax2]
+    assert len(ax2.lines) == 1 and not ax2.collections
+
+
+def test_convert_many_bounds_sources():
+    frames = [pd.DataFrame({'a': [i, i + 1], 'b': [1, 2]}) for i in range(5)]
+    sources = mplaltair.parse_chart._BatchSources(max_sources=2)
+    for frame in frames:
+        sources.chart(alt.Chart(frame).mark_point().encode(alt.X('a'), alt.Y('b')))
+    assert [id(data) for data, _, _ in sources._sources.values()] == [id(frame) for frame in frames[-2:]]
@@ -0,0 +1,219 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.error import HTTPError
+
+import gc
+
+import altair as alt
+import pandas as pd
+import pytest
+
+from mplaltair import _cache, _utils, cache_info, clear_cache, convert, parse_chart
+
+
+class _DataHandler(BaseHTTPRequestHandler):
+    """Serves ``server.files`` with an ETag, honoring If-None-Match."""
+
+    def do_GET(self):
+        self.server.requests.append(self.headers.get('If-None-Match'))
+        if self.path not in self.server.files:
+            self.send_error(404)
+            return
+        body, etag = self.server.files[self.path]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(('127.0.0.1', 0), _DataHandler)
+    httpd.requests = []
+    httpd.files = {
+        '/data.csv': (b'a,b\n1,2\n3,4\n', '"v1"'),
+        '/data.json': (b'[{"a": 1, "b": 2}, {"a": 3, "b": 4}]', '"v1"'),
+    }
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    httpd.url = 'http://127.0.0.1:{}'.format(httpd.server_address[1])
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def cache(tmpdir, monkeypatch):
+    cache = _cache._URLDataCache(str(tmpdir))
+    monkeypatch.setattr(_utils, '_url_cache', cache)
+    monkeypatch.setattr(_cache, '_url_cache', cache)
+    return cache
+
+
+@pytest.mark.parametrize('path', ['/data.csv', '/data.json'])
+def test_fetch_cached(server, cache, path):
+    first = _utils._fetch(server.url + path)
+    second = _utils._fetch(server.url + path)
+    assert second is first
+    assert list(first['a']) == [1, 3]
+    assert len(server.requests) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_fetch_from_disk(server, cache, tmpdir):
+    df = _utils._fetch(server.url + '/data.csv')
+    restarted = _cache._URLDataCache(str(tmpdir))
+    assert restarted.fetch(server.url + '/data.csv', pd.read_csv).equals(df)
+    assert len(server.requests) == 1
+
+
+@pytest.mark.parametrize('content', [b'', b'not a pickle', b'cmplaltair._cache\nmissing\n.', b'N.'])
+def test_fetch_unreadable_entry(server, cache, content):
+    """An entry that can't be loaded, e.g. pickled by another version of pandas, is downloaded again"""
+    url = server.url + '/data.csv'
+    with open(cache._path(url), 'wb') as f:
+        f.write(content)
+    assert list(_utils._fetch(url)['a']) == [1, 3]
+    assert len(server.requests) == 1
+    restarted = _cache._URLDataCache(cache.cachedir)
+    assert list(restarted.fetch(url, pd.read_csv)['a']) == [1, 3]
+    assert len(server.requests) == 1
+
+
+def test_fetch_revalidates_after_ttl(server, cache):
+    cache.ttl = 0
+    first = _utils._fetch(server.url + '/data.csv')
+    assert _utils._fetch(server.url + '/data.csv') is first
+    assert server.requests == [None, '"v1"']
+
+    server.files['/data.csv'] = (b'a,b\n5,6\n', '"v2"')
+    assert list(_utils._fetch(server.url + '/data.csv')['a']) == [5]
+    assert server.requests[-1] == '"v1"'
+
+
+def test_fetch_not_found(server, cache):
+    with pytest.raises(HTTPError):
+        _utils._fetch(server.url + '/missing.csv')
+
+
+def test_memory_bound(server):
+    cache = _cache._URLDataCache(None, max_bytes=1)
+    cache.fetch(server.url + '/data.csv', pd.read_csv)
+    cache.fetch(server.url + '/data.json', pd.read_json)
+    assert list(cache._entries) == [server.url + '/data.json']
+
+
+def test_memory_bound_strings():
+    """Strings are counted by their size, not by the size of their pointers"""
+    df = pd.DataFrame({'s': ['x' * 1000] * 10})
+    cache = _cache._URLDataCache(None, max_bytes=15000)
+    cache._remember('first', {'df': df})
+    cache._remember('second', {'df': df.copy()})
+    assert list(cache._entries) == ['second']
+
+
+def test_clear_cache(server, cache, tmpdir):
+    _utils._fetch(server.url + '/data.csv')
+    clear_cache()
+    assert tmpdir.listdir() == []
+    _utils._fetch(server.url + '/data.csv')
+    assert len(server.requests) == 2
+
+
+def test_fetch_columns(server, cache):
+    projected = _utils._fetch(server.url + '/data.csv', {'b': 'quantitative'})
+    assert list(projected.columns) == ['b']
+    assert list(_utils._fetch(server.url + '/data.csv').columns) == ['a', 'b']
+    assert _utils._fetch(server.url + '/data.csv', {'b': 'quantitative'}) is projected
+    assert len(server.requests) == 2
+
+
+def test_fetch_row_filter(server, cache):
+    filtered = _utils._fetch(server.url + '/data.csv', {'a': None}, row_filter=_FirstRow())
+    assert list(filtered['a']) == [1]
+    assert list(_utils._fetch(server.url + '/data.csv', {'a': None})['a']) == [1, 3]
+    assert _utils._fetch(server.url + '/data.csv', {'a': None}, row_filter=_FirstRow()) is filtered
+
+
+class _FirstRow(object):
+    def __call__(self, df):
+        return df.index == 0
+
+    def __repr__(self):
+        return 'first row'
+
+
+@pytest.fixture
+def metadata_cache(monkeypatch):
+    cache = _cache._MetadataCache(max_entries=2)
+    monkeypatch.setattr(_cache, '_metadata_cache', cache)
+    monkeypatch.setattr(parse_chart, '_metadata_cache', cache)
+    return cache
+
+
+def test_metadata_cache(metadata_cache):
+    df = pd.DataFrame({'a': [1, 2], 'b': [3, 4]})
+    chart = alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'))
+    first = parse_chart._cached_metadata(chart)
+    # An identical chart drawn from the same DataFrame
+    assert parse_chart._cached_metadata(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'))) is first
+    assert parse_chart._cached_metadata(chart.encode(alt.X('b'))) is not first
+    assert (metadata_cache.hits, metadata_cache.misses) == (1, 2)
+
+    df['c'] = 0  # columns are part of the key
+    assert parse_chart._cached_metadata(chart) is not first
+    # The least recently used chart is evicted
+    assert len(metadata_cache) == 2
+    assert parse_chart._cached_metadata(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'))) is not first
+
+
+def test_metadata_cache_values(metadata_cache):
+    values = alt.Data(values=[{'a': 1, 'b': 2}])
+    chart = alt.Chart(values).mark_point().encode(alt.X('a:Q'), alt.Y('b:Q'))
+    first = parse_chart._cached_metadata(chart)
+    assert parse_chart._cached_metadata(alt.Chart(alt.Data(values=[{'a': 1, 'b': 2}])).mark_point().encode(
+        alt.X('a:Q'), alt.Y('b:Q'))) is first
+    assert parse_chart._cached_metadata(alt.Chart(alt.Data(values=[{'a': 1, 'b': 3}])).mark_point().encode(
+        alt.X('a:Q'), alt.Y('b:Q'))) is not first
+
+
+def test_metadata_cache_dataframe_collected(metadata_cache):
+    # The parsed chart of aggregated data only holds the aggregates, not the DataFrame
+    df = pd.DataFrame({'a': [1, 2], 'b': [3, 4], 'c': [5, 6]})
+    chart = alt.Chart(df).mark_bar().encode(alt.X('a:O'), alt.Y('sum(b)'))
+    parse_chart._cached_metadata(chart)
+    assert len(metadata_cache) == 1
+    del chart, df
+    gc.collect()
+    assert len(metadata_cache) == 0
+
+
+def test_metadata_cache_ttl(metadata_cache, monkeypatch):
+    clock = [0.]
+    monkeypatch.setattr(_cache.time, 'time', lambda: clock[0])
+    assert metadata_cache.get('key', lambda: 1, ttl=10) == 1
+    clock[0] = 5
+    assert metadata_cache.get('key', lambda: 2, ttl=10) == 1
+    clock[0] = 20
+    assert metadata_cache.get('key', lambda: 3, ttl=10) == 3
+
+
+def test_convert_cache(metadata_cache):
+    df = pd.DataFrame({'a': [1, 2], 'b': [3, 4]})
+    chart = alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'))
+    convert(chart, pyplot=False)
+    assert cache_info()['misses'] == 0
+    convert(chart, pyplot=False, cache=True)
+    convert(chart, pyplot=False, cache=True)
+    assert cache_info() == {'hits': 1, 'misses': 1, 'entries': 1, 'max_entries': 2}
+    clear_cache()
+    assert cache_info() == {'hits': 0, 'misses': 0, 'entries': 0, 'max_entries': 2}
@@ -1,9 +1,13 @@
 import pytest
 
 import altair as alt
+import numpy as np
 import pandas as pd
+import matplotlib.colors as mcolors
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
+import mplaltair._convert
+import mplaltair._marks
 from mplaltair import convert
 from mplaltair._convert import _convert
 from mplaltair.parse_chart import ChartMetadata
@@ -34,6 +38,18 @@ def test_invalid_encodings():
     with pytest.raises(ValueError):
         _convert(chart)
 
+def test_convert_channel_once(monkeypatch):
+    calls = []
+
+    def process_color(channel):
+        calls.append(channel.name)
+        return ('c', channel.data)
+
+    monkeypatch.setitem(mplaltair._convert._mappings, 'color', process_color)
+    mapping = _convert(ChartMetadata(alt.Chart(df).encode(x='quant', color='nom').mark_point()))
+    assert calls == ['color']
+    assert list(mapping['c']) == list(df['nom'])
+
 @pytest.mark.xfail(raises=TypeError)
 def test_invalid_temporal():  # TODO: move to parse_chart tests???
     chart = alt.Chart(df).mark_point().encode(alt.X('quant:T'))
@@ -92,8 +108,19 @@ def test_convert_color_success(channel, dtype):
 
 def test_convert_color_success_nominal():
     chart_spec = ChartMetadata(alt.Chart(df).encode(color='nom').mark_point())
-    with pytest.raises(NotImplementedError):
-        _convert(chart_spec)
+    mapping = _convert(chart_spec)
+    assert mapping['c'].tolist() == mcolors.to_rgba_array(['C0', 'C1', 'C2', 'C3', 'C4']).tolist()
+
+def test_convert_color_nominal_lookup():
+    """Each category has a color of the cycle, in sorted order, and missing values are transparent"""
+    df_nom = pd.DataFrame({'n': ['b', 'a', None, 'b']})
+    mapping = _convert(ChartMetadata(alt.Chart(df_nom).encode(color='n:N').mark_point()))
+    assert mapping['c'].tolist() == mcolors.to_rgba_array(['C1', 'C0', 'none', 'C1']).tolist()
+
+def test_convert_color_ordinal_strings():
+    df_ord = pd.DataFrame({'o': ['low', 'high', 'low', 'mid']})
+    mapping = _convert(ChartMetadata(alt.Chart(df_ord).encode(color='o:O').mark_point()))
+    assert list(mapping['c']) == [1, 0, 1, 2]
 
 @pytest.mark.parametrize("column", ["years", "months", "days", "hrs", "combination"])
 def test_convert_color_success_temporal(column):
@@ -113,8 +140,8 @@ def test_convert_fill(channel, type):
 
 def test_convert_fill_success_nominal():
     chart_spec = ChartMetadata(alt.Chart(df).encode(fill='nom').mark_point())
-    with pytest.raises(NotImplementedError):
-        _convert(chart_spec)
+    mapping = _convert(chart_spec)
+    assert mapping['c'].tolist() == mcolors.to_rgba_array(['C0', 'C1', 'C2', 'C3', 'C4']).tolist()
 
 @pytest.mark.parametrize("column", ["years", "months", "days", "hrs", "combination"])
 def test_convert_fill_success_temporal(column):
@@ -132,6 +159,23 @@ def test_quantitative_shape():
     chart = ChartMetadata(alt.Chart(df_quant).mark_point().encode(alt.Shape('shape')))
     mapping = _convert(chart)
 
+@pytest.mark.parametrize('column', ['nom:N', 'ord:O'])
+def test_convert_shape(column):
+    chart = ChartMetadata(alt.Chart(df).mark_point().encode(alt.Shape(column)))
+    codes, markers = _convert(chart)['marker']
+    assert list(codes) == [0, 1, 2, 3, 4]
+    assert markers == ['o', 's', 'P', 'D', '^']
+
+def test_scatter_shape():
+    """The points are drawn with one scatter per shape"""
+    df_shape = pd.DataFrame({'a': [1, 2, 3, 4], 'b': [5, 6, 7, 8], 'n': ['x', 'y', 'x', None], 'c': [1., 2, 3, 4]})
+    chart = alt.Chart(df_shape).mark_point().encode(alt.X('a'), alt.Y('b'), alt.Shape('n:N'), alt.Color('c'))
+    fig, ax = convert(chart)
+    assert [collection.get_offsets().tolist() for collection in ax.collections] == [[[4, 8]], [[1, 5], [3, 7]], [[2, 6]]]
+    assert [collection.get_array().tolist() for collection in ax.collections] == [[4], [1, 3], [2]]
+    assert {collection.norm.vmin for collection in ax.collections} == {1}
+    plt.close(fig)
+
 @pytest.mark.xfail(raises=NotImplementedError, reason="The marker argument in scatter() cannot take arrays")
 @pytest.mark.parametrize("column", ["years", "months", "days", "hrs", "combination"])
 def test_convert_shape_fail_temporal(column):
@@ -180,6 +224,15 @@ def test_quantitative_stroke():
     chart = ChartMetadata(alt.Chart(df_quant).mark_point().encode(alt.Stroke('fill')))
     _convert(chart)
 
+def test_convert_stroke_nominal():
+    chart = ChartMetadata(alt.Chart(df).mark_point().encode(alt.Stroke('nom:N')))
+    assert _convert(chart)['edgecolors'].tolist() == mcolors.to_rgba_array(['C0', 'C1', 'C2', 'C3', 'C4']).tolist()
+
+def test_convert_stroke_ordinal():
+    chart = ChartMetadata(alt.Chart(df).mark_point().encode(alt.Stroke('ord:O')))
+    colors = _convert(chart)['edgecolors']
+    assert colors.tolist() == plt.get_cmap()(np.linspace(0, 1, 5)).tolist()
+
 @pytest.mark.xfail(raises=NotImplementedError, reason="Stroke is not well defined in Altair")
 @pytest.mark.parametrize("column", ["years", "months", "days", "hrs", "combination"])
 def test_convert_stroke_fail_temporal(column):
@@ -189,15 +242,19 @@ def test_convert_stroke_fail_temporal(column):
 
 # Aggregations
 
-@pytest.mark.xfail(raises=NotImplementedError, reason="Aggregate functions are not supported yet")
 def test_quantitative_x_count_y():
     df_count = pd.DataFrame({"a": [1, 1, 2, 3, 5], "b": [1.4, 1.4, 2.9, 3.18, 5.3]})
     chart = ChartMetadata(alt.Chart(df_count).mark_point().encode(alt.X('a'), alt.Y('count()')))
+    mapping = _convert(chart)
+    assert list(mapping['x']) == [1, 2, 3, 5]
+    assert list(mapping['y']) == [2, 1, 1, 1]
 
 
-@pytest.mark.xfail(raises=NotImplementedError, reason="specifying timeUnit is not supported yet")
 def test_timeUnit():
     chart = ChartMetadata(alt.Chart(df).mark_point().encode(alt.X('date(combination)')))
+    mapping = _convert(chart)
+    expected = pd.to_datetime(['2012-01-01', '2012-01-01', '2012-01-02', '2012-01-04', '2012-01-01'])
+    assert list(mapping['x']) == list(mdates.date2num(expected.values))
 
 # Plots
 
@@ -294,6 +351,50 @@ class TestLines(object):
         fig, ax = convert(chart)
         return fig
 
+    @pytest.mark.parametrize('o,alphas', [('d:Q', [.15, .575, 1]), ('c:O', [.15, .575, 1]), ('dates:T', [.15, .575, 1])])
+    def test_line_opacity_lookup(self, o, alphas):
+        chart = alt.Chart(df_line).mark_line().encode(alt.X('a'), alt.Y('b'), alt.Opacity(o))
+        fig, ax = convert(chart)
+        assert [line.get_alpha() for line in ax.lines] == pytest.approx(alphas)
+        assert [line.get_ydata().tolist() for line in ax.lines] == [[3, 2, 1], [7, 8, 9], [4, 5, 6]]
+        plt.close(fig)
+
+    def test_line_color_lookup(self):
+        chart = alt.Chart(df_line).mark_line().encode(alt.X('a'), alt.Y('b'), alt.Color('c:N'), alt.Opacity('d:Q'))
+        fig, ax = convert(chart)
+        assert [line.get_color() for line in ax.lines] == ['#1f77b4', '#ff7f0e', '#2ca02c']  # C0, C1, C2
+        plt.close(fig)
+
+    def test_line_color_missing(self):
+        """Rows with a missing category are not drawn, as groupby drops them"""
+        df = pd.DataFrame({'x': range(6), 'y': range(6), 'g': ['a', 'a', None, None, 'b', 'b']})
+        chart = alt.Chart(df).mark_line().encode(alt.X('x'), alt.Y('y'), alt.Color('g:N'))
+        fig, ax = convert(chart)
+        assert [line.get_color() for line in ax.lines] == ['#1f77b4', '#ff7f0e']
+        assert [line.get_xdata().tolist() for line in ax.lines] == [[0, 1], [4, 5]]
+        plt.close(fig)
+
+    @pytest.mark.parametrize('channels', [
+        [alt.Color('c:N')], [alt.Opacity('d:Q')], [alt.Color('c:N'), alt.Opacity('d:Q')]
+    ])
+    def test_line_collection(self, monkeypatch, channels):
+        """Above the threshold, lines are drawn as one LineCollection that looks like the Line2Ds"""
+        chart = alt.Chart(df_line).mark_line().encode(alt.X('a'), alt.Y('b'), *channels)
+        fig, ax = convert(chart)
+        expected = [(line.get_xydata().tolist(), mcolors.to_rgba(line.get_color(), line.get_alpha()))
+                    for line in ax.lines]
+        limits = ax.get_xlim() + ax.get_ylim()
+        plt.close(fig)
+
+        monkeypatch.setattr(mplaltair._marks, '_LINE_COLLECTION_MIN_LINES', 2)
+        fig, ax = convert(chart)
+        assert not ax.lines and len(ax.collections) == 1
+        collection = ax.collections[0]
+        assert [segment.tolist() for segment in collection.get_segments()] == [xy for xy, _ in expected]
+        assert collection.get_colors() == pytest.approx(np.array([color for _, color in expected]))
+        assert ax.get_xlim() + ax.get_ylim() == pytest.approx(limits)
+        plt.close(fig)
+
 
 class TestBars(object):
     @pytest.mark.xfail(raises=NotImplementedError)
@@ -303,3 +404,71 @@ class TestBars(object):
             alt.Y('b'),
         )
         convert(chart)
+
+    @pytest.mark.parametrize('binned, other', [('x', 'y'), ('y', 'x')])
+    def test_histogram(self, binned, other):
+        df_hist = pd.DataFrame({'v': [0.5, 1.5, 1.7, 2.2, 2.9, 2.95, 4]})
+        chart = alt.Chart(df_hist).mark_bar().encode(**{binned: alt.X('v', bin=alt.Bin(step=1)), other: alt.Y('count()')})
+        fig, ax = convert(chart)
+        bars = [bar.get_bbox().bounds for bar in ax.patches]
+        if binned == 'y':
+            bars = [(y, x, height, width) for x, y, width, height in bars]
+        assert np.array(bars) == pytest.approx(np.array([(0, 0, 1, 1), (1, 0, 1, 2), (2, 0, 1, 3), (3, 0, 1, 1)]))
+        plt.close(fig)
+
+    def test_histogram_mean(self):
+        chart = alt.Chart(df_line).mark_bar().encode(alt.X('a', bin=alt.Bin(step=2)), alt.Y('mean(b)'))
+        fig, ax = convert(chart)
+        assert [bar.get_x() for bar in ax.patches] == [0, 2]
+        assert [bar.get_height() for bar in ax.patches] == pytest.approx([(3 + 7 + 4) / 3, (2 + 1 + 8 + 9 + 5 + 6) / 6])
+        plt.close(fig)
+
+    def test_rect(self):
+        df_rect = pd.DataFrame({'x': [0.5, 0.7, 1.5, 2.5], 'y': [0.5, 0.5, 2.5, 0.5]})
+        chart = alt.Chart(df_rect).mark_rect().encode(
+            alt.X('x', bin=alt.Bin(step=1)), alt.Y('y', bin=alt.Bin(step=1)), alt.Color('count()')
+        )
+        fig, ax = convert(chart)
+        mesh, = ax.collections
+        assert mesh.get_array().filled(0).tolist() == [2, 0, 1, 0, 0, 0, 0, 1, 0]
+        plt.close(fig)
+
+    @pytest.mark.xfail(raises=NotImplementedError)
+    def test_rect_fail(self):
+        convert(alt.Chart(df_line).mark_rect().encode(alt.X('a'), alt.Y('b'), alt.Color('c')))
+
+
+# Pyplot-free and concurrent conversion
+
+def test_convert_on_ax():
+    fig, ax = plt.subplots()
+    chart = alt.Chart(df_quant).mark_point().encode(alt.X('a'), alt.Y('b'))
+    assert convert(chart, ax=ax) == (fig, ax)
+    assert len(ax.collections) == 1
+    plt.close(fig)
+
+def test_convert_without_pyplot():
+    fignums = plt.get_fignums()
+    fig, ax = convert(alt.Chart(df_quant).mark_point().encode(alt.X('a'), alt.Y('b')), pyplot=False)
+    assert plt.get_fignums() == fignums
+    assert fig.canvas is not None and ax.figure is fig
+
+def test_convert_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    charts = [
+        alt.Chart(df_quant).mark_point().encode(alt.X('a'), alt.Y('b'), alt.Color('c:Q')),
+        alt.Chart(df).mark_point().encode(alt.X('combination'), alt.Y('quant'), alt.Color('years')),
+        alt.Chart(df_line).mark_line().encode(alt.X('a'), alt.Y('b'), alt.Color('d'), alt.Opacity('d:Q')),
+    ] * 20
+
+    def offsets(chart, **kwargs):
+        fig, ax = convert(chart, **kwargs)
+        fig.canvas.draw()
+        return [c.get_offsets().tolist() for c in ax.collections] + [l.get_xydata().tolist() for l in ax.lines]
+
+    expected = [offsets(chart, pyplot=False) for chart in charts[:3]] * 20
+    fignums = plt.get_fignums()
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda chart: offsets(chart, pyplot=False), charts))
+    assert results == expected
+    assert plt.get_fignums() == fignums
@@ -2,6 +2,7 @@ import altair as alt
 import pandas as pd
 import matplotlib.dates as mdates
 import mplaltair._data as _data
+import numpy as np
 import pytest
 from vega_datasets import data
 
@@ -17,14 +18,36 @@ df = pd.DataFrame({
 
 
 def test_data_list():
-    chart = alt.Chart(pd.DataFrame({'a': [1], 'b': [2], 'c': [3]})).mark_point()
-    _data._normalize_data(chart)
-    assert type(chart.data) == pd.DataFrame
+    source = pd.DataFrame({'a': [1], 'b': [2], 'c': [3]})
+    chart = alt.Chart(source).mark_point()
+    assert _data._normalize_data(chart) is source
+    assert chart.data is source
+
+def test_data_values():
+    chart = alt.Chart(alt.Data(values=[{'a': 1, 'b': 2}, {'a': 3, 'b': 4}])).mark_point()
+    result = _data._normalize_data(chart)
+    assert type(result) == pd.DataFrame
+    assert list(result['a']) == [1, 3]
+    assert isinstance(chart.data, alt.Data)
 
 def test_data_url():
     chart = alt.Chart(data.cars.url).mark_point()
-    _data._normalize_data(chart)
-    assert type(chart.data) == pd.DataFrame
+    assert type(_data._normalize_data(chart)) == pd.DataFrame
+    assert chart.data == data.cars.url
+
+def test_with_columns_leaves_data_untouched():
+    source = pd.DataFrame({'a': [1, 2], 'b': [3, 4]})
+    result = _data._with_columns(source, {'a': np.array([5, 6]), 'c': np.array([7, 8])})
+    assert list(result['a']) == [5, 6] and list(result['c']) == [7, 8]
+    assert list(source.columns) == ['a', 'b'] and list(source['a']) == [1, 2]
+
+def test_read_only():
+    values = np.arange(3)
+    view = _data._read_only(values)
+    assert np.shares_memory(view, values)
+    with pytest.raises(ValueError):
+        view[0] = 1
+    assert _data._read_only(view) is view
 
 # test date conversion:
 
@@ -68,3 +91,90 @@ def test_convert_to_mpl_single_vals(date, expected):
 ])
 def test_altair_datetime(date, expected):
     assert mdates.date2num(_data._altair_DateTime_to_datetime(date)) == mdates.datestr2num(expected)
+
+def test_convert_to_mpl_series():
+    assert list(_data._convert_to_mpl_date(df_nonstandard['e'])) == list(mdates.date2num(df_nonstandard['e']))
+
+def test_convert_to_mpl_str_object_array():
+    dates = df_nonstandard['d'].values.astype(object)
+    assert list(_data._convert_to_mpl_date(dates)) == [mdates.datestr2num(d) for d in dates]
+
+def test_convert_to_mpl_tz_aware():
+    dates = pd.Series(pd.date_range('2015-03-15 12:00', periods=3, freq='D', tz='US/Eastern'))
+    expected = mdates.date2num(pd.date_range('2015-03-15 16:00', periods=3, freq='D').values)
+    assert list(_data._convert_to_mpl_date(dates)) == list(expected)
+
+@pytest.mark.parametrize('data', [[1.5, 2.5], ['not a date', 'nor this']])
+def test_convert_to_mpl_invalid(data):
+    with pytest.raises((TypeError, ValueError)):
+        _data._convert_to_mpl_date(data)
+
+
+# Bins
+
+@pytest.mark.parametrize('extent, params, expected', [
+    ((0, 1), {}, [0, .1, .2, .3, .4, .5, .6, .7, .8, .9, 1]),
+    ((0.13, 97.2), {}, [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]),
+    ((3, 1234), {'maxbins': 5}, [0, 500, 1000, 1500]),
+    ((-5, 5), {'step': 3}, [-6, -3, 0, 3, 6]),
+    ((0.5, 2.5), {'nice': False, 'maxbins': 4}, [0.5, 1, 1.5, 2, 2.5]),
+    ((0, 100), {'extent': [0, 50]}, [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50]),
+    ((0, 100), {'steps': [3, 30]}, [0, 30, 60, 90, 120]),  # vega picks the first step from span / maxbins
+    ((0, 100), {'steps': [5, 10, 20]}, list(range(0, 110, 10))),
+    ((0, 100), {'steps': [2, 5]}, list(range(0, 105, 5))),  # or the largest one
+    ((1, 1), {}, [1, 1.1]),
+])
+def test_bin_edges(extent, params, expected):
+    edges = _data._bin_edges(np.array(extent, dtype=float), _data._bin_params(params))
+    assert list(edges) == pytest.approx(expected)
+
+
+def test_apply_bins():
+    encoding = {'x': {'field': 'v', 'type': 'quantitative', 'bin': {'extent': [0, 10], 'maxbins': 2}}}
+    data = _data._apply_bins(pd.DataFrame({'v': [0, 4.9, 5, 10, 11, np.nan]}), encoding)
+    name = 'bin_extent_0_10_maxbins_2_v'
+    assert list(data[name]) == pytest.approx([0, 0, 5, 5, np.nan, np.nan], nan_ok=True)
+    assert list(data[name + '_end']) == pytest.approx([5, 5, 10, 10, np.nan, np.nan], nan_ok=True)
+
+
+def test_apply_bins_cache():
+    source = pd.DataFrame({'v': np.arange(10.)})
+    encoding = {'x': {'field': 'v', 'type': 'quantitative', 'bin': True}}
+    _data._apply_bins(source, encoding, source)
+    source_id = id(source)
+    cached = _data._bin_edges_cache[source_id]
+    assert len(cached) == 1
+
+    # the edges of a DataFrame are reused, and forgotten once it is garbage collected
+    cached[next(iter(cached))] = np.array([0., 20.])
+    binned = _data._apply_bins(source, encoding, source)
+    assert set(binned['bin_maxbins_10_v']) == {0}
+    del source, binned
+    assert source_id not in _data._bin_edges_cache
+
+
+def test_count_bins():
+    """Histograms are counted directly, with the same result as grouping the binned rows"""
+    rng = np.random.RandomState(0)
+    data = pd.DataFrame({'u': rng.randn(1000), 'v': rng.rand(1000)})
+    data.loc[::7, 'u'] = np.nan
+    encoding = {
+        'x': {'field': 'u', 'type': 'quantitative', 'bin': {'maxbins': 20}},
+        'y': {'field': 'v', 'type': 'quantitative', 'bin': {'extent': [0.2, 0.8]}},
+        'color': {'aggregate': 'count', 'type': 'quantitative'},
+    }
+    assert _data._is_histogram(encoding)
+    counted = _data._count_bins(data, encoding)
+    grouped = _data._aggregate_data(_data._apply_bins(data, encoding), encoding)
+    columns = sorted(grouped.columns)
+    key = columns[1:]  # the bins
+    counted = counted[columns].sort_values(key).reset_index(drop=True)
+    grouped = grouped[columns].sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(counted, grouped, check_dtype=False)
+
+def test_column_store_encoded():
+    store = _data._ColumnStore(pd.DataFrame({'n': ['b', None, 'a', 'b']}))
+    codes, categories = store.encoded('n')
+    assert list(codes) == [1, -1, 0, 1] and list(categories) == ['a', 'b']
+    assert store.encoded('n')[0] is codes
+    assert not codes.flags.writeable
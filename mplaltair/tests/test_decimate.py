@@ -0,0 +1,91 @@
+import altair as alt
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from mplaltair import convert
+from mplaltair._decimate import _decimate_line, _decimate_scatter, _lttb, _minmax
+
+
+def test_lttb():
+    x = np.arange(10)
+    y = np.array([0, 0, 0, 9, 0, 0, 0, -9, 0, 0])
+    keep = _lttb(x, y, 4)
+    assert keep.tolist() == [0, 3, 7, 9]
+
+
+@pytest.mark.parametrize('n', [1, 2, 10, 11])
+def test_lttb_small(n):
+    assert _lttb(np.arange(10), np.arange(10), n).tolist() == list(range(10))
+
+
+def test_minmax():
+    x = np.arange(8)
+    y = np.array([5, 1, 9, 5, 5, 9, 1, 5])
+    # bucket 0: rows 0-3, bucket 1: rows 4-7
+    assert _minmax(x, y, 2).tolist() == [0, 1, 2, 3, 4, 5, 6, 7]
+    y = np.array([5, 1, 9, 2, 3, 5, 5, 5, 5, 5, 8, 4])
+    assert _minmax(np.arange(12), y, 2).tolist() == [0, 1, 2, 5, 6, 10, 11]
+    # unsorted x: the same points are kept
+    assert sorted(11 - _minmax(np.arange(12)[::-1], y[::-1], 2)) == [0, 1, 2, 5, 6, 10, 11]
+
+
+def test_decimate_line():
+    x = np.arange(100)
+    assert _decimate_line(x, x, 100, 'lttb', 10) is None
+    assert len(_decimate_line(x, x, 10, 'lttb', 10)) == 10
+    assert len(_decimate_line(x, x, 40, 'minmax', 5)) <= 20
+    assert _decimate_line(x, x.astype(float) * np.nan, 10, 'minmax', 5) is None
+    with pytest.raises(ValueError):
+        _decimate_line(x, x, 10, 'mean', 10)
+
+
+def test_decimate_scatter():
+    x = np.array([0, 0.1, 5, 10, 0.05])
+    y = np.array([0, 0.1, 5, 10, 0.02])
+    assert _decimate_scatter(x, y, 10, 10, 10) is None
+    # the first, second and last points share a pixel: the last one is drawn on top
+    assert _decimate_scatter(x, y, 2, 10, 10).tolist() == [2, 3, 4]
+
+
+def _render(fig):
+    fig.canvas.draw()
+    width, height = fig.canvas.get_width_height()
+    return np.frombuffer(fig.canvas.tostring_rgb(), dtype=np.uint8).reshape(height, width, 3)
+
+
+@pytest.mark.parametrize('groups', [False, True])
+def test_convert_line_minmax(groups):
+    """Min/max decimation at the figure resolution draws the same image"""
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'x': np.arange(20000), 'y': rng.randn(20000).cumsum(), 'g': np.arange(20000) % 2})
+    encoding = [alt.X('x'), alt.Y('y')] + ([alt.Color('g:N')] if groups else [])
+    chart = alt.Chart(df).mark_line().encode(*encoding)
+
+    fig, ax = convert(chart, pyplot=False)
+    expected = _render(fig)
+    fig, ax = convert(chart, pyplot=False, max_points=4000)
+    assert all(len(line.get_xdata()) <= 4000 for line in ax.lines)
+    changed = np.abs(_render(fig).astype(int) - expected).max(axis=-1) > 64
+    assert changed.mean() < 0.01
+
+
+def test_convert_line_lttb():
+    df = pd.DataFrame({'x': np.arange(1000), 'y': np.sin(np.arange(1000) / 50)})
+    chart = alt.Chart(df).mark_line().encode(alt.X('x'), alt.Y('y'))
+    fig, ax = convert(chart, max_points=100, decimation='lttb')
+    line, = ax.lines
+    assert len(line.get_xdata()) == 100
+    assert line.get_xdata()[0] == 0 and line.get_xdata()[-1] == 999
+    plt.close(fig)
+
+
+def test_convert_scatter():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'x': rng.rand(100000), 'y': rng.rand(100000), 'c': rng.rand(100000)})
+    chart = alt.Chart(df).mark_point().encode(alt.X('x'), alt.Y('y'), alt.Color('c'))
+    fig, ax = convert(chart, pyplot=False, max_points=1000)
+    collection, = ax.collections
+    assert len(collection.get_offsets()) < 100000
+    assert len(collection.get_array()) == len(collection.get_offsets())
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mplaltair import _expr
+
+columns = {
+    'a': np.array([1, 2, 3]), 'b': np.array([1., np.nan, 0.]), 's': np.array(['x', '', 'y'], dtype=object),
+    'd': pd.to_datetime(['2015-01-31', '2016-02-29 10:30', '2017-03-31']).values,
+}
+
+
+@pytest.mark.parametrize('expression,expected', [
+    ('datum.a * 2 + 1', [3, 5, 7]),
+    ('1 + 2 * 3 - 4 / 2', 5),
+    ('(1 + 2) * 3', 9),
+    ('datum.a % 2', [1, 0, 1]),
+    ('-datum.a - -1', [0, -1, -2]),
+    ('datum.a >= 2 && datum["b"] !== 1', [False, True, True]),
+    ('datum.a > 2 || datum.b == 1', [True, False, True]),
+    ('!(datum.a > 1)', [True, False, False]),
+    ('datum.b || 5', [1, 5, 5]),
+    ('datum.a > 1 && datum.b', [False, np.nan, 0]),
+    ('datum.a > 1 ? datum.a : -datum.a', [-1, 2, 3]),
+    ('datum.a > 2 ? 1 : datum.a > 1 ? 2 : 3', [3, 2, 1]),
+    ('if(datum.s, 1, 0)', [1, 0, 1]),
+    ('datum.s + "_" + datum.a', ['x_1', '_2', 'y_3']),
+    ('pow(datum.a, 2) + sqrt(4) + abs(-1)', [4, 7, 12]),
+    ('max(datum.a, 2, 0.5) + min(datum.a, 2)', [3, 4, 5]),
+    ('clamp(datum.a, 1.5, 2.5)', [1.5, 2, 2.5]),
+    ('round(datum.a / 2) + floor(0.5) + ceil(0.5)', [2, 2, 3]),
+    ('isNaN(datum.b) || !isValid(datum.b)', [False, True, False]),
+    ('upper(datum.s) + length(datum.s)', ['X1', '0', 'Y1']),
+    ('year(datum.d) * 100 + month(datum.d)', [201500, 201601, 201702]),
+    ('day(datum.d) + hours(datum.d) / 100', [6, 1.1, 5]),
+    ('datum.a == 1 ? PI : E', [np.pi, np.e, np.e]),
+    ('0x10 + 1e1 + .5', 26.5),
+    ("'it\\'s ' + true + null + 1.0 + 0.5 + NaN", ["it's truenull10.5NaN"]),
+])
+def test_evaluate(expression, expected):
+    result = np.atleast_1d(_expr._compile_expression(expression)(columns))
+    if isinstance(expected, list) and isinstance(expected[0], str):
+        assert list(result) == expected
+    else:
+        np.testing.assert_allclose(np.asarray(result, dtype=float), expected)
+
+
+def test_fields():
+    compiled = _expr._compile_expression('datum.x * datum["y z"] + datum.x')
+    assert compiled.fields == ['x', 'y z']
+    assert _expr._compile_expression('datum.x * datum["y z"] + datum.x') is compiled
+
+
+@pytest.mark.parametrize('expression', ['datum.a +', '(1', '1 2', 'datum.', '"a" "b"', 'datum.a # 1'])
+def test_invalid(expression):
+    with pytest.raises(ValueError):
+        _expr._compile_expression(expression)
+
+
+@pytest.mark.parametrize('expression', ['datum.a & 1', '~datum.a', 'foo(1)', 'width', 'datum', 'datum.a.length',
+                                        'datum[datum.a]'])
+def test_unsupported(expression):
+    with pytest.raises(NotImplementedError):
+        _expr._compile_expression(expression)
+
+
+@pytest.mark.parametrize('expression,source', [
+    ('datum.a * 2 > 3 && datum.b != 1', '(((_f0 * 2.0) > 3.0) & (_f1 != 1.0))'),
+    ('!(datum.a > 1) ? sqrt(datum.a) : pow(datum.a, 2)', 'where((~(_f0 > 1.0)), sqrt(_f0), (_f0 ** 2.0))'),
+    ('datum.a % 2', None),
+    ('datum.a || 1', None),
+    ('floor(datum.a)', None),
+])
+def test_numexpr_source(expression, source):
+    assert _expr._compile_expression(expression).numexpr_source == source
+
+
+def test_numexpr(monkeypatch):
+    pytest.importorskip('numexpr')
+    monkeypatch.setattr(_expr, '_NUMEXPR_MIN_ROWS', 1)
+    result = _expr._compile_expression('datum.a / 2 > 1 ? datum.b : -1')(columns)
+    np.testing.assert_array_equal(result, [-1, np.nan, 0])
@@ -0,0 +1,183 @@
+import altair as alt
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from mplaltair import _live, convert, convert_live, convert_stream
+
+
+df = pd.DataFrame({
+    'a': [1., 2, 3, 4, 5, 6], 'b': [2., 4, 3, 6, 5, 7], 'c': [1., 5, 2, 8, 3, 9],
+    'days': pd.date_range('2015-01-01', periods=6, freq='D'), 'nom': list('xyxyxy'),
+})
+
+
+def _artist_data(ax):
+    return [c.get_offsets().tolist() for c in ax.collections] + [l.get_xydata().tolist() for l in ax.lines]
+
+
+@pytest.mark.parametrize('mark, channels', [
+    ('point', [alt.X('a'), alt.Y('b')]),
+    ('point', [alt.X('days'), alt.Y('b'), alt.Color('c'), alt.Size('a')]),
+    ('line', [alt.X('a'), alt.Y('b')]),
+    ('line', [alt.X('days'), alt.Y('c')]),
+])
+@pytest.mark.parametrize('rows', [
+    lambda rows: rows, lambda rows: rows.to_dict(orient='records'), lambda rows: rows.to_dict(orient='list')
+])
+def test_append_matches_convert(mark, channels, rows):
+    live = convert_live(getattr(alt.Chart(df.head(2)), 'mark_' + mark)().encode(*channels), pyplot=False)
+    artist = live.artist
+    live.append(rows(df.iloc[2:3]))
+    live.append(rows(df.iloc[3:]))
+    _, expected = convert(getattr(alt.Chart(df), 'mark_' + mark)().encode(*channels), pyplot=False)
+    assert live.artist is artist and len(live) == 6
+    assert _artist_data(live.ax) == _artist_data(expected)
+    # The limits of scatter plots are those of the points, not of their markers
+    assert live.ax.get_xlim() == pytest.approx(expected.get_xlim(), rel=1e-2)
+    assert live.ax.get_ylim() == pytest.approx(expected.get_ylim(), rel=1e-2)
+    if mark == 'point' and len(channels) == 4:
+        assert live.artist.get_array().tolist() == df['c'].tolist()
+        assert (live.artist.norm.vmin, live.artist.norm.vmax) == (1, 9)
+        assert live.artist.get_sizes().tolist() == df['a'].tolist()
+
+
+@pytest.mark.parametrize('mark, channels', [
+    ('point', [alt.X('days'), alt.Y('b'), alt.Color('c'), alt.Size('a')]),
+    ('line', [alt.X('a'), alt.Y('b')]),
+])
+def test_append_to_empty(mark, channels):
+    """A chart can start without rows: its limits and color scale are set by the first append"""
+    live = convert_live(getattr(alt.Chart(df.head(0)), 'mark_' + mark)().encode(*channels), pyplot=False)
+    assert len(live) == 0
+    live.append(df)
+    _, expected = convert(getattr(alt.Chart(df), 'mark_' + mark)().encode(*channels), pyplot=False)
+    assert _artist_data(live.ax) == _artist_data(expected)
+    assert live.ax.get_xlim() == pytest.approx(expected.get_xlim(), rel=1e-2)
+    assert live.ax.get_ylim() == pytest.approx(expected.get_ylim(), rel=1e-2)
+    if mark == 'point':
+        assert (live.artist.norm.vmin, live.artist.norm.vmax) == (1, 9)
+    live.fig.canvas.draw()
+
+
+def test_append_many():
+    live = convert_live(alt.Chart(df.head(1)).mark_line().encode(alt.X('a'), alt.Y('b')), pyplot=False)
+    for i in range(100):
+        live.append({'a': [i + 10.], 'b': [-i]})
+    assert len(live) == 101
+    assert live.artist.get_ydata()[-1] == -99
+    assert live.ax.get_ylim()[0] < -99 and live.ax.get_ylim()[1] > 2
+    live.fig.canvas.draw()
+
+
+def test_append_nothing():
+    live = convert_live(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')), pyplot=False)
+    live.append(df.head(0))
+    assert len(live) == 6
+
+
+def test_convert_live_on_ax():
+    fig, ax = plt.subplots()
+    live = convert_live(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')), ax=ax)
+    assert (live.fig, live.ax) == (fig, ax)
+    plt.close(fig)
+
+
+@pytest.mark.parametrize('chart', [
+    alt.Chart(df).mark_bar().encode(alt.X('a'), alt.Y('b')),
+    alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'), alt.Color('nom:N')),
+    alt.Chart(df).mark_line().encode(alt.X('a'), alt.Y('b'), alt.Color('nom:N')),
+    alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('mean(b)')),
+    alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')).transform_filter('datum.a > 1'),
+    alt.Chart(df).mark_point().encode(alt.X('a', scale=alt.Scale(type='log')), alt.Y('b')),
+])
+def test_convert_live_unsupported(chart):
+    with pytest.raises(NotImplementedError):
+        convert_live(chart, pyplot=False)
+
+
+# Streaming
+
+def test_ring_buffer():
+    ring = _live._RingBuffer(4, 1)
+    assert ring.view().tolist() == []
+    ring.extend(np.array([[1.], [2], [3]]))
+    assert ring.view().ravel().tolist() == [1, 2, 3]
+    ring.extend(np.array([[4.], [5]]))
+    assert ring.view().ravel().tolist() == [2, 3, 4, 5]
+    ring.extend(np.arange(10.)[:, None])
+    assert ring.view().ravel().tolist() == [6, 7, 8, 9]
+    assert ring.view().base is not None and ring.nbytes == 64
+
+
+@pytest.mark.parametrize('mark, channels', [
+    ('point', [alt.X('a'), alt.Y('b'), alt.Color('c')]),
+    ('line', [alt.X('days'), alt.Y('b')]),
+])
+def test_stream_window(mark, channels):
+    stream = convert_stream(getattr(alt.Chart(df), 'mark_' + mark)().encode(*channels), window=4, pyplot=False)
+    assert len(stream) == 4
+    nbytes = stream._ring.nbytes
+    for i in range(20):
+        stream.append({'a': [10. + i], 'b': [i], 'c': [i], 'days': [pd.Timestamp('2015-02-01') + pd.Timedelta(days=i)]})
+        stream.blit()
+    assert len(stream) == 4 and stream._ring.nbytes == nbytes
+    x, y = _artist_data(stream.ax)[0][-1]
+    assert y == 19
+    assert stream.ax.get_xlim()[1] >= x and stream.ax.get_ylim()[1] >= 19
+
+
+def test_stream_empty():
+    stream = convert_stream(alt.Chart(df.head(0)).mark_point().encode(alt.X('a'), alt.Y('b')), 4, pyplot=False)
+    stream.append({'a': [0.2, 0.3], 'b': [0.5, 0.6]})
+    stream.blit()
+    assert stream.artist.get_offsets().tolist() == [[0.2, 0.5], [0.3, 0.6]]
+    (x0, x1), (y0, y1) = stream.ax.get_xlim(), stream.ax.get_ylim()
+    assert x0 <= 0.2 and 0.3 <= x1 < 1 and y0 <= 0.5 and 0.6 <= y1 < 1
+
+
+def test_stream_blit(monkeypatch):
+    stream = convert_stream(alt.Chart(df).mark_line().encode(alt.X('a'), alt.Y('b')), window=100, pyplot=False)
+    draws = []
+    stream.fig.canvas.mpl_connect('draw_event', lambda event: draws.append(event))
+    stream.blit()
+    assert len(draws) == 1 and stream.artist.get_animated()
+    limits = stream.ax.get_xlim() + stream.ax.get_ylim()
+    stream.append({'a': [5.5], 'b': [6.5]})  # within the limits
+    stream.blit()
+    assert len(draws) == 1 and stream.ax.get_xlim() + stream.ax.get_ylim() == limits
+    stream.append({'a': [20.], 'b': [7.]})  # past the right of the limits: redrawn, with room on the right
+    stream.blit()
+    assert len(draws) == 2
+    assert 0 < stream.ax.get_xlim()[0] < 1 and stream.ax.get_xlim()[1] > 25
+    assert stream.ax.get_ylim() == limits[2:]
+
+
+def test_stream_func_animation(tmpdir):
+    from matplotlib.animation import AbstractMovieWriter, FuncAnimation
+
+    class Writer(AbstractMovieWriter):
+        frames = 0
+
+        def setup(self, fig, outfile, dpi=None):
+            self.fig = fig
+
+        def grab_frame(self, **savefig_kwargs):
+            Writer.frames += 1
+
+        def finish(self):
+            pass
+
+    stream = convert_stream(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')), window=8, pyplot=False)
+    frames = [{'a': [7. + i], 'b': [i]} for i in range(5)]
+    anim = FuncAnimation(stream.fig, stream.update, frames=frames, init_func=stream.init, blit=True)
+    anim.save(str(tmpdir.join('stream.out')), writer=Writer())
+    assert Writer.frames == 5
+    assert len(stream) == 8
+    assert _artist_data(stream.ax)[0][-1] == [11, 4]
+
+
+def test_stream_window_fail():
+    with pytest.raises(ValueError):
+        convert_stream(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')), window=0, pyplot=False)
@@ -2,6 +2,7 @@ import pytest
 import altair as alt
 import pandas as pd
 import mplaltair.parse_chart as parse_chart
+from .. import _data
 from .._data import _convert_to_mpl_date
 
 df = pd.DataFrame({
@@ -43,24 +44,160 @@ def test_data_shorthand_quantitative(column):
 
 
 @pytest.mark.parametrize("column", ['a', 'b', 'c'])
-def test_data_aggregate_quantitative_fail(column):
-    """"'Passes' if it raises a NotImplementedError"""
+def test_data_aggregate_quantitative(column):
     chart = alt.Chart(df).mark_point().encode(alt.X(field=column, type='quantitative', aggregate='average'))
+    chart = parse_chart.ChartMetadata(chart)
+    assert list(chart.encoding['x'].data) == pytest.approx([df[column].mean()])
+
+
+df_agg = pd.DataFrame({
+    "key": ['a', 'b', 'a', 'b', 'a', 'c'], "key2": [1, 1, 1, 2, 2, 2],
+    "value": [1, 5, 3, None, 2, 7], "nom": ['x', 'x', 'y', None, 'y', 'x']
+})
+
+
+@pytest.mark.parametrize("op, expected", [
+    ('count', lambda grouped: grouped.size()),
+    ('valid', lambda grouped: grouped['value'].count()),
+    ('sum', lambda grouped: grouped['value'].sum()),
+    ('mean', lambda grouped: grouped['value'].mean()),
+    ('average', lambda grouped: grouped['value'].mean()),
+    ('median', lambda grouped: grouped['value'].median()),
+    ('min', lambda grouped: grouped['value'].min()),
+    ('max', lambda grouped: grouped['value'].max()),
+    ('q1', lambda grouped: grouped['value'].quantile(0.25)),
+    ('q3', lambda grouped: grouped['value'].quantile(0.75)),
+    ('stdev', lambda grouped: grouped['value'].std()),
+    ('variance', lambda grouped: grouped['value'].var()),
+])
+@pytest.mark.parametrize("keys", [['key'], ['key', 'key2']])
+def test_data_aggregate(op, expected, keys):
+    encoding = [alt.Y(field='value', type='quantitative', aggregate=op), alt.X(keys[0])]
+    if len(keys) > 1:
+        encoding.append(alt.Color(keys[1] + ':N'))
+    chart = parse_chart.ChartMetadata(alt.Chart(df_agg).mark_point().encode(*encoding))
+    channels = dict(zip(keys, ['x', 'color']))
+    actual = pd.DataFrame({key: chart.encoding[channel].data for key, channel in channels.items()})
+    actual['y'] = chart.encoding['y'].data
+    actual = actual.sort_values(keys)
+    expected = expected(df_agg.groupby(keys)).reset_index()
+    for key in keys:
+        assert list(actual[key]) == list(expected[key])
+    assert list(actual['y']) == pytest.approx(list(expected[0 if op == 'count' else 'value']), nan_ok=True)
+
+
+def test_data_aggregate_distinct():
+    chart = alt.Chart(df_agg).mark_point().encode(alt.X('key'), alt.Y('distinct(nom)'))
+    chart = parse_chart.ChartMetadata(chart)
+    assert list(chart.encoding['x'].data) == ['a', 'b', 'c']
+    assert list(chart.encoding['y'].data) == [2, 2, 1]  # a missing value is a distinct value
+
+
+@pytest.mark.parametrize("op, expected", [('distinct', [2, 1]), ('q1', [1.75, 3]), ('q3', [3.25, 3])])
+def test_data_aggregate_missing_key(op, expected):
+    """The rows with a missing grouping field are left out, as the pandas operations do"""
+    df = pd.DataFrame({'g': ['a', None, 'b', 'a', None], 'v': [1, 2, 3, 4, 5]})
+    chart = alt.Chart(df).mark_point().encode(alt.X('g:N'), alt.Y(field='v', type='quantitative', aggregate=op))
+    chart = parse_chart.ChartMetadata(chart)
+    assert list(chart.encoding['x'].data) == ['a', 'b']
+    assert list(chart.encoding['y'].data) == pytest.approx(expected)
+
+
+def test_data_aggregate_missing_numeric_key():
+    df = pd.DataFrame({'k': [1, None, 2, 1, None], 'v': [1, 2, 3, 4, 5]})
+    chart = parse_chart.ChartMetadata(alt.Chart(df).mark_bar().encode(alt.X('k:O'), alt.Y('q1(v)')))
+    assert list(chart.encoding['x'].data) == [1, 2]
+    assert list(chart.encoding['y'].data) == pytest.approx([1.75, 3])
+
+
+def test_data_aggregate_shared():
+    """All the aggregated channels share the grouping of the other channels"""
+    chart = alt.Chart(df_agg).mark_point().encode(alt.X('key'), alt.Y('sum(value)'), alt.Size('count()'))
+    chart = parse_chart.ChartMetadata(chart)
+    assert sorted(chart.data.columns) == ['__count', 'key', 'sum_value']
+    assert list(chart.encoding['y'].data) == [6, 5, 7]
+    assert list(chart.encoding['size'].data) == [3, 2, 1]
+
+
+def test_data_aggregate_temporal():
+    chart = alt.Chart(df).mark_point().encode(alt.X('max(combination):T'))
+    chart = parse_chart.ChartMetadata(chart)
+    assert list(chart.encoding['x'].data) == list(_convert_to_mpl_date(df['combination'].values[-1:]))
+
+
+def test_data_aggregate_fail():
+    chart = alt.Chart(df).mark_point().encode(alt.X(field='a', type='quantitative', aggregate='argmax'))
     with pytest.raises(NotImplementedError):
-        chart = parse_chart.ChartMetadata(chart)
+        parse_chart.ChartMetadata(chart)
 
 
-def test_data_timeUnit_shorthand_temporal_fail():
+def test_data_timeUnit_shorthand_temporal():
     chart = alt.Chart(df).mark_point().encode(alt.X('month(combination):T'))
-    with pytest.raises(NotImplementedError):
-        chart = parse_chart.ChartMetadata(chart)
+    chart = parse_chart.ChartMetadata(chart)
+    expected = pd.to_datetime(['2012-01-01', '2012-01-01', '2012-01-01', '2012-01-01', '2012-05-01'])
+    assert list(chart.encoding['x'].data) == list(_convert_to_mpl_date(expected.values))
+    assert chart.encoding['x'].timeUnit == 'month'
 
 
-def test_data_timeUnit_field_temporal_fail():
-    """"'Passes' if it raises a NotImplementedError"""
-    chart = alt.Chart(df).mark_point().encode(alt.X(field='combination', type='temporal', timeUnit='month'))
-    with pytest.raises(NotImplementedError):
-        chart = parse_chart.ChartMetadata(chart)
+def test_data_timeUnit_field_temporal():
+    chart = alt.Chart(df).mark_point().encode(alt.X(field='combination', type='temporal', timeUnit='yearmonthdate'))
+    chart = parse_chart.ChartMetadata(chart)
+    expected = pd.to_datetime(['2015-01-01', '2015-01-01', '2015-01-02', '2016-01-04', '2016-05-01'])
+    assert list(chart.encoding['x'].data) == list(_convert_to_mpl_date(expected.values))
+
+
+@pytest.mark.parametrize("time_unit, expected", [
+    ('year', ['2015-01-01', '2016-01-01', None]),
+    ('yearquarter', ['2015-04-01', '2016-10-01', None]),
+    ('yearmonth', ['2015-05-01', '2016-11-01', None]),
+    ('yearmonthdatehours', ['2015-05-17 13:00', '2016-11-03 02:00', None]),
+    ('yearmonthdatehoursminutesseconds', ['2015-05-17 13:45:12', '2016-11-03 02:05:59', None]),
+    ('quarter', ['2012-04-01', '2012-10-01', None]),
+    ('month', ['2012-05-01', '2012-11-01', None]),
+    ('date', ['2012-01-17', '2012-01-03', None]),
+    ('monthdate', ['2012-05-17', '2012-11-03', None]),
+    ('day', ['2012-01-01', '2012-01-05', None]),  # Sunday, Thursday
+    ('hours', ['2012-01-01 13:00', '2012-01-01 02:00', None]),
+    ('hoursminutes', ['2012-01-01 13:45', '2012-01-01 02:05', None]),
+    ('secondsmilliseconds', ['2012-01-01 00:00:12.345', '2012-01-01 00:00:59.999', None]),
+])
+def test_truncate_dates(time_unit, expected):
+    dates = pd.to_datetime(['2015-05-17 13:45:12.345', '2016-11-03 02:05:59.999', None]).values
+    result = _data._truncate_dates(dates, time_unit)
+    assert list(pd.DatetimeIndex(result)) == list(pd.to_datetime(expected))
+
+
+@pytest.mark.parametrize("time_unit, exception", [
+    ('utcyearmonth', NotImplementedError), ('dayhours', NotImplementedError), ('fortnight', ValueError)
+])
+def test_truncate_dates_fail(time_unit, exception):
+    with pytest.raises(exception):
+        _data._truncate_dates(df['combination'].values, time_unit)
+
+
+def test_data_timeUnit_strings():
+    chart = alt.Chart(pd.DataFrame({'d': ['2015-05-17', '2016-11-03']})).mark_point().encode(alt.X('year(d):T'))
+    chart = parse_chart.ChartMetadata(chart)
+    assert list(chart.encoding['x'].data) == list(_convert_to_mpl_date(['2015-01-01', '2016-01-01']))
+
+
+def test_data_timeUnit_aggregate():
+    """Time-bucketed aggregates group the rows by the truncated dates"""
+    chart = alt.Chart(df).mark_line().encode(alt.X('year(combination):T'), alt.Y('sum(a)'))
+    chart = parse_chart.ChartMetadata(chart)
+    assert list(chart.encoding['x'].data) == list(_convert_to_mpl_date(['2015-01-01', '2016-01-01']))
+    assert list(chart.encoding['y'].data) == [6, 9]
+
+
+def test_data_timeUnit_cache():
+    cache = {}
+    spec = alt.Chart(df).mark_point().encode(alt.X('month(combination):T'), alt.Y('combination:T')).to_dict()
+    chart = parse_chart.ChartMetadata(None, spec, df, cache)
+    assert list(chart.encoding['y'].data) == list(_convert_to_mpl_date(df['combination'].values))
+    assert set(cache) == {('month_combination', 'timeUnit'), ('month_combination', 'temporal'),
+                          ('combination', 'temporal')}
+    again = parse_chart.ChartMetadata(None, spec, df, cache)
+    assert again.encoding['x'].data is chart.encoding['x'].data
 
 
 # _locate_channel_dtype() tests
@@ -79,4 +216,72 @@ def test_data_dtype_fail():
     """"'Passes' if it raises a NotImplementedError"""
     chart = alt.Chart(df).mark_point().encode(opacity=alt.value(.5))
     with pytest.raises(NotImplementedError):
-        chart = parse_chart.ChartMetadata(chart)
\ No newline at end of file
+        chart = parse_chart.ChartMetadata(chart)
+
+# Spec compilation
+
+def test_to_dict_called_once(monkeypatch):
+    calls = []
+    to_dict = alt.Chart.to_dict
+
+    def counting_to_dict(self, *args, **kwargs):
+        calls.append(self)
+        return to_dict(self, *args, **kwargs)
+
+    monkeypatch.setattr(alt.Chart, 'to_dict', counting_to_dict)
+    chart = alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'), alt.Color('c'), alt.Size('quantitative'))
+    parse_chart.ChartMetadata(chart)
+    assert len(calls) == 1
+
+
+def test_spec_excludes_dataframe_values():
+    chart = parse_chart.ChartMetadata(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('combination')))
+    assert 'data' not in chart.spec
+    assert chart.spec['encoding']['y']['type'] == 'temporal'
+
+
+# Column projection
+
+def test_project_dataframe():
+    """The DataFrame is used as it is: the columns the encoding doesn't use are never read, so they aren't copied"""
+    chart = parse_chart.ChartMetadata(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b'), alt.Color('nom')))
+    assert chart.data is df
+    assert sorted(chart.columns.items()) == [('a', 'quantitative'), ('b', 'quantitative'), ('nom', 'nominal')]
+
+
+def test_project_dataframe_all_columns():
+    df_small = df[['a', 'b']]
+    chart = parse_chart.ChartMetadata(alt.Chart(df_small).mark_point().encode(alt.X('a'), alt.Y('b')))
+    assert chart.data is df_small
+
+
+def test_project_values():
+    values = [{'a': 1, 'b': 2, 'unused': 3}, {'a': 4, 'b': 5, 'unused': 6}]
+    chart = parse_chart.ChartMetadata(alt.Chart(alt.Data(values=values)).mark_point().encode(alt.X('a:Q'), alt.Y('b:Q')))
+    assert list(chart.data.columns) == ['a', 'b']
+    assert list(chart.encoding['x'].data) == [1, 4]
+
+
+# Column store
+
+def test_store_shared_columns():
+    chart = parse_chart.ChartMetadata(alt.Chart(df).mark_point().encode(
+        alt.X('combination:T'), alt.Y('a'), alt.Color('combination:T'), alt.Size('a')))
+    assert chart.encoding['x'].data is chart.encoding['color'].data
+    assert chart.encoding['y'].data is chart.encoding['size'].data
+    assert chart.encoding['y'].data.base is not None  # a view of the DataFrame's values
+
+
+def test_store_codes():
+    chart = parse_chart.ChartMetadata(alt.Chart(df).mark_point().encode(alt.X('a'), alt.Color('ord:O')))
+    assert list(chart.encoding['color'].codes) == [0, 1, 2, 3, 4]
+    assert list(chart.encoding['color'].categories) == [1, 2, 3, 4, 5]
+    assert chart.encoding['color'].codes.dtype == 'int8'
+
+
+def test_store_codes_categorical():
+    categorical = pd.DataFrame({'a': [1, 2, 3], 'n': pd.Categorical(['y', None, 'x'], categories=['y', 'x'])})
+    chart = parse_chart.ChartMetadata(alt.Chart(categorical).mark_point().encode(alt.X('a'), alt.Color('n:N')))
+    assert list(chart.encoding['color'].codes) == [0, -1, 1]
+    assert list(chart.encoding['color'].categories) == ['y', 'x']
+    assert list(chart.encoding['color'].data[[0, 2]]) == ['y', 'x']
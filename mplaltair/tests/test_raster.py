@@ -0,0 +1,96 @@
+import altair as alt
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+import mplaltair._marks
+import mplaltair._raster
+from mplaltair import convert
+from mplaltair._raster import _aggregate
+
+df = pd.DataFrame({'x': [0, 0.1, 1, 2, 2], 'y': [0, 0.2, 1, 0, 2], 'c': [1., 3, 5, 7, 9], 's': [10, 20, 30, 40, 50]})
+
+
+def test_aggregate_counts():
+    image, extent = _aggregate(df['x'].values, df['y'].values, 2, 2)
+    assert extent == (0, 2, 0, 2)
+    # rows go from the lowest y to the highest
+    assert image.filled(0).tolist() == [[2, 1], [0, 2]]
+    assert image.mask.tolist() == [[False, False], [True, False]]
+
+
+def test_aggregate_color():
+    image, _ = _aggregate(df['x'].values, df['y'].values, 2, 2, color=df['c'].values)
+    assert image.filled(0).tolist() == [[2, 7], [0, 7]]
+
+
+def test_aggregate_size():
+    image, _ = _aggregate(df['x'].values, df['y'].values, 2, 2, size=df['s'].values)
+    assert image.filled(0).tolist() == [[30, 40], [0, 80]]
+
+
+def test_aggregate_chunks(monkeypatch):
+    rng = np.random.RandomState(0)
+    x, y, c = rng.rand(3, 1000)
+    expected, _ = _aggregate(x, y, 7, 5, color=c)
+    monkeypatch.setattr(mplaltair._raster, '_CHUNK_SIZE', 64)
+    image, _ = _aggregate(x, y, 7, 5, color=c)
+    assert image.filled(0) == pytest.approx(expected.filled(0))
+    assert (image.mask == expected.mask).all()
+
+
+def test_aggregate_single_value():
+    image, extent = _aggregate(np.ones(3), np.ones(3), 4, 4)
+    assert extent == (0.5, 1.5, 0.5, 1.5)
+    assert image.sum() == 3
+
+
+@pytest.mark.parametrize('channels', [[], [alt.Color('c')], [alt.Size('s')]])
+def test_convert_rasterize(channels):
+    chart = alt.Chart(df).mark_point().encode(alt.X('x'), alt.Y('y'), *channels)
+    fig, ax = convert(chart, rasterize=True)
+    assert not ax.collections
+    image, = ax.images
+    assert tuple(image.get_extent()) == (0, 2, 0, 2)
+    assert image.get_array().count() == 5  # each point has its own bin at the figure resolution
+    plt.close(fig)
+
+
+def test_convert_rasterize_threshold(monkeypatch):
+    chart = alt.Chart(df).mark_point().encode(alt.X('x'), alt.Y('y'))
+    fig, ax = convert(chart)
+    assert len(ax.collections) == 1 and not ax.images
+    plt.close(fig)
+
+    monkeypatch.setattr(mplaltair._marks, '_RASTERIZE_MIN_POINTS', 5)
+    fig, ax = convert(chart)
+    assert not ax.collections and len(ax.images) == 1
+    plt.close(fig)
+
+    fig, ax = convert(chart, rasterize=False)
+    assert len(ax.collections) == 1 and not ax.images
+    plt.close(fig)
+
+
+def test_convert_rasterize_unsupported(monkeypatch):
+    chart = alt.Chart(df).mark_point().encode(alt.X('x', scale=alt.Scale(type='log')), alt.Y('y'))
+    monkeypatch.setattr(mplaltair._marks, '_RASTERIZE_MIN_POINTS', 5)
+    fig, ax = convert(chart)  # falls back to a scatter plot
+    assert len(ax.collections) == 1
+    plt.close(fig)
+    with pytest.raises(NotImplementedError):
+        convert(chart, rasterize=True)
+
+
+@pytest.mark.parametrize('channels', [[alt.Color('g:N')], [alt.Shape('g:N')], [alt.Stroke('g:N')],
+                                      [alt.Color('g:N'), alt.Shape('g:N')]])
+def test_convert_rasterize_categories(monkeypatch, channels):
+    """Categorical colors, shapes and strokes can't be shown by an image"""
+    chart = alt.Chart(df.assign(g=list('abcab'))).mark_point().encode(alt.X('x'), alt.Y('y'), *channels)
+    monkeypatch.setattr(mplaltair._marks, '_RASTERIZE_MIN_POINTS', 5)
+    fig, ax = convert(chart)  # falls back to a scatter plot
+    assert ax.collections and not ax.images
+    plt.close(fig)
+    with pytest.raises(NotImplementedError):
+        convert(chart, rasterize=True)
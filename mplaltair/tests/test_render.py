@@ -0,0 +1,49 @@
+import os
+
+import altair as alt
+import pandas as pd
+import pytest
+
+from mplaltair import render_batch
+
+
+df = pd.DataFrame({
+    'a': [1, 2, 3], 'b': [1.2, 2.4, 3.8], 'nom': ['x', 'y', 'z'],
+    'years': pd.to_datetime(['1/1/2015', '1/1/2016', '1/1/2017'])
+})
+
+charts = [
+    alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('b')),
+    alt.Chart(df).mark_bar().encode(alt.X('a'), alt.Y('b')),
+    alt.Chart(df).mark_line().encode(alt.X('years'), alt.Y('b')),
+    alt.Chart(alt.Data(values=[{'a': 1, 'b': 2}, {'a': 2, 'b': 1}])).mark_point().encode(alt.X('a:Q'), alt.Y('b:Q')),
+]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_render_batch(tmpdir, workers):
+    results = render_batch(charts, str(tmpdir), workers=workers)
+    assert [os.path.basename(path) for path, _ in results] == ['chart-{}.png'.format(i) for i in range(4)]
+    assert [type(error) for _, error in results] == [type(None), NotImplementedError, type(None), type(None)]
+    assert sorted(tmpdir.listdir()) == sorted(tmpdir.join('chart-{}.png'.format(i)) for i in [0, 2, 3])
+
+
+def test_render_batch_format(tmpdir):
+    [(path, error)] = render_batch(charts[:1], str(tmpdir.join('out')), fmt='svg', workers=1)
+    assert error is None
+    assert open(path).read().startswith('<?xml')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_render_batch_bad_data(tmpdir, workers):
+    """A chart whose data can't be compiled or loaded only fails on its own"""
+    bad = [
+        alt.Chart(alt.Data(values=[])).mark_point().encode(alt.X('a:Q'), alt.Y('b:Q')),
+        alt.Chart(alt.Data(url='file:///nonexistent/data.csv')).mark_point().encode(alt.X('a:Q'), alt.Y('b:Q')),
+    ]
+    results = render_batch([charts[0], bad[0], charts[2], bad[1], bad[1]], str(tmpdir), workers=workers)
+    errors = [error for _, error in results]
+    assert errors[0] is None and errors[2] is None
+    assert isinstance(errors[1], NotImplementedError)
+    assert isinstance(errors[3], OSError) and errors[4] is errors[3]
+    assert sorted(tmpdir.listdir()) == [tmpdir.join('chart-0.png'), tmpdir.join('chart-2.png')]
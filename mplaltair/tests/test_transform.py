@@ -0,0 +1,137 @@
+import altair as alt
+import numpy as np
+import pandas as pd
+import pytest
+
+from mplaltair import _transform
+from mplaltair.parse_chart import ChartMetadata
+
+df = pd.DataFrame({
+    'a': [3, 1, 2, 5, 4, 1], 'b': [1., 2., np.nan, 4., 5., 6.], 'g': list('xxyyxy'),
+    'd': pd.date_range('2015-01-01', periods=6, freq='M'),
+})
+
+
+def run(transforms, data=df):
+    return _transform._compile_transforms(transforms).run(data)
+
+
+@pytest.mark.parametrize('predicate,expected', [
+    ('datum.a > 1 && datum.b !== 4', [3, 2, 4]),
+    ('!(datum.a > 1) || datum["g"] == "y"', [1, 2, 5, 1]),
+    ({'field': 'a', 'equal': 1}, [1, 1]),
+    ({'field': 'a', 'range': [2, 4]}, [3, 2, 4]),
+    ({'field': 'a', 'range': [None, 2]}, [1, 2, 1]),
+    ({'field': 'g', 'oneOf': ['y']}, [2, 5, 1]),
+    ({'field': 'b', 'valid': True}, [3, 1, 5, 4, 1]),
+    ({'field': 'a', 'gte': 4}, [5, 4]),
+    ({'and': [{'field': 'a', 'lt': 5}, {'not': {'field': 'g', 'equal': 'x'}}]}, [2, 1]),
+    ({'or': [{'field': 'a', 'equal': 5}, 'datum.b == 1']}, [3, 5]),
+    ({'field': 'd', 'timeUnit': 'month', 'oneOf': [{'year': 2012, 'month': 'Feb'}, '2012-05-01']}, [1, 4]),
+    ({'field': 'd', 'range': ['2015-02-01', '2015-04-30']}, [1, 2, 5]),
+])
+def test_filter(predicate, expected):
+    assert list(run([{'filter': predicate}])['a']) == expected
+
+
+def test_filter_selection():
+    with pytest.raises(NotImplementedError):
+        run([{'filter': {'selection': 'brush'}}])
+
+
+def test_unsupported_transform():
+    with pytest.raises(NotImplementedError):
+        _transform._compile_transforms([{'lookup': 'a', 'from': {}}])
+
+
+def test_calculate():
+    result = run([{'calculate': 'datum.a * 2', 'as': 'c'}, {'calculate': 'datum.c + datum.a', 'as': 'e'},
+                  {'calculate': '1', 'as': 'one'}])
+    assert list(result['c']) == [6, 2, 4, 10, 8, 2]
+    assert list(result['e']) == [9, 3, 6, 15, 12, 3]
+    assert list(result['one']) == [1] * 6
+    assert 'c' not in df
+
+
+def test_fold():
+    result = run([{'fold': ['a', 'b'], 'as': ['k', 'v']}], df.iloc[:2])
+    assert list(result['k']) == ['a', 'b', 'a', 'b']
+    assert list(result['v']) == [3, 1, 1, 2]
+    assert list(result['g']) == ['x', 'x', 'x', 'x']
+
+
+@pytest.mark.parametrize('op,frame,expected', [
+    ({'op': 'row_number'}, [None, 0], [2, 1, 2, 3, 3, 1]),
+    ({'op': 'rank'}, [None, 0], [2, 1, 2, 3, 3, 1]),
+    ({'op': 'sum', 'field': 'b'}, [None, 0], [3, 2, 6, 10, 8, 6]),
+    ({'op': 'sum', 'field': 'b'}, [None, None], [8, 8, 10, 10, 8, 10]),
+    ({'op': 'sum', 'field': 'b'}, [-1, 1], [8, 3, 10, 4, 6, 6]),
+    ({'op': 'count'}, [-1, 0], [2, 1, 2, 2, 2, 1]),
+    ({'op': 'mean', 'field': 'b'}, [None, 0], [1.5, 2, 6, 5, 8 / 3, 6]),
+    ({'op': 'max', 'field': 'b'}, [None, 0], [2, 2, 6, 6, 5, 6]),
+    ({'op': 'min', 'field': 'b'}, [0, None], [1, 1, 4, 4, 5, 4]),
+    ({'op': 'lag', 'field': 'a'}, [None, 0], [1, np.nan, 1, 2, 3, np.nan]),
+    ({'op': 'first_value', 'field': 'a'}, [None, 0], [1, 1, 1, 1, 1, 1]),
+    ({'op': 'cume_dist'}, [None, 0], [2 / 3, 1 / 3, 2 / 3, 1, 1, 1 / 3]),
+])
+def test_window(op, frame, expected):
+    op = dict(op, **{'as': 'w'})
+    result = run([{'window': [op], 'groupby': ['g'], 'sort': [{'field': 'a'}], 'frame': frame}])
+    np.testing.assert_allclose(result['w'].astype(float), expected)
+
+
+def test_window_peers():
+    data = pd.DataFrame({'a': [1, 2, 2, 3], 'b': [1., 2., 3., 4.]})
+    window = {'window': [{'op': 'sum', 'field': 'b', 'as': 's'}, {'op': 'rank', 'as': 'r'},
+                         {'op': 'dense_rank', 'as': 'd'}], 'sort': [{'field': 'a', 'order': 'descending'}]}
+    result = run([window], data)
+    assert list(result['s']) == [10, 9, 9, 4]
+    assert list(result['r']) == [4, 2, 2, 1]
+    assert list(result['d']) == [3, 2, 2, 1]
+    result = run([dict(window, ignorePeers=True)], data)
+    assert list(result['s']) == [10, 6, 9, 4]
+
+
+def test_plan():
+    plan = _transform._compile_transforms([
+        {'filter': 'datum.a > 1'},
+        {'calculate': 'datum.a * 2', 'as': 'c'},
+        {'filter': {'field': 'b', 'valid': True}},
+        {'calculate': 'datum.c + 1', 'as': 'e'},
+        {'filter': {'field': 'c', 'lt': 8}},
+        {'filter': 'datum.e < 9'},
+        {'window': [{'op': 'row_number', 'as': 'n'}]},
+        {'filter': {'field': 'a', 'gt': 2}},
+    ])
+    # The filters that don't depend on a calculation and come before the window are pushed down
+    assert plan.pushdown.predicates == ['datum.a > 1', {'field': 'b', 'valid': True}]
+    assert [(kind, len(transforms)) for kind, transforms in plan.stages] == [
+        ('calculate', 2), ('filter', 2), ('window', 1), ('filter', 1)]
+    assert plan.inputs == {'a': None, 'b': None}
+    assert plan.columns({'a': 'quantitative', 'e': 'quantitative', 'g': 'nominal'}) == {
+        'a': 'quantitative', 'b': None, 'g': 'nominal'}
+
+    result = plan.run(df)
+    assert list(result['a']) == [3]
+    assert [name for name, _, _ in plan.timings] == ['filter', 'calculate c, e', 'filter x2', 'window n', 'filter']
+    assert [rows for _, _, rows in plan.timings] == [3, 3, 1, 1, 1]
+    assert len(plan.report().splitlines()) == 5
+
+
+def test_chart():
+    chart = alt.Chart(df).mark_point().encode(alt.X('a'), alt.Y('c:Q')).transform_filter(
+        alt.FieldOneOfPredicate(field='g', oneOf=['x'])).transform_calculate(c='datum.a * datum.b')
+    metadata = ChartMetadata(chart)
+    assert metadata.columns == {'a': 'quantitative', 'g': None, 'b': None}
+    assert list(metadata.encoding['y'].data) == [3, 2, 20]
+    assert [name for name, _, _ in metadata.transforms.timings] == ['load and filter', 'calculate c']
+
+
+def test_chart_leaves_data_untouched():
+    source = df.copy()
+    chart = alt.Chart(source).mark_point().encode(alt.X('a'), alt.Y('b')).transform_calculate(a='datum.a * 10')
+    metadata = ChartMetadata(chart)
+    assert list(metadata.encoding['x'].data) == [30, 10, 20, 50, 40, 10]
+    assert list(source['a']) == [3, 1, 2, 5, 4, 1]
+    assert chart.data is source
+    assert not metadata.encoding['x'].data.flags.writeable
@@ -1,3 +1,4 @@
+import io
 import pytest
 import pandas as pd
 from vega_datasets import data
@@ -13,3 +14,33 @@ def test_fetch_success():
 def test_fetch_error():
     with pytest.raises(NotImplementedError):
         _utils._fetch('https://test.tld/dataset.tsv')
+
+_csv = b'a,b,c,d\n1,x,2015-01-01,1.5\n2,y,2015-01-02,n/a\n3,z,2015-01-03,2.5\n'
+
+def test_read_csv_chunks(monkeypatch):
+    monkeypatch.setattr(_utils, '_CSV_CHUNKSIZE', 2)
+    df = _utils._read_csv(io.BytesIO(_csv), {'a': 'quantitative', 'c': 'temporal'})
+    assert list(df.columns) == ['a', 'c']
+    assert list(df['a']) == [1, 2, 3]
+    assert list(df['c']) == list(pd.date_range('2015-01-01', periods=3))
+
+def test_read_csv_type_hints():
+    df = _utils._read_csv(io.BytesIO(_csv), {'b': 'nominal', 'd': 'quantitative', 'missing': 'nominal'})
+    assert list(df.columns) == ['b', 'd']
+    assert list(df['b']) == ['x', 'y', 'z']
+    assert df['d'].isnull().tolist() == [False, True, False]
+
+def test_read_csv_all_columns():
+    assert list(_utils._read_csv(io.BytesIO(_csv)).columns) == ['a', 'b', 'c', 'd']
+
+def test_read_json_columns():
+    df = _utils._read_json(io.BytesIO(b'[{"a": 1, "b": "2015-01-01"}, {"a": 2, "b": "2015-01-02"}]'),
+                           {'b': 'temporal'})
+    assert list(df.columns) == ['b']
+    assert list(df['b']) == list(pd.date_range('2015-01-01', periods=2))
+
+def test_read_csv_row_filter(monkeypatch):
+    monkeypatch.setattr(_utils, '_CSV_CHUNKSIZE', 2)
+    df = _utils._read_csv(io.BytesIO(_csv), {'a': 'quantitative', 'd': 'quantitative'},
+                          row_filter=lambda chunk: chunk['d'].notnull().values)
+    assert list(df['a']) == [1, 3]
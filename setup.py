@@ -32,6 +32,7 @@ setup_parameters = dict(
     description="Convert altair objects to Matplotlib Figures",
     author="Matplotlib Development Team",
     install_requires=['matplotlib>=2.2.0', 'altair>=2'],
+    extras_require={'numexpr': ['numexpr']},
     author_email="matplotlib-users@python.org",
     url="https://github.com/matplotlib/mpl-altair",
     packages=['mplaltair'],